@@ -0,0 +1,161 @@
+# Rolling backups of every library. Items are cut into chunks on item boundaries and each chunk is
+# stored once, named by the hash of its content, so a generation costs a small manifest plus the
+# chunks that changed since the generations before it. A chunk ends after an item whose own hash has
+# its low bits clear: adding or removing an item changes the chunk around it, not every chunk after it.
+#
+# Layout of the backup folder:
+#   chunks/ab/<hash>    zlib-compressed JSON array of item dicts
+#   <generation>.json   manifest: time, reason and per library its name, file, item count and chunk hashes
+#   index.json          the manifests without their chunk lists, oldest first, for listing generations
+import hashlib
+import json
+import os
+import time
+import zlib
+
+CHUNK_MASK = 63  # About 64 items per chunk
+CHUNK_MAX_BYTES = 1024 * 1024  # Ends a chunk early when large items would make it bigger than this
+INDEX = "index.json"
+
+
+def write_atomic(path, content):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def chunk_items(items, default):
+    # Encoded chunks of the items; keys are sorted so an unchanged item always encodes the same
+    chunk = []
+    size = 0
+    for item in items:
+        encoded = json.dumps(item, default=default, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        chunk.append(encoded)
+        size += len(encoded)
+        if hashlib.blake2b(encoded, digest_size=8).digest()[0] & CHUNK_MASK == 0 or size >= CHUNK_MAX_BYTES:
+            yield b"[" + b",".join(chunk) + b"]"
+            chunk = []
+            size = 0
+    if chunk:
+        yield b"[" + b",".join(chunk) + b"]"
+
+
+def chunk_path(folder, key):
+    return os.path.join(folder, "chunks", key[:2], key)
+
+
+def store_chunk(folder, raw):
+    # The chunk's hash, and how many bytes had to be written for it (0 when an earlier generation has it)
+    key = hashlib.blake2b(raw, digest_size=16).hexdigest()
+    path = chunk_path(folder, key)
+    if os.path.exists(path):
+        return key, 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    packed = zlib.compress(raw)
+    write_atomic(path, packed)
+    return key, len(packed)
+
+
+def read_index(folder):
+    # Summaries of the generations, oldest first; rebuilt from the manifests when the index is missing or damaged
+    try:
+        with open(os.path.join(folder, INDEX), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    index = []
+    for name in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+        if name.endswith(".json") and name != INDEX:
+            try:
+                index.append(summary(read_manifest(folder, name[:-5])))
+            except (OSError, ValueError):
+                pass
+    return index
+
+
+def read_manifest(folder, generation):
+    with open(os.path.join(folder, generation + ".json"), "r") as f:
+        return json.load(f)
+
+
+def summary(manifest):
+    entry = {key: value for key, value in manifest.items() if key != "libraries"}
+    entry["counts"] = {library["name"]: library["count"] for library in manifest["libraries"]}
+    return entry
+
+
+def write_generation(folder, reason, libraries, default):
+    # Back up (name, file, items) of every library; returns the new generation's summary, or None when
+    # nothing changed since the newest generation
+    index = read_index(folder)
+    written = 0
+    entries = []
+    for name, file, items in libraries:
+        chunks = []
+        for raw in chunk_items(items, default):
+            key, size = store_chunk(folder, raw)
+            chunks.append(key)
+            written += size
+        entries.append({"name": name, "file": file, "count": len(items), "chunks": chunks})
+    if index:
+        try:
+            if read_manifest(folder, index[-1]["id"])["libraries"] == entries:
+                return None
+        except (OSError, ValueError):
+            pass
+    now = time.time()
+    generation = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    taken = {entry["id"] for entry in index}
+    suffix = 1
+    while generation in taken:
+        suffix += 1
+        generation = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{suffix}"
+    manifest = {"id": generation, "time": now, "reason": reason, "written": written, "libraries": entries}
+    write_atomic(os.path.join(folder, generation + ".json"), json.dumps(manifest).encode("utf-8"))
+    index.append(summary(manifest))
+    write_atomic(os.path.join(folder, INDEX), json.dumps(index).encode("utf-8"))
+    return index[-1]
+
+
+def prune(folder, keep):
+    # Drop the oldest generations beyond keep (at least one is kept), then every chunk no remaining generation refers to
+    index = read_index(folder)
+    keep = max(keep, 1)
+    if len(index) <= keep:
+        return 0
+    dropped, index = index[:-keep], index[-keep:]
+    write_atomic(os.path.join(folder, INDEX), json.dumps(index).encode("utf-8"))
+    for entry in dropped:
+        try:
+            os.remove(os.path.join(folder, entry["id"] + ".json"))
+        except OSError:
+            pass
+    referenced = set()
+    for entry in index:
+        try:
+            for library in read_manifest(folder, entry["id"])["libraries"]:
+                referenced.update(library["chunks"])
+        except (OSError, ValueError):
+            return len(dropped)  # Can't tell which chunks it needs; keep them all
+    for directory, _, names in os.walk(os.path.join(folder, "chunks")):
+        for name in names:
+            if name not in referenced:
+                os.remove(os.path.join(directory, name))
+    return len(dropped)
+
+
+def read_generation(folder, generation, name):
+    # The items one library had in a generation, as dicts; None when the library wasn't in it
+    manifest = read_manifest(folder, generation)
+    library = next((library for library in manifest["libraries"] if library["name"] == name), None)
+    if library is None:
+        return None
+    items = []
+    for key in library["chunks"]:
+        with open(chunk_path(folder, key), "rb") as f:
+            try:
+                items += json.loads(zlib.decompress(f.read()))
+            except zlib.error:
+                raise ValueError(f"Backup chunk {key} is damaged.")
+    return items
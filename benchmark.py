@@ -0,0 +1,689 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## python benchmark.py [rounds] ##
+# Times the UI paths of popup2.py against a throwaway copy of the data file.
+
+import os
+import sys
+import json
+import time
+import random
+import gc
+import tempfile
+import tracemalloc
+import threading
+from PyQt5 import QtWidgets
+import popup2
+import snapshot
+import sync
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+
+def make_items(count, prefix="item"):
+    colors = popup2.DEFAULT_CONFIG["colors"]
+    return [{"id": popup2.new_item_id(), "name": f"{prefix} {i}", "data": f"value {i}", "color": colors[i % len(colors)]} for i in range(count)]
+
+
+def make_data_file(count, library_count=0, library_size=10000, abbreviations=True):
+    # Write a synthetic data.json and extra libraries in a temporary folder, so the real files are never touched;
+    # abbreviations=False writes it as from before abbreviations, without their index
+    folder = tempfile.mkdtemp(prefix="mmc_bench_")
+    popup2.BASE_DIR = folder
+    popup2.BACKUP_DIR = os.path.join(folder, "backups")
+    libraries = []
+    for n in range(library_count):
+        items = make_items(library_size, f"lib{n}")
+        with open(os.path.join(folder, f"lib{n}.json"), "w") as f:
+            json.dump({"data": items}, f)
+        libraries.append({"name": f"lib{n}", "file": f"lib{n}.json", "names": [item["name"] for item in items]})
+    path = os.path.join(folder, "data.json")
+    file_data = {
+        "hotkey": "Ctrl+Alt+M",
+        "window_width": 550,
+        "window_height": 350,
+        "window_x": 100,
+        "window_y": 100,
+        "abbreviations": {},
+        "libraries": libraries,
+        "data": make_items(count)
+    }
+    if not abbreviations:
+        del file_data["abbreviations"]
+    with open(path, "w") as f:
+        json.dump(file_data, f)
+    return path
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    median = timings[len(timings) // 2]
+    print(f"{label:<40} median {median * 1000:8.2f} ms   min {timings[0] * 1000:8.2f} ms   n={len(timings)}")
+
+
+def close_dialogs():
+    for widget in QtWidgets.QApplication.topLevelWidgets():
+        if isinstance(widget, QtWidgets.QDialog) and widget.isVisible():
+            widget.close()
+
+
+def run_modal(dialog_opener):
+    # Replace the blocking exec_ with one event-loop pass, so the timing covers open-to-interactive
+    original_exec = QtWidgets.QDialog.exec_
+    QtWidgets.QDialog.exec_ = lambda dialog: QtWidgets.QApplication.processEvents() or 0
+    try:
+        start = time.perf_counter()
+        dialog_opener()
+        elapsed = time.perf_counter() - start
+    finally:
+        QtWidgets.QDialog.exec_ = original_exec
+    close_dialogs()
+    return elapsed
+
+
+class RestyleCounter:
+    # Counts per-widget stylesheet assignments and explicit repolishes made from Python
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        self.set_style_sheet = QtWidgets.QWidget.setStyleSheet
+        self.polish = QtWidgets.QCommonStyle.polish
+        counter = self
+
+        def counting_set_style_sheet(widget, sheet):
+            counter.count += 1
+            counter.set_style_sheet(widget, sheet)
+
+        def counting_polish(style, *args):
+            counter.count += 1
+            return counter.polish(style, *args)
+
+        QtWidgets.QWidget.setStyleSheet = counting_set_style_sheet
+        QtWidgets.QCommonStyle.polish = counting_polish
+        return self
+
+    def __exit__(self, *exc):
+        QtWidgets.QWidget.setStyleSheet = self.set_style_sheet
+        QtWidgets.QCommonStyle.polish = self.polish
+
+
+def bench_restyle(window):
+    # Full list rebuild, then walk the selection down the list as the arrow keys would
+    with RestyleCounter() as counter:
+        widgets_before = len(QtWidgets.QApplication.allWidgets())
+        start = time.perf_counter()
+        window.refresh_listbox()
+        QtWidgets.QApplication.processEvents()
+        elapsed = time.perf_counter() - start
+    print(f"{'refresh_listbox':<40} {elapsed * 1000:8.2f} ms   restyles {counter.count}   widgets +{len(QtWidgets.QApplication.allWidgets()) - widgets_before}")
+    with RestyleCounter() as counter:
+        timings = []
+        for row in range(min(ROUNDS, window.listbox.count())):
+            start = time.perf_counter()
+            window.listbox.setCurrentRow(row)
+            QtWidgets.QApplication.processEvents()
+            timings.append(time.perf_counter() - start)
+    report(f"selection change (restyles {counter.count})", timings)
+    with RestyleCounter() as counter:
+        window.edit_line()
+        start = time.perf_counter()
+        for button in window.color_buttons:
+            button.click()
+        elapsed = time.perf_counter() - start
+        close_dialogs()
+    print(f"{'color selection x' + str(len(window.color_buttons)):<40} {elapsed * 1000:8.2f} ms   restyles {counter.count}")
+
+
+def bench_paint(window):
+    # Scroll the list one step per frame and repaint the whole translucent window synchronously
+    paint_times = []
+    paint_event = popup2.PopupApp.paintEvent
+
+    def timed_paint_event(widget, event):
+        start = time.perf_counter()
+        paint_event(widget, event)
+        paint_times.append(time.perf_counter() - start)
+
+    popup2.PopupApp.paintEvent = timed_paint_event
+    try:
+        scrollbar = window.listbox.verticalScrollBar()
+        frames = []
+        for step in range(ROUNDS * 5):
+            scrollbar.setValue(step % (scrollbar.maximum() + 1))
+            start = time.perf_counter()
+            window.repaint()
+            frames.append(time.perf_counter() - start)
+    finally:
+        popup2.PopupApp.paintEvent = paint_event
+    report("scroll frame (full repaint)", frames)
+    report("PopupApp.paintEvent", paint_times)
+
+
+def bench_libraries(window):
+    # First open loads a 10k-item file; later switches only swap the model on the view
+    start = time.perf_counter()
+    window.switch_library("lib0")
+    print(f"{'first open of a 10k-item library':<40} {(time.perf_counter() - start) * 1000:8.2f} ms")
+    switches = []
+    for n in range(ROUNDS):
+        start = time.perf_counter()
+        window.switch_library(popup2.MAIN_LIBRARY if n % 2 else "lib0")
+        QtWidgets.QApplication.processEvents()
+        switches.append(time.perf_counter() - start)
+    report("switch between loaded libraries", switches)
+    start = time.perf_counter()
+    matches = sum(1 for library in window.libraries for name in (library.names if library.items is None else [item["name"] for item in library.items]) if "9999" in name.lower())
+    print(f"{'name search over 4 library indexes':<40} {(time.perf_counter() - start) * 1000:8.2f} ms   matches {matches}")
+    window.switch_library(popup2.MAIN_LIBRARY)
+
+
+def bench_undo(window):
+    # Import 50k items, undo and redo it; the history should hold references, not a copy of the library
+    items = make_items(50000, "import")
+    start = time.perf_counter()
+    window.perform("Import", [("insert", len(window.data), items)])
+    print(f"{'import of 50k items':<40} {(time.perf_counter() - start) * 1000:8.2f} ms   history {window.history.size / 1024:8.1f} KB")
+    start = time.perf_counter()
+    window.undo()
+    print(f"{'undo 50k-item import':<40} {(time.perf_counter() - start) * 1000:8.2f} ms   history {window.history.size / 1024:8.1f} KB")
+    start = time.perf_counter()
+    window.redo()
+    print(f"{'redo 50k-item import':<40} {(time.perf_counter() - start) * 1000:8.2f} ms   history {window.history.size / 1024:8.1f} KB")
+    window.undo()
+
+
+def bench_secrets(window):
+    # The passphrase is stretched once; after that a secret costs one decrypt, and reading a library never decrypts
+    salt = popup2.vault.new_salt()
+    start = time.perf_counter()
+    keys = popup2.vault.derive_keys("benchmark", salt)
+    print(f"{'scrypt key derivation (once per session)':<40} {(time.perf_counter() - start) * 1000:8.2f} ms")
+    plain = make_items(5000, "plain")
+    secret = [dict(item, data=popup2.vault.encrypt(keys, salt, item["data"]), secret=True) for item in plain]
+    timings = []
+    for item in secret[:ROUNDS]:
+        start = time.perf_counter()
+        popup2.vault.decrypt(keys, item["data"])
+        timings.append(time.perf_counter() - start)
+    report("decrypt one secret (cached key)", timings)
+    for label, items in (("plain", plain), ("secret", secret)):
+        path = os.path.join(popup2.BASE_DIR, f"{label}.json")
+        with open(path, "w") as f:
+            json.dump({"data": items}, f)
+        start = time.perf_counter()
+        popup2.read_library_file(path)
+        print(f"{'read 5k-item library, ' + label:<40} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+
+def make_corpus():
+    # Mostly short snippets plus a few long blobs: application logs, SQL and config templates
+    rng = random.Random(34)
+    items = make_items(500, "snippet")
+    levels = ["INFO", "WARN", "DEBUG", "ERROR"]
+    for n in range(10):
+        log = "\n".join(f"2024-05-{rng.randint(1, 28):02d} 12:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} {rng.choice(levels)} worker-{rng.randint(1, 8)} request {rng.randint(10000, 99999)} took {rng.randint(1, 900)} ms" for _ in range(2000))
+        sql = "\n".join(f"INSERT INTO orders (id, customer_id, total, status) VALUES ({i}, {rng.randint(1, 5000)}, {rng.randint(100, 99999) / 100}, '{rng.choice(['open', 'paid', 'shipped'])}');" for i in range(1500))
+        config = "\n".join(f"[service_{i}]\nhost = 10.0.{i % 256}.{rng.randint(1, 254)}\nport = {8000 + i}\ntimeout = 30\nretries = 3\n" for i in range(400))
+        items += [{"id": popup2.new_item_id(), "name": f"{kind} {n}", "data": text, "color": "#D3D3D3"} for kind, text in (("log", log), ("sql", sql), ("config", config))]
+    return items
+
+
+def bench_compression(window):
+    # Format 1 stores every blob as a JSON string; format 2 packs data above compress_min_kb
+    plain = make_corpus()
+    packed = [popup2.pack_item(item, popup2.DEFAULT_CONFIG["compress_min_kb"] * 1024) for item in plain]
+    for label, items in (("format 1", plain), ("format 2, " + popup2.compression.CODEC, packed)):
+        path = os.path.join(popup2.BASE_DIR, "corpus.json")
+        saves = []
+        for _ in range(5):
+            start = time.perf_counter()
+            with open(path, "w") as f:
+                json.dump({"format": popup2.DATA_FORMAT, "data": items}, f, indent=4)
+            saves.append(time.perf_counter() - start)
+        loads = []
+        for _ in range(5):
+            start = time.perf_counter()
+            popup2.read_library_file(path)
+            loads.append(time.perf_counter() - start)
+        print(f"{'corpus ' + label:<40} size {os.path.getsize(path) / 1024:8.0f} KB   save {min(saves) * 1000:7.2f} ms   load {min(loads) * 1000:7.2f} ms")
+    start = time.perf_counter()
+    window.item_data(next(item for item in packed if "packed" in item))
+    print(f"{'decompress one blob on copy':<40} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+
+def bench_templates(window):
+    # Activation cost of a template: the cached lookup plus expansion, compared with parsing every time
+    item = {"id": popup2.new_item_id(), "name": "template", "data": "Ticket {input:Ticket} checked on {date} at {time}: see log. " * 4, "color": "#D3D3D3"}
+    window.library.by_id[item["id"]] = item
+    rounds = ROUNDS * 100
+    start = time.perf_counter()
+    for _ in range(rounds):
+        popup2.templates.expand(popup2.templates.compile_template(item["data"]), {"Ticket": "T-1"})
+    print(f"{'parse + expand template':<40} {(time.perf_counter() - start) / rounds * 1e6:8.2f} us")
+    start = time.perf_counter()
+    for _ in range(rounds):
+        popup2.templates.expand(window.compiled_template(item, item["data"], window.library), {"Ticket": "T-1"})
+    print(f"{'cached template + expand':<40} {(time.perf_counter() - start) / rounds * 1e6:8.2f} us")
+    del window.library.by_id[item["id"]]
+
+
+class SlowBrowser:
+    # Stands in for a browser that takes a while to start
+    def __init__(self, delay):
+        self.delay = delay
+        self.opened = []
+
+    def open(self, url):
+        time.sleep(self.delay)
+        self.opened.append(time.perf_counter())
+        return True
+
+
+def bench_launch(window):
+    # Activating a link item with a browser that needs 300 ms to start: time until the window is hidden
+    item = {"id": popup2.new_item_id(), "name": "link", "data": "https://example.com/", "color": "#D3D3D3"}
+    window.perform("Add", [("insert", 0, [item])])
+    browser = window.launcher.browser = SlowBrowser(0.3)
+    times = []
+    for _ in range(5):
+        window.show()
+        window.listbox.setCurrentRow(window.filtered_ids.index(item["id"]))
+        start = time.perf_counter()
+        window.handle_enter()
+        times.append(time.perf_counter() - start)
+    report("handle_enter on a link (browser 300 ms)", times)
+    while len(browser.opened) < 5:
+        time.sleep(0.05)
+    window.launcher.browser = None
+    window.undo()
+    window.show()
+
+
+def bench_tray(window):
+    # Opening the tray menu over a 100k-item library with 500 counted items: rebuilding the entries versus the cached list
+    items = make_items(100000, "tray")
+    window.perform("Import", [("insert", len(window.data), items)])
+    window.send_to_systray()
+    rng = random.Random(39)
+    window.usage = {item["id"]: rng.randint(1, 50) for item in rng.sample(items, popup2.USAGE_LIMIT)}
+    window.pinned = [items[n]["id"] for n in (10, 20, 30)]
+    rebuilt, cached = [], []
+    for _ in range(ROUNDS):
+        window.tray_items = None
+        start = time.perf_counter()
+        window.tray_menu.aboutToShow.emit()
+        rebuilt.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        window.tray_menu.aboutToShow.emit()
+        cached.append(time.perf_counter() - start)
+    report("tray menu open, entries rebuilt", rebuilt)
+    report("tray menu open, cached", cached)
+    window.usage, window.pinned = {}, []
+    window.undo()
+
+
+def bench_jump(window):
+    # Typing a five-digit row label in a 100k-item library, and a model insert at the top, after which every
+    # row below shows a new label (save_data, which writes the whole library, is left out)
+    items = make_items(100000, "jump")
+    window.perform("Import", [("insert", len(window.data), items)])
+    handle_enter = window.handle_enter
+    window.handle_enter = lambda: None
+    rng = random.Random(46)
+    jumps = []
+    for _ in range(ROUNDS):
+        label = f"{rng.randrange(window.listbox.count()):0{window.library.model.label_width}X}"
+        start = time.perf_counter()
+        for key in label:
+            window.jump_key(key)
+        QtWidgets.QApplication.processEvents()
+        jumps.append(time.perf_counter() - start)
+    window.handle_enter = handle_enter
+    report(f"jump to a row by its {len(label)}-digit label", jumps)
+    model = window.library.model
+    item = popup2.Item.from_dict(make_items(1, "top")[0])
+    window.library.by_id[item.id] = item
+    inserts = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        model.insert_ids(0, [item.id])
+        QtWidgets.QApplication.processEvents()
+        inserts.append(time.perf_counter() - start)
+        model.remove_rows(0, 1)
+    del window.library.by_id[item.id]
+    report("row insert at the top of 100k, relabel", inserts)
+    window.undo()
+
+
+def resident_mb():
+    # Resident set size of this process, where the platform exposes it cheaply
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return float("nan")
+
+
+def bench_idle_trim(window):
+    # A 100k-item Main with every library loaded and both dialogs built: resident memory while hidden, before and
+    # after the idle trim, and the time until the window is painted again
+    items = make_items(100000, "idle")
+    window.perform("Import", [("insert", len(window.data), items)])
+    for library in window.libraries:
+        window.switch_library(library.name)
+    window.switch_library(popup2.MAIN_LIBRARY)
+    if window.edit_popup is None:
+        window.build_add_edit_popup()
+    if window.hotkey_dialog is None:
+        window.build_hotkey_dialog()
+    latencies = {}
+    for label in ("kept", "trimmed"):
+        window.show()
+        window.listbox.setCurrentRow(50000)
+        QtWidgets.QApplication.processEvents()
+        window.hide()
+        QtWidgets.QApplication.processEvents()
+        before = resident_mb()
+        if label == "trimmed":
+            window.trim_idle()
+            QtWidgets.QApplication.processEvents()
+            print(f"{'resident while hidden':<40} before {before:8.1f} MB   trimmed {resident_mb():8.1f} MB")
+        start = time.perf_counter()
+        window.show()
+        window.repaint()
+        QtWidgets.QApplication.processEvents()
+        latencies[label] = time.perf_counter() - start
+    print(f"{'re-show to painted':<40} kept {latencies['kept'] * 1000:8.2f} ms   trimmed {latencies['trimmed'] * 1000:8.2f} ms   row {window.listbox.currentRow()}")
+    window.undo()
+
+
+class KeyEvent:
+    def __init__(self, name, event_type="down"):
+        self.name = name
+        self.event_type = event_type
+
+
+def bench_abbreviations(window):
+    # Cost the keyboard hook adds to every keystroke typed anywhere, with 10 and with 10k abbreviations loaded
+    rng = random.Random(42)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))) for _ in range(2000)]
+    window.abbreviation_typed.disconnect()
+    main = window.libraries[0]
+    saved = main.abbreviations
+    for count in (10, 10000):
+        main.abbreviations = {";" + rng.choice(words)[:5] + str(n): popup2.new_item_id() for n in range(count)}
+        start = time.perf_counter()
+        window.rebuild_matcher()
+        built = time.perf_counter() - start
+        keys = []
+        for n, word in enumerate(rng.choices(words, k=4000)):
+            typed = rng.choice(list(main.abbreviations)) if n % 50 == 0 else word  # Now and then an abbreviation
+            keys += [KeyEvent(char) for char in typed] + [KeyEvent("space")]
+        keys += [KeyEvent("backspace"), KeyEvent("shift"), KeyEvent("shift", "up"), KeyEvent("enter")] * 100
+        start = time.perf_counter()
+        for key in keys:
+            window.on_key(key)
+        per_key = (time.perf_counter() - start) / len(keys)
+        print(f"{'typing, ' + str(count) + ' abbreviations':<40} {per_key * 1e6:8.2f} us/key   automaton built in {built * 1000:8.2f} ms")
+    main.abbreviations = saved
+    window.rebuild_matcher()
+    window.abbreviation_typed.connect(window.expand_abbreviation)
+
+
+def bench_memory(window):
+    # Memory held by the parsed item list as plain dicts versus compact Item records, after loading from JSON
+    colors = popup2.DEFAULT_CONFIG["colors"]
+    for count in (100000, 1000000):
+        text = "[" + ",".join(f'{{"id": "{n:016x}", "name": "entry {n % 5000}", "data": "copied text {n}", "color": "{colors[n % len(colors)]}"}}' for n in range(count)) + "]"
+        tracemalloc.start()
+        items = json.loads(text)
+        as_dicts = tracemalloc.get_traced_memory()[0]
+        items = [popup2.to_item(item) for item in items]
+        as_items = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del items
+        print(f"{'memory, ' + str(count) + ' items':<40} dicts {as_dicts / 2 ** 20:8.1f} MB   Item {as_items / 2 ** 20:8.1f} MB")
+
+
+def bench_snapshot():
+    # Cold start of a 100k-item data.json: parsing the JSON versus opening the binary snapshot. A file from before
+    # abbreviations has its index built on the first start, from the snapshot's extra fields when there is a snapshot
+    # written without it, and saved; the second start is the one every later launch costs
+    rows_read = []
+    snapshot_row = snapshot.Snapshot.row
+
+    def counted_row(self, index):
+        rows_read.append(index)
+        return snapshot_row(self, index)
+
+    def cold_start(label):
+        rows_read.clear()
+        start = time.perf_counter()
+        window = popup2.PopupApp(popup2.DEFAULT_CONFIG.copy())
+        window.show()
+        QtWidgets.QApplication.processEvents()
+        elapsed = time.perf_counter() - start
+        main = window.libraries[0]
+        print(f"{'cold start, 100k items, ' + label:<40} {elapsed * 1000:8.2f} ms   rows read {len(rows_read)}{'' if main.snapshot is None else ', from snapshot'}")
+        window.snapshot_timer.stop()
+        window.hide()
+
+    snapshot.Snapshot.row = counted_row
+    try:
+        popup2.DATA_FILE = make_data_file(100000)
+        cold_start("json")
+        thread = popup2.SnapshotThread(popup2.DATA_FILE, popup2.snapshot_path())
+        start = time.perf_counter()
+        thread.run()
+        print(f"{'snapshot rebuild (background thread)':<40} {(time.perf_counter() - start) * 1000:8.2f} ms   size {os.path.getsize(popup2.snapshot_path()) / 1024:8.0f} KB")
+        cold_start("snapshot")
+        popup2.DATA_FILE = make_data_file(100000, abbreviations=False)
+        cold_start("old file, json")
+        cold_start("old file, json, again")
+        popup2.DATA_FILE = make_data_file(100000, abbreviations=False)
+        with open(popup2.DATA_FILE, "rb") as f:
+            raw = f.read()
+        file_data = json.loads(raw)
+        items = file_data.pop("data")
+        snapshot.write_snapshot(popup2.snapshot_path(), snapshot.checksum(raw), file_data, items, popup2.DEFAULT_CONFIG["colors"][0])
+        cold_start("old snapshot")
+        popup2.SnapshotThread(popup2.DATA_FILE, popup2.snapshot_path()).run()
+        cold_start("old snapshot, again")
+    finally:
+        snapshot.Snapshot.row = snapshot_row
+
+
+def bench_startup():
+    # Startup to tray icon: building and flashing the whole window first, as before, versus the tray icon alone,
+    # and what the deferred window then costs on first show
+    config = popup2.DEFAULT_CONFIG.copy()
+    config["window_prewarm_s"] = 0
+    config["backup_interval_min"] = 0
+    for count, rounds in ((200, 10), (100000, 2)):
+        popup2.DATA_FILE = make_data_file(count)
+        timings = {"window first": [], "tray first": [], "first show": []}
+        for _ in range(rounds):
+            for label in ("window first", "tray first"):
+                gc.collect()  # Not the garbage of the rounds before
+                start = time.perf_counter()
+                window = popup2.PopupApp(config.copy())
+                if label == "window first":
+                    window.show()
+                window.send_to_systray()
+                window.hide()
+                QtWidgets.QApplication.processEvents()
+                timings[label].append(time.perf_counter() - start)
+                if label == "tray first":
+                    start = time.perf_counter()
+                    window.show_and_focus()
+                    QtWidgets.QApplication.processEvents()
+                    timings["first show"].append(time.perf_counter() - start)
+                window.tray_icon.hide()
+                window.hide()
+                window.shutdown()
+        report(f"startup to tray, {count} items, window first", timings["window first"])
+        report(f"startup to tray, {count} items, tray first", timings["tray first"])
+        report(f"first show after tray first, {count} items", timings["first show"])
+
+
+def bench_sync():
+    # Delta sync of a 100k-item library through a sync server on localhost: the first full exchange, then one
+    # edited item sent by the app and fetched by a second client, next to copying the whole data.json
+    popup2.DATA_FILE = make_data_file(100000)
+    popup2.SYNC_STATE_FILE = os.path.join(popup2.BASE_DIR, "sync_state.json")
+    server = sync.SyncServer(0, os.path.join(popup2.BASE_DIR, "sync_server"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    with open(popup2.DATA_FILE, "r") as f:
+        file_data = json.load(f)
+    file_data["sync_url"] = url
+    with open(popup2.DATA_FILE, "w") as f:
+        json.dump(file_data, f)
+    config = popup2.DEFAULT_CONFIG.copy()
+    config["backup_interval_min"] = 0
+    window = popup2.PopupApp(config)
+    results = []
+    window.syncer.synced.connect(results.append)
+
+    def run_sync(label):
+        window.sync_soon.stop()
+        window.sync_timer.stop()
+        count = len(results)
+        start = time.perf_counter()
+        window.start_sync()
+        while len(results) == count:
+            QtWidgets.QApplication.processEvents()
+            time.sleep(0.001)
+        QtWidgets.QApplication.processEvents()
+        elapsed = time.perf_counter() - start
+        print(f"{'sync, 100k items, ' + label:<40} {elapsed * 1000:8.2f} ms   sent and received {results[-1]['transferred'] / 1024:8.1f} KB")
+
+    run_sync("first")
+    start = time.perf_counter()
+    other_items, other_entry, conflicts, transferred = sync.sync_library(url, popup2.MAIN_LIBRARY, [], {}, None, {}, None, 30)
+    print(f"{'sync, 100k items, second client first':<40} {(time.perf_counter() - start) * 1000:8.2f} ms   sent and received {transferred / 1024:8.1f} KB")
+    item = window.item_at(50000)
+    window.perform("Edit", [("replace", 50000, dict(item, name=item["name"] + " changed"))])
+    run_sync("one item edited")
+    start = time.perf_counter()
+    other_items, other_entry, conflicts, transferred = sync.sync_library(url, popup2.MAIN_LIBRARY, other_items, other_entry, other_items, {}, None, 30)
+    print(f"{'sync, 100k items, second client fetch':<40} {(time.perf_counter() - start) * 1000:8.2f} ms   sent and received {transferred / 1024:8.1f} KB")
+    assert other_items[50000]["name"] == item["name"] + " changed"
+    print(f"{'copying data.json instead':<40} {'':>8}      size {os.path.getsize(popup2.DATA_FILE) / 1024:8.1f} KB")
+    window.shutdown()
+    server.shutdown()
+
+
+def bench_backup():
+    # Backups of a 100k-item library: what the GUI thread pays to ask for one, and what the backup thread
+    # writes for the first generation and for one after a single item changed
+    popup2.DATA_FILE = make_data_file(100000)
+    config = popup2.DEFAULT_CONFIG.copy()
+    config["backup_interval_min"] = 0
+    window = popup2.PopupApp(config)
+    results = []
+    window.backups.backed_up.connect(results.append)
+    for label in ("first", "one item changed"):
+        if label != "first":
+            item = window.item_at(50000)
+            window.perform("Edit", [("replace", 50000, dict(item, name=item["name"] + " changed"))])
+        start = time.perf_counter()
+        window.back_up(label)
+        queued = time.perf_counter() - start
+        while len(results) < (1 if label == "first" else 2):
+            QtWidgets.QApplication.processEvents()
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        print(f"{'backup, 100k items, ' + label:<40} GUI {queued * 1000:6.2f} ms   thread {elapsed * 1000:8.2f} ms   written {results[-1]['written'] / 1024:8.1f} KB")
+    window.shutdown()
+
+
+def bench_editor(window):
+    # The edit dialog on 1 MB and 10 MB log items: open until shown and until fully editable, paging through
+    # the text, and saving with the data unchanged and changed. 10 MB opens as a preview; "Edit All" loads it
+    line = "2024-05-01 12:00:00 INFO worker-3 request 48213 took 112 ms, cache hit ratio 0.93\n"
+    original_exec = QtWidgets.QDialog.exec_
+    QtWidgets.QDialog.exec_ = lambda dialog: None
+    for size_mb in (1, 10):
+        item = {"id": popup2.new_item_id(), "name": f"log {size_mb} MB", "data": line * (size_mb * 2 ** 20 // len(line)), "color": "#D3D3D3"}
+        window.perform("Add", [("insert", 0, [popup2.pack_item(item, window.config["compress_min_kb"] * 1024)])])  # Stored as saving from the dialog would
+        window.listbox.setCurrentRow(0)
+        start = time.perf_counter()
+        window.edit_line()
+        window.edit_popup.show()
+        QtWidgets.QApplication.processEvents()
+        shown = time.perf_counter() - start
+        editor = window.data_entry
+        if editor.previewing:
+            start = time.perf_counter()
+            window.edit_all_data()
+        while editor.chunk_timer.isActive():
+            QtWidgets.QApplication.processEvents()
+        loaded = time.perf_counter() - start
+        print(f"{'open ' + str(size_mb) + ' MB item' + (' (preview)' if size_mb == 10 else ''):<40} shown {shown * 1000:8.2f} ms   {'edit all' if size_mb == 10 else 'editable'} {loaded * 1000:8.2f} ms")
+        scroll_bar = editor.verticalScrollBar()
+        pages = []
+        for n in range(ROUNDS):
+            start = time.perf_counter()
+            scroll_bar.setValue(scroll_bar.maximum() * n // ROUNDS)
+            editor.viewport().repaint()
+            pages.append(time.perf_counter() - start)
+        report(f"scroll {size_mb} MB item, one jump + paint", pages)
+        start = time.perf_counter()
+        window.submit_popup(window.name_entry, editor, window.color_buttons, window.edit_popup, item["id"])
+        unchanged = time.perf_counter() - start
+        window.edit_line()
+        if editor.previewing:
+            window.edit_all_data()
+        editor.finish_loading()
+        editor.moveCursor(popup2.QtGui.QTextCursor.End)
+        editor.insertPlainText("x")
+        start = time.perf_counter()
+        window.submit_popup(window.name_entry, editor, window.color_buttons, window.edit_popup, item["id"])
+        changed = time.perf_counter() - start
+        print(f"{'save ' + str(size_mb) + ' MB item':<40} unchanged {unchanged * 1000:8.2f} ms   changed {changed * 1000:8.2f} ms")
+        window.undo()
+        window.undo()
+        window.undo()
+    QtWidgets.QDialog.exec_ = original_exec
+    window.edit_popup.close()
+
+
+def bench_dialogs(window):
+    add_edit = [run_modal(window.edit_line) for _ in range(ROUNDS)]
+    report("open_add_edit_popup (edit)", add_edit)
+    hotkey = [run_modal(window.adjust_hotkey) for _ in range(ROUNDS)]
+    report("adjust_hotkey", hotkey)
+
+
+if __name__ == "__main__":
+    app = QtWidgets.QApplication(sys.argv)
+    popup2.DATA_FILE = make_data_file(200, library_count=3)
+    popup2.PopupApp.release_all_modifiers = lambda self: None  # Don't inject key events while measuring
+    window = popup2.PopupApp(popup2.DEFAULT_CONFIG.copy())
+    window.show()
+    window.listbox.setCurrentRow(0)
+    QtWidgets.QApplication.processEvents()
+    bench_dialogs(window)
+    bench_editor(window)
+    original_exec = QtWidgets.QDialog.exec_
+    QtWidgets.QDialog.exec_ = lambda dialog: 0
+    bench_restyle(window)
+    QtWidgets.QDialog.exec_ = original_exec
+    bench_paint(window)
+    bench_libraries(window)
+    bench_undo(window)
+    bench_secrets(window)
+    bench_compression(window)
+    bench_templates(window)
+    bench_launch(window)
+    bench_tray(window)
+    bench_jump(window)
+    bench_idle_trim(window)
+    bench_abbreviations(window)
+    bench_memory(window)
+    bench_snapshot()
+    bench_startup()
+    bench_backup()
+    bench_sync()
@@ -0,0 +1,39 @@
+# Transparent compression for large item data. A packed item keeps its data as base64 text
+# and names the codec in item["packed"]; items without that key are plain, as in every file
+# written before data format 2. zstd is used when the zstandard package is installed.
+import base64
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC = "zstd" if zstandard is not None else "zlib"
+DECODE_ERRORS = (zlib.error, UnicodeDecodeError) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+def pack(text):
+    # (codec, packed text), or None when base64 would eat the saving
+    raw = text.encode("utf-8")
+    if CODEC == "zstd":
+        compressed = zstandard.ZstdCompressor(level=9).compress(raw)
+    else:
+        compressed = zlib.compress(raw, 9)
+    packed = base64.b64encode(compressed).decode("ascii")
+    if len(packed) >= len(text):
+        return None
+    return CODEC, packed
+
+
+def unpack(codec, packed):
+    # Raises ValueError for damaged data or a codec this install cannot read
+    try:
+        compressed = base64.b64decode(packed, validate=True)
+        if codec == "zlib":
+            return zlib.decompress(compressed).decode("utf-8")
+        if codec == "zstd" and zstandard is not None:
+            return zstandard.ZstdDecompressor().decompress(compressed).decode("utf-8")
+    except DECODE_ERRORS as e:
+        raise ValueError(f"Compressed data is damaged: {str(e)}")
+    raise ValueError(f"Data compressed with {codec} needs the zstandard package.")
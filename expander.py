@@ -0,0 +1,92 @@
+# Text expansion: typing an item's abbreviation in any application replaces it with the item's data.
+# All abbreviations are compiled into one Aho-Corasick automaton, so the keystroke buffer is just the
+# current state: a key is a dict lookup plus at most a short walk down failure links, bounded by the
+# longest abbreviation and independent of how many abbreviations there are.
+#
+# When several abbreviations end at the typed character the longest wins. An abbreviation starting with a
+# letter, digit or _ only counts at the start of a word, so "sig" does not fire inside "design"; one starting
+# with punctuation, like ";sig", counts anywhere.
+from collections import deque
+
+
+def is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+class Node:
+    __slots__ = ("next", "fail", "value", "length", "output")
+
+    def __init__(self, length):
+        self.next = {}
+        self.fail = None
+        self.value = None  # Value of the abbreviation ending exactly here
+        self.length = length
+        self.output = None  # Nearest node down the failure links where a shorter abbreviation ends
+
+
+class Matcher:
+    def __init__(self, abbreviations):
+        # abbreviations maps each abbreviation to the value feed() returns when it has just been typed
+        self.root = Node(0)
+        self.longest = 0
+        for abbreviation, value in abbreviations.items():
+            if not abbreviation:
+                continue
+            node = self.root
+            for char in abbreviation:
+                child = node.next.get(char)
+                if child is None:
+                    child = node.next[char] = Node(node.length + 1)
+                node = child
+            node.value = value
+            self.longest = max(self.longest, len(abbreviation))
+        # Breadth first, so every failure target is finished before the nodes that point to it
+        self.root.fail = self.root
+        queue = deque()
+        for child in self.root.next.values():
+            child.fail = self.root
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in node.next.items():
+                fail = node.fail
+                while char not in fail.next and fail is not self.root:
+                    fail = fail.fail
+                child.fail = fail.next.get(char, self.root)
+                child.output = child.fail if child.fail.value is not None else child.fail.output
+                queue.append(child)
+        self.states = deque([self.root], maxlen=self.longest + 1)  # Recent states, so Backspace can step back
+        self.chars = deque(maxlen=self.longest + 1)  # Recent characters, one more than the longest abbreviation
+
+    def feed(self, char):
+        # Advance by one typed character; the value of the longest abbreviation just completed at a word start, else None
+        node = self.states[-1]
+        while char not in node.next and node is not self.root:
+            node = node.fail
+        node = node.next.get(char, self.root)
+        self.states.append(node)
+        self.chars.append(char)
+        match = node if node.value is not None else node.output
+        while match is not None:
+            if self.starts_word(match.length):
+                self.reset()  # The expansion replaces what was typed; start over after it
+                return match.value
+            match = match.output
+        return None
+
+    def starts_word(self, length):
+        # Whether the last length characters typed may form an abbreviation: it starts with punctuation, or
+        # nothing in the buffer (typed since the last reset) or no word character comes before it
+        start = len(self.chars) - length
+        return not is_word_char(self.chars[start]) or start == 0 or not is_word_char(self.chars[start - 1])
+
+    def backspace(self):
+        if len(self.states) > 1:
+            self.states.pop()
+        if self.chars:
+            self.chars.pop()
+
+    def reset(self):
+        self.states.clear()
+        self.states.append(self.root)
+        self.chars.clear()
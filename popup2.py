@@ -6,6 +6,7 @@ import json
 import os
 import sys
 import ctypes  # Add this import for console window hiding
+import gc
 from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtCore import Qt, QRect
 from PyQt5.QtGui import QPainter, QColor, QBrush, QFont, QIcon, QPixmap
@@ -14,14 +15,27 @@ import webbrowser
 import pyperclip
 import keyboard
 import threading
+import queue
+import time
 import csv
 from pystray import Icon, Menu, MenuItem
 from PIL import Image, ImageDraw
 import winsound  # Add this import for a more noticeable beep sound
 import pynput  # Add this import for global hotkey
 import base64
+import uuid
+from collections import OrderedDict, deque
+from difflib import SequenceMatcher
 from icon_base64 import encoded_icon  # Import the base64 string
 from config import VERSION
+from theme import DEFAULT_THEME
+import vault
+import compression
+import templates
+import expander
+import backup
+import sync
+from snapshot import open_snapshot, write_snapshot, checksum
 
 # Constants
 DEFAULT_CONFIG = {
@@ -31,11 +45,533 @@ DEFAULT_CONFIG = {
     "window_x": 100,  # Default window x position
     "window_y": 100,  # Default window y position
     "colors": ["#D3D3D3", "#FFDFBA", "#FFFFBA", "#BAFFC9", "#BAE1FF", "#D1BAFF", "#FFB3E6", "#FFB3FF", "#E6B3FF"],  # Change first color to default gray
+    "theme": "",  # Path to a .qss theme file; empty uses the built-in DEFAULT_THEME
+    "library": "Main",  # Library shown at startup
+    "library_cache_mb": 64,  # Memory cap for libraries kept loaded besides the current one and Main
+    "undo_depth": 100,  # Number of undo steps kept
+    "undo_cap_mb": 32,  # Memory cap for the undo history; oldest steps are dropped first
+    "vault_check": "",  # Known text encrypted with the secret items passphrase, to verify it; empty until the first secret
+    "secret_timeout_min": 5,  # Minutes without using a secret before the derived key is forgotten
+    "compress_min_kb": 4,  # Item data at least this long is stored compressed
+    "snapshot": False,  # Keep a binary snapshot next to data.json so large libraries open without parsing it
+    "launch_timeout_s": 10,  # Seconds to wait for the browser or mail client before reporting a link as failed
+    "tray_items": 10,  # Pinned and most used items listed in the tray menu
+    "idle_trim_min": 10,  # Minutes hidden in the tray before view caches and unused libraries are released; 0 never
+    "editor_preview_kb": 2048,  # Item data longer than this opens as a read-only preview of its start in the edit dialog
+    "text_expansion": True,  # Typing an item's abbreviation in any application replaces it with the item's data
+    "backup_interval_min": 60,  # Minutes between automatic backups of every library; 0 only backs up before destructive changes
+    "backup_keep": 30,  # Backup generations kept; the oldest are dropped first
+    "sync_url": "",  # Sync server (see sync.py) the library shown is kept in step with, e.g. http://127.0.0.1:8765; empty turns sync off
+    "sync_interval_s": 60,  # Seconds between checks for changes made on other machines; changes made here are sent right away
+    "window_prewarm_s": 30,  # Seconds after startup before the main window is built while it sits in the tray; 0 builds it on first show
     "version": VERSION
 }
 BASE_DIR = os.path.dirname(os.path.abspath(sys.argv[0]))  # Use sys.argv[0] for portability
 DATA_FILE = os.path.join(BASE_DIR, "data.json")
+BACKUP_DIR = os.path.join(BASE_DIR, "backups")  # Rolling backups, see backup.py
+SYNC_STATE_FILE = os.path.join(BASE_DIR, "sync_state.json")  # Revision and digest of every item as last synced
+SYNC_TIMEOUT_S = 30
+SYNC_QUIT_WAIT_S = 1  # At quit an exchange still running gets this long before it is dropped
+BACKUP_QUIT_WAIT_S = 5  # Likewise for a backup still being written
+JUMP_TIMEOUT_MS = 1500  # After this long without another digit, a row label typed in part is used as it stands
+MAIN_LIBRARY = "Main"  # The library stored inside data.json itself
+DATA_FORMAT = 2  # 2: items may carry compressed data (see compression.py); files without "format" are 1
+USAGE_LIMIT = 500  # Items whose use count is remembered; the least used is forgotten first
+LINK_SCHEMES = ("http://", "https://", "file://", "ftp://", "mailto:")  # Item data starting with one of these is opened instead of copied
+
+
+PALETTE = list(DEFAULT_CONFIG["colors"])  # Every item color seen so far; items store an index into it
+PALETTE_INDEX = {color: index for index, color in enumerate(PALETTE)}
+PALETTE_LOCK = threading.Lock()  # Files are also parsed on the reload thread
+
+def trim_process_memory():
+    # Hand freed memory back to the system: collect cycles, then trim the working set (Windows) or the malloc arenas (glibc)
+    gc.collect()
+    try:
+        if sys.platform == "win32":
+            ctypes.windll.psapi.EmptyWorkingSet(ctypes.windll.kernel32.GetCurrentProcess())
+        else:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass  # Not glibc; the collected memory stays with the allocator
+
+def set_aside_invalid_file(path):
+    # Move a file that can't be read into the backup folder before it is overwritten; the new path, or None
+    target = os.path.join(BACKUP_DIR, f"{os.path.basename(path)}.{time.strftime('%Y%m%d-%H%M%S')}.invalid")
+    try:
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        os.replace(path, target)
+    except OSError:
+        return None
+    return target
+
+def is_link(text):
+    # Scheme prefixes are case-insensitive; a link is a single line
+    return text[:8].lower().startswith(LINK_SCHEMES) and "\n" not in text
+
+def color_index(color):
+    index = PALETTE_INDEX.get(color)
+    if index is None:
+        with PALETTE_LOCK:
+            index = PALETTE_INDEX.get(color)
+            if index is None:
+                index = PALETTE_INDEX[color] = len(PALETTE)
+                PALETTE.append(color)
+    return index
+
+class Item:
+    # Compact library item: slots instead of a dict, the color as a palette index and the name
+    # interned. Reads and writes like the item dict it replaces (item["name"], item.get("secret"),
+    # dict(item, ...)); keys other than id, name, data and color are kept in extra.
+    __slots__ = ("id", "name", "data", "color_index", "extra")
+    FIELDS = ("id", "name", "data", "color")
+
+    def __init__(self, id, name, data, color, extra=None):
+        self.id = id
+        self.name = sys.intern(name)
+        self.data = data
+        self.color_index = color_index(color)
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, value):
+        # Called for every item read from a file, so the slots are filled directly instead of through __init__
+        item = cls.__new__(cls)
+        item.id = value.get("id")
+        item.name = sys.intern(value.get("name", ""))
+        item.data = value.get("data", "")
+        color = value.get("color", DEFAULT_CONFIG["colors"][0])
+        index = PALETTE_INDEX.get(color)
+        item.color_index = index if index is not None else color_index(color)
+        item.extra = None
+        if len(value) != 4 or not ("id" in value and "name" in value and "data" in value and "color" in value):
+            item.extra = {key: field for key, field in value.items() if key not in cls.FIELDS} or None
+        return item
+
+    def to_dict(self):
+        # Also the json.dump default, so item lists are written without converting them first
+        value = {"id": self.id, "name": self.name, "data": self.data, "color": PALETTE[self.color_index]}
+        if self.extra:
+            value.update(self.extra)
+        return value
+
+    def __getitem__(self, key):
+        if key == "color":
+            return PALETTE[self.color_index]
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        # Only used while an item is being read in (ensure_ids); library items are replaced, not changed
+        if key == "color":
+            self.color_index = color_index(value)
+        elif key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            self.extra = dict(self.extra or {}, **{key: value})
+
+    def __contains__(self, key):
+        return key in self.FIELDS or bool(self.extra) and key in self.extra
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return self.FIELDS + tuple(self.extra or ())
+
+    def __eq__(self, other):
+        if isinstance(other, Item):
+            return (self.id, self.name, self.data, self.color_index, self.extra) == (other.id, other.name, other.data, other.color_index, other.extra)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    @classmethod
+    def from_row(cls, item_id, row):
+        # Build an item from a snapshot row (name, data, color, extra)
+        name, data, color, extra = row
+        return cls(item_id, name, data, color, extra)
+
+def to_item(value):
+    return value if isinstance(value, Item) else Item.from_dict(value)
+
+def item_size(item):
+    # Approximate bytes held by one item; the palette and interned names are shared and not counted
+    size = sys.getsizeof(item) + sys.getsizeof(item.id) + sys.getsizeof(item.data)
+    if item.extra:
+        size += sys.getsizeof(item.extra) + sum(sys.getsizeof(value) for value in item.extra.values())
+    return size
+
+def pack_item(item, min_size):
+    # Return the item with its data compressed when that is long enough and worth it; secrets stay as they are
+    if item.get("secret", False) or "packed" in item or len(item.get("data", "")) < min_size:
+        return item
+    packed = compression.pack(item["data"])
+    if packed is None:
+        return item
+    return dict(item, data=packed[1], packed=packed[0])
+
+def pack_items(items, min_size):
+    # Pack in place the long items of a file from before compression; returns whether any changed
+    changed = False
+    for index, item in enumerate(items):
+        packed = pack_item(item, min_size)
+        if packed is not item:
+            items[index] = packed
+            changed = True
+    return changed
+
+def abbreviation_index(items):
+    # Abbreviation -> item id, saved next to each library's name index so unloaded libraries still expand
+    return {item["abbreviation"]: item["id"] for item in items if "abbreviation" in item}
+
+def new_item_id():
+    return uuid.uuid4().hex[:16]
+
+def ids_complete(items):
+    # Whether every item already has an id of its own, so ensure_ids would change nothing
+    ids = [item.get("id") for item in items]
+    return all(ids) and len(set(ids)) == len(ids)
+
+def ensure_ids(items, known=(), taken=None):
+    # Give every item a unique persistent id. Items written before ids existed take the id of an
+    # identical known item when there is one, so older files still line up with the library in memory.
+    taken = set() if taken is None else taken
+    unclaimed = {}
+    for item in known:
+        unclaimed.setdefault((item["name"], item["data"], item["color"]), []).append(item["id"])
+    for item in items:
+        if item.get("id") in taken or not item.get("id"):
+            ids = unclaimed.get((item.get("name"), item.get("data"), item.get("color")))  # Colors are filled in later when missing
+            while ids and ids[-1] in taken:
+                ids.pop()
+            item["id"] = ids.pop() if ids else new_item_id()
+        taken.add(item["id"])
+    return taken
+
+def diff_items(old, new):
+    # Hunks (old_start, old_end, new_items) that turn the old item list into the new one; rows are matched by id
+    matcher = SequenceMatcher(None, [item["id"] for item in old], [item["id"] for item in new], autojunk=False)
+    hunks = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            hunks.append((i1, i2, new[j1:j2]))
+        else:
+            hunks += [(i1 + k, i1 + k + 1, [new[j1 + k]]) for k in range(i2 - i1) if old[i1 + k] != new[j1 + k]]
+    return hunks
+
+def merge_items(base, local, remote, keep_local=True):
+    # Three-way merge by item id against the last version both sides agreed on.
+    # Returns the merged list and how many items were changed differently on both sides.
+    if local == base:
+        return remote, 0
+    if remote == base:
+        return local, 0
+    base_by_id = {item["id"]: item for item in base}
+    local_by_id = {item["id"]: item for item in local}
+    remote_by_id = {item["id"]: item for item in remote}
+    conflicts = 0
+    resolved = {}
+    for item_id in base_by_id.keys() | local_by_id.keys() | remote_by_id.keys():
+        original, mine, theirs = base_by_id.get(item_id), local_by_id.get(item_id), remote_by_id.get(item_id)
+        if mine == theirs or theirs == original:
+            value = mine
+        elif mine == original:
+            value = theirs
+        else:
+            conflicts += 1
+            value = mine if keep_local else theirs
+        if value is not None:
+            resolved[item_id] = value
+
+    # Keep the order of the side that reordered items, then slot in what only the other side has
+    def reordered(items, by_id):
+        return [item["id"] for item in items if item["id"] in base_by_id] != [item["id"] for item in base if item["id"] in by_id]
+    primary, secondary = (local, remote) if reordered(local, local_by_id) else (remote, local)
+    order = [item["id"] for item in primary if item["id"] in resolved]
+    placed = set(order)
+    extras = {}  # Id already in order (None for the top) -> ids only the other side has, placed right after it
+    anchor = None
+    for item in secondary:
+        if item["id"] in placed:
+            anchor = item["id"]
+        elif item["id"] in resolved:
+            extras.setdefault(anchor, []).append(item["id"])
+    order = extras.get(None, []) + [following for item_id in order for following in [item_id] + extras.get(item_id, [])]
+    return [resolved[item_id] for item_id in order], conflicts
+
+def snapshot_path():
+    return os.path.splitext(DATA_FILE)[0] + ".snapshot"
+
+def read_library_file(path, known=()):
+    # Parse a data file and return its settings dict, its items and whether they all had ids (else the file
+    # should be written, so the ids made up here last); raises OSError or ValueError
+    with open(path, "r") as f:
+        file_data = json.load(f)
+    if not isinstance(file_data, dict) or not isinstance(file_data.get("data", []), list):
+        raise ValueError("Data must be a dictionary with a 'data' list.")
+    if file_data.get("format", 1) > DATA_FORMAT:
+        raise ValueError("The file was written by a newer version of MyMultiClipboard.")
+    items = file_data.get("data", [])
+    complete = ids_complete(items)
+    ensure_ids(items, known)  # On the parsed dicts, where key lookups are cheapest
+    return file_data, [to_item(item) for item in items], complete  # Missing colors default to the first one
+
+class FileReloadThread(QtCore.QThread):
+    # Parses a changed data.json and merges it with a snapshot of the in-memory items, off the GUI thread
+    reloaded = QtCore.pyqtSignal(object)
+
+    def __init__(self, path, base, local, revision):
+        super().__init__()
+        self.path = path
+        self.base = base
+        self.local = local
+        self.revision = revision
+
+    def run(self):
+        try:
+            stat = os.stat(self.path)
+            file_data, remote, complete = read_library_file(self.path, self.base)
+        except (OSError, ValueError):
+            self.reloaded.emit(None)  # Missing or half-written file; the watcher reports the next write
+            return
+        merged, conflicts = merge_items(self.base, self.local, remote)
+        self.reloaded.emit({
+            "revision": self.revision,
+            "state": (stat.st_mtime_ns, stat.st_size),
+            "remote": remote,
+            "merged": merged,
+            "conflicts": conflicts,
+            "hunks": diff_items(self.local, merged)
+        })
+
+class SnapshotThread(QtCore.QThread):
+    # Rebuilds the binary snapshot from data.json as it is on disk, off the GUI thread. known are the Main items
+    # in memory: items written without ids take theirs, so the snapshot lines up with what the app holds
+    def __init__(self, path, target, known=()):
+        super().__init__()
+        self.path = path
+        self.target = target
+        self.known = known
+
+    def run(self):
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            file_data = json.loads(raw)
+            settings = {key: value for key, value in file_data.items() if key != "data"}
+            items = file_data.get("data", [])
+            ensure_ids(items, self.known)  # Files from before ids existed; the save load_data asked for writes them soon
+            if settings.get("abbreviations") is None:
+                settings["abbreviations"] = abbreviation_index(items)  # So a start from the snapshot never builds it from the rows
+            if not write_snapshot(self.target, checksum(raw), settings, items, DEFAULT_CONFIG["colors"][0]):
+                os.remove(self.target)  # Items it can't hold; a stale snapshot would be ignored anyway
+        except Exception:
+            pass  # Half-written data.json or unusual items: the snapshot is optional and the next save tries again
+
+def finish_or_abandon(target, args, stopping, grace):
+    # Run target on a daemon thread and wait for it. Once stopping is set it gets grace more seconds, after
+    # which it is left to end with the process; False then
+    worker = threading.Thread(target=target, args=args, daemon=True)
+    worker.start()
+    while worker.is_alive() and not stopping.is_set():
+        worker.join(0.1)
+    worker.join(grace)
+    return not worker.is_alive()
+
+class BackupThread(QtCore.QThread):
+    # Writes backup generations and reads them back for a restore, one job at a time, off the GUI thread.
+    # Loaded libraries are handed over as copies of their item lists, taken when the backup was asked for;
+    # the others are given as their file, read here
+    backed_up = QtCore.pyqtSignal(object)  # Summary of the new generation, None when nothing changed since the last one
+    restored = QtCore.pyqtSignal(str, str, object)  # Generation, library name and its items then (None when it had none)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, folder, keep):
+        super().__init__()
+        self.folder = folder
+        self.keep = keep
+        self.jobs = queue.Queue()
+        self.stopping = threading.Event()
+
+    def back_up(self, reason, sources):
+        self.jobs.put(("backup", reason, sources))
+
+    def restore(self, generation, name):
+        self.jobs.put(("restore", generation, name))
+
+    def pending(self):
+        return self.jobs.qsize()
+
+    def stop(self):
+        # Backups taken before a destructive change are still written as long as BACKUP_QUIT_WAIT_S allows;
+        # queued scheduled backups and restores are dropped
+        self.stopping.set()
+        self.jobs.put(None)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            if self.stopping.is_set() and (job[0] == "restore" or job[1] == "scheduled"):
+                continue
+            # Chunks, manifest and index are each written atomically, so an abandoned generation only leaves chunks the next prune drops
+            if not finish_or_abandon(self.run_job, (job,), self.stopping, BACKUP_QUIT_WAIT_S):
+                return
+
+    def run_job(self, job):
+        try:
+            if job[0] == "backup":
+                libraries = [(name, file, self.read_source(source)) for name, file, source in job[2]]
+                self.backed_up.emit(backup.write_generation(self.folder, job[1], libraries, Item.to_dict))
+                backup.prune(self.folder, self.keep)
+            else:
+                self.restored.emit(job[1], job[2], backup.read_generation(self.folder, job[1], job[2]))
+        except (OSError, ValueError, KeyError) as e:
+            self.failed.emit(f"{'Backup' if job[0] == 'backup' else 'Restore'} failed: {str(e)}")
+
+    def read_source(self, source):
+        if not isinstance(source, str):
+            return source
+        for attempt in range(3):
+            try:
+                with open(source, "r") as f:
+                    return json.load(f).get("data", [])
+            except FileNotFoundError:
+                return []  # A library that was never saved
+            except ValueError:
+                if attempt == 2:
+                    raise
+                time.sleep(0.2)  # Caught while it was being written; the write finishes shortly
+
+class SyncThread(QtCore.QThread):
+    # Exchanges the shown library's changes with the sync server (sync.py), one job at a time off the GUI thread.
+    # It owns the sync state: the state after an exchange is kept, and written to its file, only once the GUI
+    # thread has applied the result, so a result dropped there is simply fetched again
+    synced = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, url, path):
+        super().__init__()
+        self.url = url
+        self.path = path
+        self.jobs = queue.Queue()
+        self.state = None  # Read with the first job
+        self.stopping = threading.Event()
+
+    def sync(self, job):
+        self.jobs.put(("sync", job))
+
+    def commit(self, name, entry):
+        self.jobs.put(("commit", (name, entry)))
+
+    def stop(self):
+        # Commits already queued are still written; queued exchanges are dropped, and one still running gets
+        # SYNC_QUIT_WAIT_S. A dropped exchange is redone on the next start: its state was never committed
+        self.stopping.set()
+        self.jobs.put(None)
 
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            kind, job = job
+            if self.state is None:
+                self.state = self.read_state()
+            if kind == "commit":
+                try:
+                    self.state["libraries"][job[0]] = job[1]
+                    with open(self.path + ".tmp", "w") as f:
+                        json.dump(self.state, f)
+                    os.replace(self.path + ".tmp", self.path)
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    self.failed.emit(f"Sync with {self.url} failed: {str(e)}")
+            elif not self.stopping.is_set():
+                finish_or_abandon(self.exchange, (job,), self.stopping, SYNC_QUIT_WAIT_S)
+
+    def exchange(self, job):
+        try:
+            start = time.perf_counter()
+            items = job["items"]
+            merged, entry, conflicts, transferred = sync.sync_library(self.url, job["name"], items, self.state["libraries"].get(job["name"], {}),
+                                                                      job["synced"], job["resolved"], Item.to_dict, SYNC_TIMEOUT_S)
+            hunks = []
+            if merged is not items:
+                merged = [to_item(item) for item in merged]
+                hunks = diff_items(items, merged)
+            self.synced.emit(dict(job, items=None, entry=entry, conflicts=conflicts, transferred=transferred, hunks=hunks,
+                                  synced=None if conflicts else merged,  # Items left in conflict don't match their sync state
+                                  seconds=time.perf_counter() - start))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.failed.emit(f"Sync with {self.url} failed: {str(e)}")
+
+    def read_state(self):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        if not isinstance(state, dict) or state.get("url") != self.url:
+            state = {"url": self.url, "libraries": {}}  # Another server: everything is sent once, and merged item by item
+        return state
+
+class LauncherThread(QtCore.QThread):
+    # Opens links one at a time, off the GUI thread. The browser controller is resolved once, here on the
+    # launcher thread, since webbrowser.get() probes the system for browsers; each open gets a timeout, so a
+    # browser that never returns doesn't hold up the links after it. An opener that timed out can't be
+    # killed, so while it is still stuck further links fail at once instead of piling up threads behind it
+    failed = QtCore.pyqtSignal(str, str)  # Link, error message
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+        self.requests = queue.Queue()
+        self.browser = None
+        self.stuck = None  # The opener that last timed out, while it may still be running
+
+    def launch(self, target):
+        # Safe from any thread
+        self.requests.put(target)
+
+    def stop(self):
+        self.requests.put(None)
+
+    def run(self):
+        while True:
+            target = self.requests.get()
+            if target is None:
+                return
+            if self.stuck is not None and self.stuck.is_alive():
+                self.failed.emit(target, "The browser has not returned from an earlier link yet.")
+                continue
+            if self.browser is None:
+                try:
+                    self.browser = webbrowser.get()
+                except webbrowser.Error as e:
+                    self.failed.emit(target, str(e))
+                    continue
+            result = []
+            opener = threading.Thread(target=self.open_target, args=(self.browser, target, result), daemon=True)
+            opener.start()
+            opener.join(self.timeout)
+            if opener.is_alive():
+                self.stuck = opener
+                self.failed.emit(target, f"No response after {self.timeout} seconds.")
+            elif result[0]:
+                self.failed.emit(target, result[0])
+
+    def open_target(self, browser, target, result):
+        try:
+            result.append("" if browser.open(target) else "No application accepted the link.")
+        except Exception as e:  # OSError from the spawned command, ...
+            result.append(str(e) or type(e).__name__)
 
 class FocusThread(QtCore.QThread):
     def __init__(self, window):
@@ -54,7 +590,11 @@ class ResizeHandle(QtWidgets.QWidget):
         self.start_pos = None
 
     def paintEvent(self, event):
+        # The grip comes from the window's chrome cache, rendered once per size and pixel ratio
         painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.window().cached_chrome("grip", self, self.render_grip))
+
+    def render_grip(self, painter):
         pen = painter.pen()
         pen.setColor(Qt.gray)  # Change color to gray
         pen.setWidth(2)
@@ -83,15 +623,471 @@ class ResizeHandle(QtWidgets.QWidget):
             self.parent().save_data()  # Save the window size after resizing
             event.accept()
 
+def label_width(count):
+    # Hex digits needed to label rows 0 to count - 1: 1 up to 16 rows, 2 up to 256, ...
+    return len(f"{max(count - 1, 0):X}")
+
+class LibraryModel(QtCore.QAbstractListModel):
+    # List model over a list of item ids resolved through the library's id registry;
+    # switching libraries swaps models on the same view
+    def __init__(self, ids, by_id, parent=None):
+        super().__init__(parent)
+        self.ids = ids
+        self.by_id = by_id
+        self.colors = {}  # Palette index -> QColor, shared by every row using that color
+        self.label_width = label_width(len(ids))  # Hex digits in every row's label, kept as rows come and go
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        item = self.by_id[self.ids[row]]
+        if role == Qt.DisplayRole:
+            return f"{row:0{self.label_width}X} {item.name}"  # Hex label typed with Ctrl to jump to the row
+        if role == Qt.BackgroundRole:
+            color = self.colors.get(item.color_index)
+            if color is None:
+                color = self.colors[item.color_index] = QColor(PALETTE[item.color_index])
+            return color
+        return None
+
+    def set_ids(self, ids):
+        self.beginResetModel()
+        self.ids = ids
+        self.label_width = label_width(len(ids))
+        self.endResetModel()
+
+    def row_of(self, item_id):
+        try:
+            return self.ids.index(item_id)
+        except ValueError:
+            return -1
+
+    def labels_shifted(self, first, last=None):
+        # Rows first to last (the end by default) show a different hex label after an insert, remove or move;
+        # every row does when the row count crossed a power of 16 and the labels gained or lost a digit
+        width = label_width(len(self.ids))
+        if width != self.label_width:
+            self.label_width = width
+            first, last = 0, None
+        last = len(self.ids) - 1 if last is None else last
+        if first <= last:
+            self.dataChanged.emit(self.index(first), self.index(last))
+
+    def insert_ids(self, row, ids):
+        self.beginInsertRows(QtCore.QModelIndex(), row, row + len(ids) - 1)
+        self.ids[row:row] = ids
+        self.endInsertRows()
+        self.labels_shifted(row)
+
+    def remove_rows(self, row, count):
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row + count - 1)
+        del self.ids[row:row + count]
+        self.endRemoveRows()
+        self.labels_shifted(row)
+
+    def move_row(self, source, target):
+        self.beginMoveRows(QtCore.QModelIndex(), source, source, QtCore.QModelIndex(), target + 1 if target > source else target)
+        self.ids.insert(target, self.ids.pop(source))
+        self.endMoveRows()
+        self.labels_shifted(min(source, target), max(source, target))
+
+    def item_changed(self, row):
+        self.dataChanged.emit(self.index(row), self.index(row))
+
+    def replace_rows(self, start, end, ids):
+        # Apply one diff hunk: rows keeping their id change in place, the rest are removed or inserted
+        if self.ids[start:end] == ids:
+            for row in range(start, end):
+                self.item_changed(row)
+            return
+        if end > start:
+            self.remove_rows(start, end - start)
+        if ids:
+            self.insert_ids(start, ids)
+
+class RowDelegate(QtWidgets.QStyledItemDelegate):
+    # Paints a row as its item color with the theme's text and selection border colors
+    def paint(self, painter, option, index):
+        view = option.widget
+        painter.save()
+        painter.fillRect(option.rect, index.data(Qt.BackgroundRole))
+        font = QFont(option.font)
+        if option.state & QtWidgets.QStyle.State_Selected:
+            font.setBold(True)
+            painter.setPen(view.selection_border_color)
+            painter.drawRect(option.rect.adjusted(0, 0, -1, -1))
+        painter.setFont(font)
+        painter.setPen(view.row_text_color)
+        painter.drawText(option.rect.adjusted(3, 0, 0, 0), Qt.AlignLeft | Qt.AlignVCenter, index.data(Qt.DisplayRole))
+        painter.restore()
+
+class DataEditor(QtWidgets.QPlainTextEdit):
+    # Multi-line editor for item data. Big payloads go in one chunk per event-loop pass, so the dialog opens
+    # at once; past the preview limit only the start is shown, read-only, until edit_all() loads the rest
+    CHUNK_SIZE = 256 * 1024
+    PREVIEW_SIZE = 64 * 1024
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.source = ""  # The text as loaded; the document holds only part of it while loading or previewing
+        self.position = 0  # Length of source already in the document
+        self.previewing = False
+        self.chunk_timer = QtCore.QTimer(self)
+        self.chunk_timer.timeout.connect(self.load_chunk)
+
+    def load(self, text, preview_limit):
+        self.chunk_timer.stop()
+        self.source = text
+        self.previewing = len(text) > preview_limit
+        self.setUndoRedoEnabled(False)  # Loading is not an edit to undo
+        self.setReadOnly(True)  # Until every chunk is in, so typing can't land between them
+        if self.previewing:
+            self.setPlainText(text[:self.PREVIEW_SIZE])
+            self.document().setModified(False)
+        else:
+            self.position = 0
+            self.setPlainText("")
+            self.load_chunk()
+
+    def edit_all(self):
+        self.previewing = False
+        self.position = 0
+        self.setPlainText("")
+        self.load_chunk()
+
+    def load_chunk(self):
+        end = self.position + self.CHUNK_SIZE
+        if self.source[end - 1:end] == "\r":
+            end += 1  # Keep a \r\n pair in one chunk
+        cursor = QtGui.QTextCursor(self.document())
+        cursor.movePosition(QtGui.QTextCursor.End)
+        cursor.insertText(self.source[self.position:end])
+        self.document().setModified(False)  # Loading is no edit, so text() stays source while the rest comes in
+        self.position = end
+        if self.position < len(self.source):
+            if not self.chunk_timer.isActive():
+                self.chunk_timer.start(0)
+            return
+        self.chunk_timer.stop()
+        self.setReadOnly(False)
+        self.setUndoRedoEnabled(True)
+        self.moveCursor(QtGui.QTextCursor.Start)
+
+    def finish_loading(self):
+        while self.chunk_timer.isActive():
+            self.load_chunk()
+
+    def unchanged(self):
+        # True while the text is still exactly source: previewed, partly loaded or loaded and not edited
+        return not self.document().isModified()
+
+    def text(self):
+        return self.source if self.unchanged() else self.toPlainText()
+
+class ItemListView(QtWidgets.QListView):
+    # QListView with the row helpers the window used from QListWidget
+    rowSelectionChanged = QtCore.pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.row_text_color = QColor("#00008B")
+        self.selection_border_color = QColor("red")
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QtWidgets.QListView.Batched)  # Lay out big libraries in steps so switching shows the first rows at once
+        self.setBatchSize(500)
+        self.setItemDelegate(RowDelegate(self))
+
+    def get_row_text_color(self):
+        return self.row_text_color
+
+    def set_row_text_color(self, color):
+        self.row_text_color = QColor(color)
+        self.viewport().update()
+
+    def get_selection_border_color(self):
+        return self.selection_border_color
+
+    def set_selection_border_color(self, color):
+        self.selection_border_color = QColor(color)
+        self.viewport().update()
+
+    # Set from the theme stylesheet through qproperty-rowTextColor and qproperty-selectionBorderColor
+    rowTextColor = QtCore.pyqtProperty(QColor, get_row_text_color, set_row_text_color)
+    selectionBorderColor = QtCore.pyqtProperty(QColor, get_selection_border_color, set_selection_border_color)
+
+    def selectionChanged(self, selected, deselected):
+        super().selectionChanged(selected, deselected)
+        self.rowSelectionChanged.emit()
+
+    def count(self):
+        return self.model().rowCount() if self.model() is not None else 0
+
+    def currentRow(self):
+        index = self.currentIndex()
+        return index.row() if index.isValid() else -1
+
+    def setCurrentRow(self, row):
+        if 0 <= row < self.count():
+            self.setCurrentIndex(self.model().index(row, 0))
+
+class Library:
+    # A named item list kept in its own JSON file and loaded the first time it is opened
+    def __init__(self, name, file, names=None, abbreviations=None):
+        self.name = name
+        self.file = file  # Empty for the main library, whose items live in data.json
+        self.names = names or []  # Search index of item names, usable while the items are unloaded
+        self.abbreviations = abbreviations or {}  # Index of item abbreviations, likewise
+        self._items = None
+        self.snapshot = None  # Open snapshot the items are decoded from until the whole list is needed
+        self.opened_items = None  # The item list as decoded from the snapshot, before any change
+        self.by_id = {}  # Id registry of the loaded items
+        self.model = None
+        self.selected_index = -1
+        self.size = 0  # Approximate bytes held by the loaded items
+        self.templates = {}  # Item id -> (item, compiled template or None) for items used so far
+
+    def path(self):
+        return os.path.join(BASE_DIR, self.file) if self.file else DATA_FILE
+
+    @property
+    def items(self):
+        if self.snapshot is not None:
+            self.materialize()
+        return self._items
+
+    @items.setter
+    def items(self, items):
+        self._items = items
+
+    def set_items(self, items, parent):
+        # Take over a loaded item list with ids: store it compactly in place, register the ids and build the list model
+        items[:] = [to_item(item) for item in items]
+        self.items = items
+        self.by_id = {item["id"]: item for item in items}
+        self.model = LibraryModel([item["id"] for item in items], self.by_id, parent)
+        self.measure()
+
+    def set_snapshot(self, snapshot, parent):
+        # Open on a snapshot: the id column is read at once, items are decoded as their rows are looked up
+        ids = snapshot.ids()
+        self.snapshot = snapshot
+        self._items = None
+        self.by_id = SnapshotRegistry(snapshot, ids)
+        self.model = LibraryModel(list(ids), self.by_id, parent)
+        self.size = snapshot.size
+
+    def lookup(self, item_id):
+        # The item with this id, or None when it isn't here or the library isn't loaded
+        try:
+            return self.by_id[item_id]
+        except KeyError:
+            return None
+
+    def items_to_write(self):
+        # Saving only settings must not decode the whole library
+        return SnapshotRows(self.by_id) if self.snapshot is not None else self.items
+
+    def materialize(self):
+        # Something needs the whole list (a change, a save, a merge): decode the remaining rows and release the mapping
+        snapshot, self.snapshot = self.snapshot, None
+        self._items = [self.by_id[item_id] for item_id in self.by_id.ids]
+        self.opened_items = list(self._items)
+        self.by_id.close()
+        snapshot.close()
+        self.measure()
+
+    def unload(self):
+        self.items = None
+        self.by_id = {}
+        self.model = None
+        self.size = 0
+        self.templates = {}
+
+    def measure(self):
+        self.size = sum(item_size(item) for item in self.items)
+
+class SnapshotRegistry(dict):
+    # Id registry of a library opened from a snapshot: an item is decoded the first time it is looked up
+    def __init__(self, snapshot, ids):
+        super().__init__()
+        self.snapshot = snapshot
+        self.ids = ids
+        self.rows = dict(zip(ids, range(len(ids))))
+
+    def __missing__(self, item_id):
+        row = self.rows.get(item_id)
+        if row is None:
+            raise KeyError(item_id)
+        item = self[item_id] = Item.from_row(item_id, self.snapshot.row(row))
+        return item
+
+    def decoded(self, item_id):
+        # The item without keeping it, for walking every row once
+        item = dict.get(self, item_id)
+        return item if item is not None else Item.from_row(item_id, self.snapshot.row(self.rows[item_id]))
+
+    def close(self):
+        # Every row is decoded by now; from here on this is a plain registry
+        self.snapshot = None
+        self.rows = {}
+
+class SnapshotRows(list):
+    # Stands in for the item list of a library still backed by its snapshot when data.json is written:
+    # json.dump walks it through __iter__, so rows are decoded one by one and not kept
+    def __init__(self, registry):
+        super().__init__()
+        self.registry = registry
+
+    def __len__(self):
+        return len(self.registry.ids)
+
+    def __iter__(self):
+        return (self.registry.decoded(item_id) for item_id in self.registry.ids)
+
+class UndoEntry:
+    # One undoable action: the operations that revert it, in the order they must run
+    def __init__(self, label, library, ops):
+        self.label = label
+        self.library = library
+        self.ops = ops
+        # Item references cost a pointer; items only the history still holds (removed or overwritten) count in full
+        self.size = 64
+        for op in ops:
+            if op[0] == "insert":
+                self.size += sum(item_size(item) for item in op[2])
+            elif op[0] == "remove":
+                self.size += 8 * len(op[2])
+            elif op[0] == "replace":
+                self.size += item_size(op[2])
+
+class UndoHistory:
+    # Undo and redo stacks of inverse item operations, bounded by step count and approximate bytes
+    def __init__(self, depth, byte_cap):
+        self.depth = depth
+        self.byte_cap = byte_cap
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.size = 0
+
+    def record(self, entry):
+        self.redo_stack.clear()
+        self.push_undo(entry)
+
+    def push_undo(self, entry):
+        self.undo_stack.append(entry)
+        self.size += entry.size
+        while self.undo_stack and (len(self.undo_stack) > self.depth or self.size > self.byte_cap):
+            self.size -= self.undo_stack.popleft().size
+
+    def pop_undo(self):
+        entry = self.undo_stack.pop()
+        self.size -= entry.size
+        return entry
+
+    def forget(self, library):
+        # Row positions recorded for this library are no longer valid
+        self.undo_stack = deque(entry for entry in self.undo_stack if entry.library != library)
+        self.redo_stack = [entry for entry in self.redo_stack if entry.library != library]
+        self.size = sum(entry.size for entry in self.undo_stack)
+
 class PopupApp(QtWidgets.QWidget):
-    def __init__(self, config):
+    abbreviation_typed = QtCore.pyqtSignal(object)  # (abbreviation, library name, item id), from the keyboard hook thread
+    template_failed = QtCore.pyqtSignal(str)  # A template used as written since it couldn't be filled in, from whichever thread tried
+    hotkey_pressed = QtCore.pyqtSignal()  # From the keyboard hook thread; the window may still have to be built, which only the GUI thread can do
+
+    def __init__(self, config, snapshot=None):
         super().__init__()
         self.config = config
-        self.data = []
-        self.filtered_data = []
+        self.filtered_ids = []  # Ids of the rows shown, shared with the list model
         self.selected_index = -1
-        self.load_data()
-        self.init_ui()
+        self.libraries = []  # Every known Library, in switcher order; Main is first and always loaded
+        self.loaded_libraries = OrderedDict()  # Other loaded libraries, least recently used first
+        self.library = None  # Library currently shown
+        self.disk_items = []  # Main items as last read from or written to data.json, the base for merging
+        self.disk_state = None  # (mtime, size) of data.json at that point, to tell our own writes from others
+        self.data_revision = 0  # Bumped on every save, so reload results computed from older data are dropped
+        self.reload_thread = None
+        self.reload_pending = False
+        self.edit_popup = None  # Add/edit dialog, built on first use
+        self.edit_popup_id = None  # Id of the item being edited, None when adding
+        self.edit_popup_data = None  # Data the dialog was opened with
+        self.hotkey_dialog = None  # Hotkey dialog, built on first use
+        self._border_color = QColor(119, 221, 119)  # Window chrome colors, overridden by the theme's qproperties
+        self._background_color = QColor(102, 153, 153)
+        self._title_color = QColor(0, 128, 96)
+        self.chrome_cache = {}  # (part, width, height, device pixel ratio) -> pre-rendered QPixmap
+        self.title_font = QFont("Arial", 12)
+        self.title_font.setBold(True)
+        self.snapshot_thread = None
+        self.snapshot_pending = False
+        self.snapshot_timer = QtCore.QTimer(self)  # Rebuilds the snapshot once saves have settled
+        self.snapshot_timer.setSingleShot(True)
+        self.snapshot_timer.setInterval(2000)
+        self.snapshot_timer.timeout.connect(self.start_snapshot)
+        self.matcher = None  # Abbreviation automaton the keyboard hook feeds; replaced whole when an index changes
+        self.abbreviation_owners = {}  # Abbreviation -> (library name, item id)
+        self.held_modifiers = set()  # Ctrl, Alt and Windows keys held down: keys typed with them are shortcuts, not text
+        self.clicked = False  # Set by the mouse listener; the hook thread resets the automaton on its next key
+        self.abbreviation_typed.connect(self.expand_abbreviation)
+        self.hotkey_pressed.connect(self.show_and_focus)
+        self.template_failed.connect(self.report_template_error)
+        self.load_data(snapshot)
+        self.history = UndoHistory(self.config["undo_depth"], self.config["undo_cap_mb"] * 1024 * 1024)
+        self.vault_keys = {}  # Salt -> AES-GCM key derived for it, kept until the secrets go unused for a while
+        self.vault_timer = QtCore.QTimer(self)
+        self.vault_timer.setSingleShot(True)
+        self.vault_timer.setInterval(self.config["secret_timeout_min"] * 60 * 1000)
+        self.vault_timer.timeout.connect(self.vault_keys.clear)
+        self.launcher = LauncherThread(self.config["launch_timeout_s"])  # Opens links; started with the app, idle until used
+        self.launcher.failed.connect(self.report_launch_error)
+        self.launcher.start()
+        self.usage_dirty = False  # Use counts changed since data.json was last written
+        self.tray_items = None  # (id, name, pinned) entries listed in the tray menu; None once the libraries changed
+        self.tray_entries = []  # Their actions in the tray menu
+        self.trimmed = False  # View caches were released while hidden; the next show rebuilds them
+        self.idle_timer = QtCore.QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self.trim_idle)
+        self.backups = BackupThread(BACKUP_DIR, self.config["backup_keep"])
+        self.backups.restored.connect(self.apply_restore)
+        self.backups.failed.connect(self.report_backup_error)
+        self.backups.start()
+        self.backup_revision = None  # data_revision at the last scheduled backup, to skip ticks without changes
+        self.backup_timer = QtCore.QTimer(self)
+        self.backup_timer.timeout.connect(self.run_backup)
+        if self.config["backup_interval_min"] > 0:
+            QtCore.QTimer.singleShot(60 * 1000, self.run_backup)  # What this session starts from, once startup has settled
+            self.backup_timer.start(self.config["backup_interval_min"] * 60 * 1000)
+        self.syncer = None
+        self.sync_busy = False
+        self.sync_pending = False
+        self.sync_failing = False  # Reported once until a sync succeeds again
+        self.sync_synced = {}  # Library name -> its item list as last synced, so only the items replaced since are looked at
+        self.sync_timer = QtCore.QTimer(self)  # Asks the server for changes made elsewhere
+        self.sync_timer.timeout.connect(self.start_sync)
+        self.sync_soon = QtCore.QTimer(self)  # Sends changes made here once saves have settled
+        self.sync_soon.setSingleShot(True)
+        self.sync_soon.setInterval(1000)
+        self.sync_soon.timeout.connect(self.start_sync)
+        if self.config["sync_url"]:
+            self.syncer = SyncThread(self.config["sync_url"], SYNC_STATE_FILE)
+            self.syncer.synced.connect(self.apply_sync)
+            self.syncer.failed.connect(self.report_sync_error)
+            self.syncer.start()
+            self.sync_soon.start()
+            self.sync_timer.start(self.config["sync_interval_s"] * 1000)
+        self.apply_theme()
+        self.jump_keys = ""  # Digits of a row label typed so far, see jump_key
+        self.window_built = False  # Widgets are built on first show or by the prewarm timer, so startup only costs the tray icon
+        if self.config["window_prewarm_s"] > 0:
+            QtCore.QTimer.singleShot(self.config["window_prewarm_s"] * 1000, self.build_window)
+        self.start_file_watcher()
+        if self.save_needed:
+            self.save_data()
         self.tray_icon = None
         self.is_dragging = False
         self.drag_position = None
@@ -99,11 +1095,70 @@ class PopupApp(QtWidgets.QWidget):
         # self.setWindowTitle("MyMultiClipboard")
         # self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)  # Keep the window on top        
 
+    def get_border_color(self):
+        return self._border_color
+
+    def set_border_color(self, color):
+        self._border_color = QColor(color)
+        self.invalidate_chrome()
+
+    def get_background_color(self):
+        return self._background_color
+
+    def set_background_color(self, color):
+        self._background_color = QColor(color)
+        self.invalidate_chrome()
+
+    def get_title_color(self):
+        return self._title_color
+
+    def set_title_color(self, color):
+        self._title_color = QColor(color)
+        self.invalidate_chrome()
+
+    # Set from the theme stylesheet through qproperty-borderColor etc.
+    borderColor = QtCore.pyqtProperty(QColor, get_border_color, set_border_color)
+    backgroundColor = QtCore.pyqtProperty(QColor, get_background_color, set_background_color)
+    titleColor = QtCore.pyqtProperty(QColor, get_title_color, set_title_color)
+
+    @property
+    def data(self):
+        # Items of the current library, in order
+        return self.library.items if self.library is not None else []
+
     def quit(self):
         #Quit the program."""
+        self.shutdown()
         QtWidgets.QApplication.quit()
 
-    def load_data(self):
+    def shutdown(self):
+        # Let a link being opened finish, but don't wait on a browser that hangs; keep the use counts.
+        # The worker threads are all stopped first, so their waits overlap: a backup still being written
+        # gets BACKUP_QUIT_WAIT_S and an exchange with the sync server SYNC_QUIT_WAIT_S
+        self.launcher.stop()
+        self.backups.stop()
+        if self.syncer is not None:
+            self.syncer.stop()
+        self.launcher.wait(self.config["launch_timeout_s"] * 1000)
+        if self.usage_dirty:
+            self.save_data()
+        self.backups.wait()
+        if self.syncer is not None:
+            self.syncer.wait()
+
+    def report_launch_error(self, target, message):
+        # The window is usually hidden by the time a link fails, so tell through the tray when there is one
+        text = f"Could not open {target[:80]}: {message}"
+        if self.tray_icon and self.isHidden():
+            self.tray_icon.showMessage("MyMultiClipboard", text, QSystemTrayIcon.Warning)
+        else:
+            QtWidgets.QMessageBox.warning(self, "Open Link", text)
+
+    def load_data(self, snapshot=None):
+        # A current snapshot replaces parsing data.json: its settings are read and item rows decoded on demand
+        self.libraries = [Library(MAIN_LIBRARY, "")]
+        self.save_needed = False  # Set when data.json lacks something worked out while loading it; PopupApp saves it once started
+        data = None
         try:
             if not os.path.exists(DATA_FILE):
                 # Create file with default data if it doesn't exist
@@ -116,28 +1171,83 @@ class PopupApp(QtWidgets.QWidget):
                         "window_y": DEFAULT_CONFIG["window_y"],
                         "data": [{"name": "Example", "data": "http://example.com", "color": "#FFB3BA"}]
                     }, f)
-            with open(DATA_FILE, "r") as f:
-                file_data = json.load(f)
-                self.config["hotkey"] = file_data.get("hotkey", DEFAULT_CONFIG["hotkey"])
-                self.config["window_width"] = file_data.get("window_width", DEFAULT_CONFIG["window_width"])
-                self.config["window_height"] = file_data.get("window_height", DEFAULT_CONFIG["window_height"])
-                self.config["window_x"] = file_data.get("window_x", DEFAULT_CONFIG["window_x"])
-                self.config["window_y"] = file_data.get("window_y", DEFAULT_CONFIG["window_y"])
-                self.data = file_data.get("data", [])
-                if not isinstance(self.data, list):
+            if snapshot is None:
+                snapshot = open_snapshot(snapshot_path(), DATA_FILE)
+            if snapshot is not None:
+                file_data = snapshot.settings
+            else:
+                with open(DATA_FILE, "r") as f:
+                    file_data = json.load(f)
+            self.config["hotkey"] = file_data.get("hotkey", DEFAULT_CONFIG["hotkey"])
+            self.config["window_width"] = file_data.get("window_width", DEFAULT_CONFIG["window_width"])
+            self.config["window_height"] = file_data.get("window_height", DEFAULT_CONFIG["window_height"])
+            self.config["window_x"] = file_data.get("window_x", DEFAULT_CONFIG["window_x"])
+            self.config["window_y"] = file_data.get("window_y", DEFAULT_CONFIG["window_y"])
+            self.config["theme"] = file_data.get("theme", DEFAULT_CONFIG["theme"])
+            self.config["library"] = file_data.get("library", DEFAULT_CONFIG["library"])
+            self.config["library_cache_mb"] = file_data.get("library_cache_mb", DEFAULT_CONFIG["library_cache_mb"])
+            self.config["undo_depth"] = file_data.get("undo_depth", DEFAULT_CONFIG["undo_depth"])
+            self.config["undo_cap_mb"] = file_data.get("undo_cap_mb", DEFAULT_CONFIG["undo_cap_mb"])
+            self.config["vault_check"] = file_data.get("vault_check", DEFAULT_CONFIG["vault_check"])
+            self.config["secret_timeout_min"] = file_data.get("secret_timeout_min", DEFAULT_CONFIG["secret_timeout_min"])
+            self.config["compress_min_kb"] = file_data.get("compress_min_kb", DEFAULT_CONFIG["compress_min_kb"])
+            self.config["snapshot"] = file_data.get("snapshot", DEFAULT_CONFIG["snapshot"])
+            self.config["launch_timeout_s"] = file_data.get("launch_timeout_s", DEFAULT_CONFIG["launch_timeout_s"])
+            self.config["tray_items"] = file_data.get("tray_items", DEFAULT_CONFIG["tray_items"])
+            self.config["idle_trim_min"] = file_data.get("idle_trim_min", DEFAULT_CONFIG["idle_trim_min"])
+            self.config["editor_preview_kb"] = file_data.get("editor_preview_kb", DEFAULT_CONFIG["editor_preview_kb"])
+            self.config["text_expansion"] = file_data.get("text_expansion", DEFAULT_CONFIG["text_expansion"])
+            self.config["backup_interval_min"] = file_data.get("backup_interval_min", DEFAULT_CONFIG["backup_interval_min"])
+            self.config["backup_keep"] = file_data.get("backup_keep", DEFAULT_CONFIG["backup_keep"])
+            self.config["window_prewarm_s"] = file_data.get("window_prewarm_s", DEFAULT_CONFIG["window_prewarm_s"])
+            self.config["sync_url"] = file_data.get("sync_url", DEFAULT_CONFIG["sync_url"])
+            self.config["sync_interval_s"] = file_data.get("sync_interval_s", DEFAULT_CONFIG["sync_interval_s"])
+            self.pinned = list(file_data.get("pinned", []))
+            self.usage = dict(file_data.get("usage", {}))
+            self.tray_index = dict(file_data.get("tray_index", {}))
+            self.libraries += [Library(entry["name"], entry["file"], entry.get("names", []), entry.get("abbreviations", {})) for entry in file_data.get("libraries", [])]
+            self.libraries[0].abbreviations = file_data.get("abbreviations")  # Missing in files from before abbreviations
+            if snapshot is None:
+                data = file_data.get("data", [])
+                if not isinstance(data, list):
                     raise ValueError("Data must be a list.")
-                for item in self.data:
+                for item in data:
                     if "color" not in item:
                         item["color"] = DEFAULT_CONFIG["colors"][0]  # Default color if not present
+                if file_data.get("format", 1) < DATA_FORMAT and pack_items(data, self.config["compress_min_kb"] * 1024):
+                    self.save_needed = True  # Long items of a file from before compression are stored packed from now on
         except (json.JSONDecodeError, ValueError):
-            # Handle invalid data file format and reset to default
-            QtWidgets.QMessageBox.critical(self, "Error", f"Invalid data in {DATA_FILE}. Resetting.")
+            # Handle invalid data file format and reset to default; the unreadable file is moved to the backups first
+            kept = set_aside_invalid_file(DATA_FILE)
+            QtWidgets.QMessageBox.critical(self, "Error", f"Invalid data in {DATA_FILE}. Resetting." + (f"\n\nThe old file was kept as {kept}." if kept else ""))
             self.config["hotkey"] = DEFAULT_CONFIG["hotkey"]
             self.config["window_width"] = DEFAULT_CONFIG["window_width"]
             self.config["window_height"] = DEFAULT_CONFIG["window_height"]
             self.config["window_x"] = DEFAULT_CONFIG["window_x"]
             self.config["window_y"] = DEFAULT_CONFIG["window_y"]
-            self.data = [{"name": "Example", "data": "http://example.com"}]
+            self.config["theme"] = DEFAULT_CONFIG["theme"]
+            self.config["library"] = DEFAULT_CONFIG["library"]
+            self.config["library_cache_mb"] = DEFAULT_CONFIG["library_cache_mb"]
+            self.config["undo_depth"] = DEFAULT_CONFIG["undo_depth"]
+            self.config["undo_cap_mb"] = DEFAULT_CONFIG["undo_cap_mb"]
+            self.config["vault_check"] = DEFAULT_CONFIG["vault_check"]
+            self.config["secret_timeout_min"] = DEFAULT_CONFIG["secret_timeout_min"]
+            self.config["compress_min_kb"] = DEFAULT_CONFIG["compress_min_kb"]
+            self.config["snapshot"] = DEFAULT_CONFIG["snapshot"]
+            self.config["launch_timeout_s"] = DEFAULT_CONFIG["launch_timeout_s"]
+            self.config["tray_items"] = DEFAULT_CONFIG["tray_items"]
+            self.config["idle_trim_min"] = DEFAULT_CONFIG["idle_trim_min"]
+            self.config["editor_preview_kb"] = DEFAULT_CONFIG["editor_preview_kb"]
+            self.config["text_expansion"] = DEFAULT_CONFIG["text_expansion"]
+            self.config["backup_interval_min"] = DEFAULT_CONFIG["backup_interval_min"]
+            self.config["backup_keep"] = DEFAULT_CONFIG["backup_keep"]
+            self.config["window_prewarm_s"] = DEFAULT_CONFIG["window_prewarm_s"]
+            self.config["sync_url"] = DEFAULT_CONFIG["sync_url"]
+            self.config["sync_interval_s"] = DEFAULT_CONFIG["sync_interval_s"]
+            self.pinned = []
+            self.usage = {}
+            self.tray_index = {}
+            data = [{"name": "Example", "data": "http://example.com", "color": "#FFB3BA"}]
             with open(DATA_FILE, "w") as f:
                 json.dump({
                     "hotkey": self.config["hotkey"],
@@ -145,9 +1255,357 @@ class PopupApp(QtWidgets.QWidget):
                     "window_height": self.config["window_height"],
                     "window_x": self.config["window_x"],
                     "window_y": self.config["window_y"],
-                    "data": self.data
+                    "data": data
                 }, f)
-        self.filtered_data = self.data[:]
+        self.library = self.libraries[0]
+        if data is None:
+            self.library.set_snapshot(snapshot, self)
+        else:
+            if snapshot is not None:
+                snapshot.close()
+            if not ids_complete(data):
+                self.save_needed = True  # Ids made up for a file from before ids only last once written
+            ensure_ids(data)
+            self.library.set_items(data, self)
+            self.snapshot_timer.start()  # No current snapshot, or data.json had to be reset
+        if self.library.abbreviations is None:
+            # A file from before abbreviations: build the index once, from a snapshot's extra fields alone, and write it now
+            if self.library.snapshot is not None:
+                ids = self.library.by_id.ids
+                self.library.abbreviations = {extra["abbreviation"]: ids[row] for row, extra in self.library.snapshot.extras() if "abbreviation" in extra}
+            else:
+                self.library.abbreviations = abbreviation_index(self.library.items)
+            self.save_needed = True
+        self.rebuild_matcher()
+        self.filtered_ids = self.library.model.ids
+        self.remember_disk_state()
+
+    def remember_disk_state(self):
+        # Record what data.json holds now; called after every read or write of our own.
+        # None while Main is still backed by its snapshot, see merge_base
+        main = self.libraries[0]
+        self.disk_items = None if main.snapshot is not None else list(main.items)
+        try:
+            stat = os.stat(DATA_FILE)
+            self.disk_state = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            self.disk_state = None
+
+    def merge_base(self):
+        # Main as data.json last held it: the items as first decoded from the snapshot until our first write
+        if self.disk_items is None:
+            main = self.libraries[0]
+            if main.snapshot is not None:
+                main.materialize()
+            self.disk_items = main.opened_items
+        return self.disk_items
+
+    def start_snapshot(self):
+        # Rebuild the snapshot of data.json in the background, or remove it when the option is off
+        path = snapshot_path()
+        if not self.config["snapshot"]:
+            if os.path.exists(path) and self.libraries[0].snapshot is None:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return
+        if self.snapshot_thread is not None and self.snapshot_thread.isRunning():
+            self.snapshot_pending = True
+            return
+        self.snapshot_pending = False
+        main = self.libraries[0]
+        self.snapshot_thread = SnapshotThread(DATA_FILE, path, list(main.items) if main.snapshot is None else ())
+        self.snapshot_thread.finished.connect(self.on_snapshot_finished)
+        self.snapshot_thread.start()
+
+    def on_snapshot_finished(self):
+        if self.snapshot_pending:
+            self.start_snapshot()
+
+    def disk_changed(self):
+        try:
+            stat = os.stat(DATA_FILE)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) != self.disk_state
+
+    def start_file_watcher(self):
+        # Pick up edits made to data.json by other machines through a synced folder
+        self.file_watcher = QtCore.QFileSystemWatcher([DATA_FILE], self)
+        self.file_watcher.fileChanged.connect(self.on_data_file_changed)
+
+    def on_data_file_changed(self, path):
+        # Sync tools often replace the file, which drops it from the watcher
+        if path not in self.file_watcher.files() and os.path.exists(path):
+            self.file_watcher.addPath(path)
+        if self.disk_changed():
+            self.start_reload()
+
+    def start_reload(self):
+        if self.reload_thread is not None and self.reload_thread.isRunning():
+            self.reload_pending = True
+            return
+        self.reload_pending = False
+        self.reload_thread = FileReloadThread(DATA_FILE, self.merge_base(), list(self.libraries[0].items), self.data_revision)
+        self.reload_thread.reloaded.connect(self.on_reloaded)
+        self.reload_thread.start()
+
+    def on_reloaded(self, result):
+        if result is not None and result["revision"] != self.data_revision:
+            self.reload_pending = True  # Items changed while the file was parsed; merge again against the new state
+        elif result is not None:
+            self.apply_external_change(result)
+        if self.reload_pending and self.disk_changed():
+            QtCore.QTimer.singleShot(0, self.start_reload)
+
+    def apply_external_change(self, result, save=True):
+        # Apply only the rows that differ; local edits that clash with the remote ones are resolved by the user
+        main = self.libraries[0]
+        merged, hunks = result["merged"], result["hunks"]
+        if result["conflicts"]:
+            self.release_all_modifiers()
+            reply = QtWidgets.QMessageBox.question(self, "Sync Conflict",
+                                                   f"data.json was changed elsewhere and {result['conflicts']} of those changes clash with yours.\n\nKeep your version of them? [Yes]\n\nTake the other version. [No]",
+                                                   QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
+            if reply == QtWidgets.QMessageBox.No:
+                self.back_up("sync")
+                merged, conflicts = merge_items(self.merge_base(), main.items, result["remote"], keep_local=False)
+                hunks = diff_items(main.items, merged)
+        if hunks:
+            self.history.forget(MAIN_LIBRARY)  # Recorded row positions no longer match the file
+            self.tray_items = None
+        self.apply_hunks(main, hunks)
+        if hunks:
+            main.abbreviations = abbreviation_index(main.items)
+            self.rebuild_matcher()
+        if main is self.library and self.window_built and not self.trimmed:
+            self.selected_index = self.listbox.currentRow()
+        self.disk_items = list(result["remote"])
+        self.disk_state = result["state"]
+        if save and merged != result["remote"]:
+            self.save_data()  # Our side had changes the file lacks
+        else:
+            self.snapshot_timer.start()
+
+    def apply_hunks(self, library, hunks):
+        # Replace only the rows that differ, last hunk first so the row numbers of the others stay valid
+        removed = set()
+        for start, end, items in reversed(hunks):
+            removed.update(item["id"] for item in library.items[start:end])
+            library.items[start:end] = items
+            library.by_id.update((item["id"], item) for item in items)
+            library.model.replace_rows(start, end, [item["id"] for item in items])
+        for item_id in removed.difference(item["id"] for item in library.items):
+            del library.by_id[item_id]  # Gone for good, not just moved to another hunk
+
+    def start_sync(self, resolved=None):
+        # Hand the shown library to the sync thread; resolved carries the user's choices for earlier conflicts
+        if self.syncer is None:
+            return
+        if self.sync_busy:
+            self.sync_pending = True
+            return
+        self.sync_busy = True
+        self.sync_pending = False
+        library = self.library
+        self.syncer.sync({"name": library.name, "items": list(library.items), "synced": self.sync_synced.get(library.name),
+                          "resolved": resolved or {}, "revision": self.data_revision})
+
+    def apply_sync(self, result):
+        # Apply what other machines changed, unless the library changed here while the exchange ran
+        self.sync_busy = False
+        self.sync_failing = False
+        library = self.find_library(result["name"])
+        if result["revision"] != self.data_revision or library is not self.library:
+            self.sync_pending = True  # Exchanged again against the current items; what the server already has isn't sent twice
+        else:
+            hunks = result["hunks"]
+            if hunks:
+                self.history.forget(library.name)  # Recorded row positions no longer match
+                self.apply_hunks(library, hunks)
+                if self.window_built and not self.trimmed:
+                    self.selected_index = self.listbox.currentRow()
+            self.sync_synced[library.name] = result["synced"]
+            self.syncer.commit(library.name, result["entry"])
+            if hunks:
+                self.save_data()
+            if result["conflicts"]:
+                self.start_sync(self.resolve_sync_conflicts(library, result["conflicts"]))
+        if self.sync_pending:
+            QtCore.QTimer.singleShot(0, self.start_sync)
+
+    def resolve_sync_conflicts(self, library, conflicts):
+        # Ask item by item, or once for all of them; taking the other version is backed up first
+        resolved = {}
+        keep_all = None
+        for record in conflicts:
+            item_id, revision, theirs, after = record
+            keep = keep_all
+            if keep is None:
+                mine = library.lookup(item_id)
+                name = (mine or theirs or {}).get("name", item_id)
+                self.release_all_modifiers()
+                reply = QtWidgets.QMessageBox.question(self, "Sync Conflict",
+                                                       f"{name} was {'deleted' if theirs is None else 'changed'} on another machine and {'deleted' if mine is None else 'changed'} here.\n\nKeep your version? [Yes]\n\nTake the other version. [No]",
+                                                       QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.YesToAll | QtWidgets.QMessageBox.No | QtWidgets.QMessageBox.NoToAll)
+                keep = reply in (QtWidgets.QMessageBox.Yes, QtWidgets.QMessageBox.YesToAll)
+                if reply in (QtWidgets.QMessageBox.YesToAll, QtWidgets.QMessageBox.NoToAll):
+                    keep_all = keep
+            resolved[item_id] = (record, keep)
+        if not all(keep for record, keep in resolved.values()):
+            self.back_up("sync")
+        return resolved
+
+    def report_sync_error(self, message):
+        self.sync_busy = False
+        if self.sync_failing:
+            return  # The server is still unreachable; said so already
+        self.sync_failing = True
+        if self.tray_icon and self.isHidden():
+            self.tray_icon.showMessage("MyMultiClipboard", message, QSystemTrayIcon.Warning)
+        else:
+            QtWidgets.QMessageBox.warning(self, "Sync", message)
+
+    def reload_before_save(self):
+        # data.json changed under us and the watcher hasn't caught up; merge now instead of overwriting it
+        try:
+            stat = os.stat(DATA_FILE)
+            file_data, remote, complete = read_library_file(DATA_FILE, self.merge_base())
+        except (OSError, ValueError):
+            return
+        main = self.libraries[0]
+        merged, conflicts = merge_items(self.merge_base(), main.items, remote)
+        self.apply_external_change({"revision": self.data_revision, "state": (stat.st_mtime_ns, stat.st_size), "remote": remote,
+                                    "merged": merged, "conflicts": conflicts, "hunks": diff_items(main.items, merged)}, save=False)
+
+    def find_library(self, name):
+        return next((library for library in self.libraries if library.name == name), None)
+
+    def open_library(self, library):
+        # Load a library's items on first use and keep it in the LRU of loaded libraries
+        if library.items is None:
+            complete = packed = True
+            try:
+                file_data, items, complete = read_library_file(library.path())
+                packed = file_data.get("format", 1) == DATA_FORMAT or not pack_items(items, self.config["compress_min_kb"] * 1024)
+            except FileNotFoundError:
+                items = []
+            except ValueError as e:
+                QtWidgets.QMessageBox.critical(self, "Library Error", f"Error loading library {library.name}: {str(e)}")
+                return False
+            library.set_items(items, self)
+            if not complete or not packed:
+                self.write_library(library)  # Keep the ids made up for items from before ids, and store long items packed
+        if library.file:
+            self.loaded_libraries[library.name] = library
+            self.loaded_libraries.move_to_end(library.name)
+        return True
+
+    def evict_libraries(self, cap=None):
+        # Unload least recently used libraries until the loaded ones fit the memory cap; every edit is already saved
+        if cap is None:
+            cap = self.config["library_cache_mb"] * 1024 * 1024
+        total = sum(library.size for library in self.loaded_libraries.values())
+        for name in list(self.loaded_libraries):
+            if total <= cap:
+                break
+            library = self.loaded_libraries[name]
+            if library is self.library:
+                continue
+            total -= library.size
+            library.unload()
+            del self.loaded_libraries[name]
+
+    def switch_library(self, name):
+        # Point the view at another library's model; no rows or widgets are rebuilt
+        library = self.find_library(name)
+        if library is None or library is self.library or not self.open_library(library):
+            self.library_switcher.setCurrentText(self.library.name)
+            return
+        self.library.selected_index = self.selected_index
+        self.library = library
+        self.filtered_ids = library.model.ids
+        self.listbox.setModel(library.model)
+        self.selected_index = -1
+        self.listbox.setCurrentRow(library.selected_index)
+        self.cancel_jump()  # Its labels may have another width
+        self.config["library"] = library.name
+        self.library_switcher.setCurrentText(library.name)
+        self.evict_libraries()
+        self.tray_items = None  # Items of the libraries loaded or unloaded here may be listed
+        if self.syncer is not None:
+            self.sync_soon.start()
+
+    def add_library(self):
+        self.release_all_modifiers()
+        name, ok = QtWidgets.QInputDialog.getText(self, "New Library", "Library name:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if self.find_library(name):
+            QtWidgets.QMessageBox.warning(self, "Input Error", f"A library named {name} already exists.")
+            return
+        file_name = "library_" + "".join(c if c.isalnum() else "_" for c in name) + ".json"
+        self.libraries.append(Library(name, file_name))
+        self.library_switcher.addItem(name)
+        self.switch_library(name)
+        self.save_data()
+
+    def search_libraries(self):
+        # Search item names in every library; unloaded libraries are matched against their saved name index
+        self.release_all_modifiers()
+        query, ok = QtWidgets.QInputDialog.getText(self, "Search All Libraries", "Find items named:")
+        query = query.strip().lower()
+        if not ok or not query:
+            return
+        matches = []
+        for library in self.libraries:
+            names = [item["name"] for item in library.items] if library.items is not None else library.names
+            matches += [(library.name, row, name) for row, name in enumerate(names) if query in name.lower()]
+        if not matches:
+            QtWidgets.QMessageBox.information(self, "Search All Libraries", f"No items match {query}.")
+            return
+        labels = [f"{library_name}: {name}" for library_name, row, name in matches]
+        choice, ok = QtWidgets.QInputDialog.getItem(self, "Search All Libraries", "Go to item:", labels, 0, False)
+        if ok:
+            library_name, row, name = matches[labels.index(choice)]
+            self.switch_library(library_name)
+            self.listbox.setCurrentRow(row)
+
+    def swatch_style_sheet(self):
+        # Per-swatch background rules for the color buttons and entries, generated from the configured palette
+        return "".join(f'\nQPushButton#ColorSwatch[swatch="{swatch}"], QLineEdit#ItemEntry[swatch="{swatch}"], QPlainTextEdit#ItemEntry[swatch="{swatch}"] {{ background-color: {color}; }}' for swatch, color in enumerate(DEFAULT_CONFIG["colors"]))
+
+    def apply_theme(self):
+        # Install one application-wide stylesheet; every widget is matched by object name or property
+        style_sheet = DEFAULT_THEME
+        theme_path = self.config.get("theme")
+        if theme_path:
+            theme_path = os.path.join(BASE_DIR, theme_path)
+            try:
+                with open(theme_path, "r") as f:
+                    style_sheet = f.read()
+            except OSError as e:
+                QtWidgets.QMessageBox.warning(self, "Theme Error", f"Error loading theme {theme_path}: {str(e)}\n\nUsing the default theme.")
+        QtWidgets.QApplication.instance().setStyleSheet(style_sheet + self.swatch_style_sheet())
+
+    def load_theme(self):
+        file_path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Load Theme", BASE_DIR, "Qt style sheets (*.qss);;All files (*.*)")
+        if file_path:
+            self.config["theme"] = file_path
+            self.apply_theme()
+            self.save_data()
+
+    def reset_theme(self):
+        self.config["theme"] = ""
+        self.apply_theme()
+        self.save_data()
+
+    def build_window(self):
+        if not self.window_built:
+            self.window_built = True
+            self.init_ui()
 
     def init_ui(self):
         self.setWindowTitle("MyMultiClipboard")
@@ -168,107 +1626,60 @@ class PopupApp(QtWidgets.QWidget):
         # Add a spacer to push the buttons to the top-right
         MXbutton_layout.addSpacerItem(QSpacerItem(20, 20, QSizePolicy.Expanding, QSizePolicy.Minimum))
 
+        # Library switcher and New Library button
+        self.library_switcher = QtWidgets.QComboBox(self)
+        self.library_switcher.setObjectName("LibrarySwitcher")
+        self.library_switcher.setFixedSize(140, 20)
+        self.library_switcher.addItems([library.name for library in self.libraries])
+        self.library_switcher.setToolTip("Switch Library")
+        self.library_switcher.activated.connect(lambda index: self.switch_library(self.library_switcher.itemText(index)))
+
+        new_library_button = QtWidgets.QPushButton("+")
+        new_library_button.setFixedSize(20, 20)
+        new_library_button.setProperty("role", "title")
+        new_library_button.setToolTip("New Library")
+        new_library_button.clicked.connect(self.add_library)
+
         # Up Arrow Button
         up_button = QtWidgets.QPushButton("↑")
         up_button.setFixedSize(20, 20)
-        up_button.setStyleSheet("""
-            QPushButton {
-                background-color: #cccccc; 
-                color: white; 
-                border: none; 
-                border-radius: 3px; 
-                padding: 3px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        up_button.setProperty("role", "title")
         up_button.setToolTip("Move Up")
         up_button.clicked.connect(self.move_item_up)
 
         # Down Arrow Button
         down_button = QtWidgets.QPushButton("↓")
         down_button.setFixedSize(20, 20)
-        down_button.setStyleSheet("""
-            QPushButton {
-                background-color: #cccccc; 
-                color: white; 
-                border: none; 
-                border-radius: 3px; 
-                padding: 3px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        down_button.setProperty("role", "title")
         down_button.setToolTip("Move Down")
         down_button.clicked.connect(self.move_item_down)
 
         # Hotkey Button
         hotkey_button = QtWidgets.QPushButton("H")
         hotkey_button.setFixedSize(20, 20)
-        hotkey_button.setStyleSheet("""
-            QPushButton {
-                background-color: #cccccc; 
-                color: white; 
-                border: none; 
-                border-radius: 3px; 
-                padding: 3px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        hotkey_button.setProperty("role", "title")
         hotkey_button.setToolTip("Adjust Hotkey")
         hotkey_button.clicked.connect(self.adjust_hotkey)
 
         # Minimize Button
         minimize_button = QtWidgets.QPushButton("_")
         minimize_button.setFixedSize(20,20)
-        minimize_button.setStyleSheet("""
-            QPushButton {
-                background-color: #99ccff; 
-                color: white; 
-                border: none; 
-                border-radius: 3px; 
-                padding: 3px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        minimize_button.setObjectName("MinimizeButton")
+        minimize_button.setProperty("role", "title")
         minimize_button.setToolTip("Minimize")
         minimize_button.clicked.connect(self.hide_window)
 
         # Close Button
         close_button = QtWidgets.QPushButton("X")
         close_button.setFixedSize(20,20)
-        close_button.setStyleSheet("""
-            QPushButton {
-                background-color: #ff9999; 
-                color: white; 
-                border: none; 
-                border-radius: 3px; 
-                padding: 3px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        close_button.setObjectName("CloseButton")
+        close_button.setProperty("role", "title")
         close_button.setToolTip("Close")
         close_button.clicked.connect(self.close)
 
         # Add buttons to the layout
+        MXbutton_layout.addWidget(self.library_switcher, alignment=QtCore.Qt.AlignRight)
+        MXbutton_layout.addWidget(new_library_button, alignment=QtCore.Qt.AlignRight)
         MXbutton_layout.addWidget(up_button, alignment=QtCore.Qt.AlignRight)
         MXbutton_layout.addWidget(down_button, alignment=QtCore.Qt.AlignRight)
         MXbutton_layout.addWidget(hotkey_button, alignment=QtCore.Qt.AlignRight)
@@ -278,98 +1689,43 @@ class PopupApp(QtWidgets.QWidget):
         layout.addLayout(MXbutton_layout)
 
         # Listbox for displaying data
-        self.listbox = QtWidgets.QListWidget(self)
-        self.listbox.setStyleSheet("background-color: #7d7d7d; color: white; border-radius: 5px; font-size: 14px;")  # Lighten the base background color
-        self.refresh_listbox()
-        self.listbox.itemDoubleClicked.connect(self.handle_enter)
-        self.listbox.itemSelectionChanged.connect(self.update_selected_index)  # Detect selection changes
+        self.listbox = ItemListView(self)
+        self.listbox.setObjectName("ItemList")
+        self.listbox.setModel(self.library.model)
+        self.listbox.doubleClicked.connect(self.handle_enter)
+        self.listbox.rowSelectionChanged.connect(self.update_selected_index)  # Detect selection changes
         layout.addWidget(self.listbox)
 
         # Buttons for Add, Edit, Delete, Export, and Import
         button_layout = QtWidgets.QHBoxLayout()
         add_button = QtWidgets.QPushButton("Add", self)
         add_button.clicked.connect(self.add_line)
-        add_button.setStyleSheet("""
-            QPushButton {
-                background-color: #b3e6b3; 
-                color: white; 
-                border-radius: 3px; 
-                height:20px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        add_button.setObjectName("AddButton")
+        add_button.setProperty("role", "action")
         button_layout.addWidget(add_button)
 
         edit_button = QtWidgets.QPushButton("Edit", self)
         edit_button.clicked.connect(self.edit_line)
-        edit_button.setStyleSheet("""
-            QPushButton {
-                background-color: #f7c6a3; 
-                color: white;
-                border-radius: 3px; 
-                height:20px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        edit_button.setObjectName("EditButton")
+        edit_button.setProperty("role", "action")
         button_layout.addWidget(edit_button)
 
         delete_button = QtWidgets.QPushButton("Delete", self)
         delete_button.clicked.connect(self.delete_line)
-        delete_button.setStyleSheet("""
-            QPushButton {
-                background-color: #ffb3b3; 
-                color: white;
-                border-radius: 3px; 
-                height:20px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        delete_button.setObjectName("DeleteButton")
+        delete_button.setProperty("role", "action")
         button_layout.addWidget(delete_button)
 
         export_button = QtWidgets.QPushButton("Export", self)
         export_button.clicked.connect(self.export_data)
-        export_button.setStyleSheet("""
-            QPushButton {
-                background-color: #99ccff; 
-                color: white;
-                border-radius: 3px; 
-                height:20px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        export_button.setObjectName("ExportButton")
+        export_button.setProperty("role", "action")
         button_layout.addWidget(export_button)
 
         import_button = QtWidgets.QPushButton("Import", self)
         import_button.clicked.connect(self.import_data)
-        import_button.setStyleSheet("""
-            QPushButton {
-                background-color: #d1b3ff; 
-                color: white;
-                border-radius: 3px; 
-                height:20px; 
-                font-size: 12px; 
-                font-weight: bold;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        import_button.setObjectName("ImportButton")
+        import_button.setProperty("role", "action")
         button_layout.addWidget(import_button)
 
         layout.addLayout(button_layout)
@@ -377,7 +1733,7 @@ class PopupApp(QtWidgets.QWidget):
         # Horizontal layout for version label and resize handle
         bottom_layout = QtWidgets.QHBoxLayout()
         self.version_label = QtWidgets.QLabel(f"Version {self.config['version']}", self)
-        self.version_label.setStyleSheet("color: gray;")
+        self.version_label.setObjectName("VersionLabel")
         bottom_layout.addWidget(self.version_label, alignment=QtCore.Qt.AlignLeft)
 
         resize_handle = ResizeHandle(self)
@@ -426,6 +1782,32 @@ class PopupApp(QtWidgets.QWidget):
         self.shortcut_hotkey_adjust = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+H"), self)
         self.shortcut_hotkey_adjust.activated.connect(self.adjust_hotkey)
 
+        # Bind Ctrl+T to load a theme file and Ctrl+Shift+T to go back to the built-in theme
+        self.shortcut_theme = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+T"), self)
+        self.shortcut_theme.activated.connect(self.load_theme)
+        self.shortcut_reset_theme = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+T"), self)
+        self.shortcut_reset_theme.activated.connect(self.reset_theme)
+
+        # Bind Ctrl+Z to undo and Ctrl+Y or Ctrl+Shift+Z to redo
+        self.shortcut_undo = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Z"), self)
+        self.shortcut_undo.activated.connect(self.undo)
+        self.shortcut_redo = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Y"), self)
+        self.shortcut_redo.activated.connect(self.redo)
+        self.shortcut_redo_alt = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+Z"), self)
+        self.shortcut_redo_alt.activated.connect(self.redo)
+
+        # Bind Ctrl+Shift+F to search every library
+        self.shortcut_search_libraries = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+F"), self)
+        self.shortcut_search_libraries.activated.connect(self.search_libraries)
+
+        # Bind Ctrl+P to pin or unpin the selected item in the tray menu
+        self.shortcut_pin = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+P"), self.listbox)
+        self.shortcut_pin.activated.connect(self.toggle_pin)
+
+        # Bind Ctrl+Shift+B to restore the current library from a backup
+        self.shortcut_restore = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+B"), self)
+        self.shortcut_restore.activated.connect(self.restore_backup)
+
         # Bind Ctrl+M to send application to systray
         self.shortcut_systray = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+M"), self)
         self.shortcut_systray.activated.connect(self.hide_window)
@@ -434,11 +1816,42 @@ class PopupApp(QtWidgets.QWidget):
         self.shortcut_close = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+X"), self)
         self.shortcut_close.activated.connect(self.quit)
 
-        # Bind Ctrl+0-9 and Ctrl+A-F to select the first 16 items
-        for i, key in enumerate("0123456789ABCDEF"):
-            if i < self.listbox.count():
-                shortcut = QtWidgets.QShortcut(QtGui.QKeySequence(f"Ctrl+{key}"), self)
-                shortcut.activated.connect(lambda i=i: self.select_item(i))
+        # Bind Ctrl+0-9 and Ctrl+A-F to type a row's hex label, one key per digit: Ctrl+2, Ctrl+F uses row 2F once
+        # there are more than 16 rows. Bound once for every digit; the label width follows the rows as they change
+        self.jump_timer = QtCore.QTimer(self)
+        self.jump_timer.setSingleShot(True)
+        self.jump_timer.setInterval(JUMP_TIMEOUT_MS)
+        self.jump_timer.timeout.connect(self.finish_jump)
+        for key in "0123456789ABCDEF":
+            shortcut = QtWidgets.QShortcut(QtGui.QKeySequence(f"Ctrl+{key}"), self)
+            shortcut.activated.connect(lambda key=key: self.jump_key(key))
+
+        # Reopen the library that was shown last
+        if self.config["library"] != MAIN_LIBRARY:
+            self.switch_library(self.config["library"])
+            self.config["library"] = self.library.name  # Main when it no longer exists or can't be read
+
+    def jump_key(self, key):
+        # Collect digits until there are as many as the labels have, then use that row
+        self.jump_keys += key
+        if len(self.jump_keys) < self.library.model.label_width:
+            self.jump_timer.start()
+            QtWidgets.QToolTip.showText(self.listbox.mapToGlobal(QtCore.QPoint(0, 0)), f"Go to {self.jump_keys}", self.listbox)
+            return
+        self.finish_jump()
+
+    def finish_jump(self):
+        # Also run by the timer after a pause: the digits typed so far are the row, so Ctrl+3 and a pause uses row 3
+        if not self.jump_keys:
+            return
+        row = int(self.jump_keys, 16)
+        self.cancel_jump()
+        self.select_item(row)
+
+    def cancel_jump(self):
+        self.jump_keys = ""
+        self.jump_timer.stop()
+        QtWidgets.QToolTip.hideText()
 
     def select_item(self, index):
         if index < self.listbox.count():
@@ -446,183 +1859,222 @@ class PopupApp(QtWidgets.QWidget):
             self.handle_enter()
             self.release_all_modifiers()  # Release all modifier keys after selecting the item
 
+    def invalidate_chrome(self):
+        # Drop the pre-rendered chrome; called on resize and whenever the theme changes a chrome color
+        self.chrome_cache.clear()
+        self.update()
+
+    def cached_chrome(self, part, widget, render):
+        # Return the pixmap for one chrome part, rendering it only when size or pixel ratio changed
+        ratio = widget.devicePixelRatioF()
+        key = (part, widget.width(), widget.height(), ratio)
+        pixmap = self.chrome_cache.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(int(widget.width() * ratio), int(widget.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            render(painter)
+            painter.end()
+            self.chrome_cache[key] = pixmap
+        return pixmap
+
     def paintEvent(self, event):
-        # Paint the window with rounded corners and a 2px border
+        # Blit the cached background; the painter is already clipped to the exposed region
         painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.cached_chrome("window", self, self.render_chrome))
+
+    def render_chrome(self, painter):
+        # Paint the window with rounded corners and a 2px border
         painter.setRenderHint(QPainter.Antialiasing)
         
         # Set the color for the border
-        painter.setPen(QColor(119, 221, 119))  # Black border
-        painter.setBrush(QBrush(QColor(102, 153, 153)))  # White background inside the border
+        painter.setPen(self._border_color)  # Theme border color
+        painter.setBrush(QBrush(self._background_color))  # Theme background inside the border
         
         # Draw a rounded rectangle with a 2px border
         radius = 16  # Radius for rounded corners
         painter.drawRoundedRect(2, 2, self.width() - 4, self.height() - 4, radius, radius)
 
         # Draw custom title text inside the window
-        painter.setPen(QColor(0, 128, 96)) 
-        font = QFont("Arial", 12)
-        font.setBold(True)
-        painter.setFont(font)
+        painter.setPen(self._title_color)
+        painter.setFont(self.title_font)
         painter.drawText(QRect(10, 10, self.width() - 20, 40), Qt.AlignLeft, "MyMultiClipboard")
 
-    def open_add_edit_popup(self, title, name_label, data_label, current_name=None, current_data=None, current_color=None, index=None):
-        self.release_all_modifiers()  # Release all modifier keys
+    def build_add_edit_popup(self):
+        # Build the add/edit dialog once; open_add_edit_popup repopulates it on every use
         popup = QtWidgets.QDialog(self)
-        popup.setWindowTitle(title)
         popup.setWindowFlags(QtCore.Qt.FramelessWindowHint | QtCore.Qt.Dialog)
-        popup.setStyleSheet("background-color: #009999; border-radius: 5px;")
+        popup.setProperty("role", "dialog")
         popup.setMinimumWidth(600)  # Ensures minimum width of 600px
-        popup.setMinimumHeight(250)  # Increase height to ensure buttons are visible
+        popup.setMinimumHeight(420)  # Room for a few lines of data and the buttons
         popup.setModal(True)
         popup.setFocusPolicy(Qt.StrongFocus)  # Enable focus for the dialog
         popup.setAttribute(Qt.WA_ShowWithoutActivating, False)  # Allow the dialog to be activated
 
         layout = QtWidgets.QVBoxLayout()
 
-        name_label_widget = QtWidgets.QLabel(name_label, popup)
-        name_label_widget.setStyleSheet("color: white; height:30px; font-size: 14px;")
-        layout.addWidget(name_label_widget)
-
-        name_entry = QtWidgets.QLineEdit(popup)
-        name_entry.setText(current_name or "")
-        name_entry.setStyleSheet(f"""
-            QLineEdit {{
-                background-color: {current_color or '#2d2d2d'}; 
-                color: #00008B; 
-                border: solid 1px #ccc; 
-                border-radius: 3px; 
-                height:30px; 
-                font-size: 14px;
-            }}
-            QLineEdit:focus {{
-                border: 2px solid gray;
-            }}
-        """)
-        layout.addWidget(name_entry)
-
-        data_label_widget = QtWidgets.QLabel(data_label, popup)
-        data_label_widget.setStyleSheet("color: white; height:30px; font-size: 14px;")
-        layout.addWidget(data_label_widget)
-
-        data_entry = QtWidgets.QLineEdit(popup)
-        data_entry.setText(current_data or "")
-        data_entry.setStyleSheet(f"""
-            QLineEdit {{
-                background-color: {current_color or '#2d2d2d'}; 
-                color: #00008B; 
-                border: solid 1px #ccc; 
-                border-radius: 3px; 
-                height:30px; 
-                font-size: 14px;
-            }}
-            QLineEdit:focus {{
-                border: 2px solid gray;
-            }}
-        """)
-        layout.addWidget(data_entry)
+        self.name_label_widget = QtWidgets.QLabel(popup)
+        layout.addWidget(self.name_label_widget)
+
+        self.name_entry = QtWidgets.QLineEdit(popup)
+        self.name_entry.setObjectName("ItemEntry")
+        layout.addWidget(self.name_entry)
+
+        abbreviation_label_widget = QtWidgets.QLabel("Abbreviation (optional), typed anywhere to paste the data:", popup)
+        layout.addWidget(abbreviation_label_widget)
+
+        self.abbreviation_entry = QtWidgets.QLineEdit(popup)
+        self.abbreviation_entry.setObjectName("ItemEntry")
+        self.abbreviation_entry.setPlaceholderText("e.g. ;sig")
+        layout.addWidget(self.abbreviation_entry)
+
+        self.data_label_widget = QtWidgets.QLabel(popup)
+        layout.addWidget(self.data_label_widget)
+
+        # Shown instead of the data editor for items above editor_preview_kb
+        self.preview_bar = QtWidgets.QWidget(popup)
+        preview_layout = QtWidgets.QHBoxLayout(self.preview_bar)
+        preview_layout.setContentsMargins(0, 0, 0, 0)
+        self.preview_label = QtWidgets.QLabel(self.preview_bar)
+        preview_layout.addWidget(self.preview_label, 1)
+        edit_all_button = QtWidgets.QPushButton("Edit All", self.preview_bar)
+        edit_all_button.setObjectName("EditAllButton")
+        edit_all_button.clicked.connect(self.edit_all_data)
+        preview_layout.addWidget(edit_all_button)
+        layout.addWidget(self.preview_bar)
+
+        self.data_entry = DataEditor(popup)
+        self.data_entry.setObjectName("ItemEntry")
+        layout.addWidget(self.data_entry, 1)
+
+        # Secrets are typed into a masked single-line entry that takes the editor's place
+        self.secret_entry = QtWidgets.QLineEdit(popup)
+        self.secret_entry.setObjectName("ItemEntry")
+        self.secret_entry.setEchoMode(QtWidgets.QLineEdit.Password)
+        self.secret_entry.setMaxLength(2 ** 31 - 1)
+        layout.addWidget(self.secret_entry)
+
+        self.secret_check = QtWidgets.QCheckBox("Secret: encrypted in the file, never shown", popup)
+        self.secret_check.setObjectName("SecretCheck")
+        self.secret_check.toggled.connect(self.toggle_secret_entry)
+        layout.addWidget(self.secret_check)
 
         color_label_widget = QtWidgets.QLabel("Choose color:", popup)
-        color_label_widget.setStyleSheet("color: white; height:30px; font-size: 14px;")
         layout.addWidget(color_label_widget)
 
+        # Swatch colors come from the theme rules built by swatch_style_sheet; the checked state draws the selection border
         color_layout = QtWidgets.QHBoxLayout()
-        color_buttons = []
-        for color in DEFAULT_CONFIG["colors"]:
+        self.color_buttons = []
+        for swatch, color in enumerate(DEFAULT_CONFIG["colors"]):
             color_button = QtWidgets.QPushButton("", popup)
-            color_button.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {color}; 
-                    border-radius: 3px; 
-                    height:30px; 
-                    width:30px;
-                }}
-                QPushButton:focus {{
-                    border: 2px solid gray;
-                }}
-            """)
+            color_button.setObjectName("ColorSwatch")
+            color_button.setProperty("swatch", swatch)
             color_button.setCheckable(True)
-            color_buttons.append(color_button)
+            color_button.setProperty("color", QColor(color).name())
+            self.color_buttons.append(color_button)
             color_layout.addWidget(color_button)
-            if color == current_color:
-                color_button.setChecked(True)
-                color_button.setStyleSheet(f"""
-                    QPushButton {{
-                        background-color: {color}; 
-                        border: 2px solid black; 
-                        border-radius: 3px; 
-                        height:30px; 
-                        width:30px;
-                    }}
-                    QPushButton:focus {{
-                        border: 2px solid gray;
-                    }}
-                """)
-            else:
-                color_button.setStyleSheet(f"""
-                    QPushButton {{
-                        background-color: {color}; 
-                        border-radius: 3px; 
-                        height:30px; 
-                        width:30px;
-                    }}
-                    QPushButton:focus {{
-                        border: 2px solid gray;
-                    }}
-                """)
-            color_button.clicked.connect(lambda ch, btn=color_button: self.highlight_selected_color(btn, color_buttons, name_entry, data_entry))
+            color_button.clicked.connect(lambda ch, btn=color_button: self.highlight_selected_color(btn, self.color_buttons, self.name_entry, self.data_entry))
         layout.addLayout(color_layout)
+        self.selected_color_button = None
 
         button_layout = QtWidgets.QHBoxLayout()
 
         ok_button = QtWidgets.QPushButton("OK", popup)
-        ok_button.setStyleSheet("""
-            QPushButton {
-                background-color: #0099cc; 
-                color: white; 
-                height:30px; 
-                border: solid 1px #6600cc;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
-        ok_button.clicked.connect(lambda: self.submit_popup(name_entry, data_entry, color_buttons, popup, index))
+        ok_button.setObjectName("OkButton")
+        ok_button.clicked.connect(lambda: self.submit_popup(self.name_entry, self.data_entry, self.color_buttons, popup, self.edit_popup_id))
         button_layout.addWidget(ok_button)
 
         cancel_button = QtWidgets.QPushButton("Cancel", popup)
-        cancel_button.setStyleSheet("""
-            QPushButton {
-                background-color: #ff9999; 
-                color: white; 
-                height:30px; 
-                border: solid 1px #6600cc;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        cancel_button.setObjectName("CancelButton")
         cancel_button.clicked.connect(popup.close)
         button_layout.addWidget(cancel_button)
 
         layout.addLayout(button_layout)
 
         popup.setLayout(layout)
+        self.edit_popup = popup
+
+    def open_add_edit_popup(self, title, name_label, data_label, current_name=None, current_data=None, current_color=None, item_id=None, secret=False, abbreviation=""):
+        self.release_all_modifiers()  # Release all modifier keys
+        if self.edit_popup is None:
+            self.build_add_edit_popup()
+        popup = self.edit_popup
+        popup.setWindowTitle(title)
+        self.name_label_widget.setText(name_label)
+        self.data_label_widget.setText(data_label)
+        self.name_entry.setText(current_name or "")
+        self.abbreviation_entry.setText(abbreviation)
+        # A secret is never decrypted for editing: leaving the field empty keeps the stored one
+        self.data_entry.load("" if secret else current_data or "", self.config["editor_preview_kb"] * 1024)
+        self.secret_entry.setText("")
+        self.secret_entry.setPlaceholderText("Leave empty to keep the stored secret" if secret else "")
+        self.secret_check.blockSignals(True)
+        self.secret_check.setChecked(secret)
+        self.secret_check.blockSignals(False)
+        self.show_data_entry(secret)
+        self.edit_popup_id = item_id
+        self.edit_popup_data = current_data  # Saved as it is, without serializing again, unless the editor changes it
+
+        # Select the button matching the item color, or fall back to the neutral entry color
+        current = QColor(current_color).name() if current_color else None
+        selected_button = next((button for button in self.color_buttons if button.property("color") == current), None)
+        if selected_button is not None:
+            self.highlight_selected_color(selected_button, self.color_buttons, self.name_entry, self.data_entry)
+        else:
+            if self.selected_color_button is not None:
+                self.selected_color_button.setChecked(False)
+                self.selected_color_button = None
+            self.set_entry_color(current_color or "#2d2d2d")
+
         popup.setFocus()
         popup.show()
         self.release_all_modifiers()  # Release all modifier keys after showing the popup
         popup.exec_()
 
+    def show_data_entry(self, secret):
+        self.secret_entry.setVisible(secret)
+        self.data_entry.setVisible(not secret)
+        self.preview_bar.setVisible(not secret and self.data_entry.previewing)
+        if self.data_entry.previewing:
+            self.preview_label.setText(f"{len(self.data_entry.source) / 1024 / 1024:.1f} MB of data, showing the first {DataEditor.PREVIEW_SIZE // 1024} KB read-only.")
+
+    def toggle_secret_entry(self, checked):
+        # The text moves between the editor and the masked entry
+        if checked:
+            self.secret_entry.setText(self.data_entry.text())
+            self.data_entry.load("", self.config["editor_preview_kb"] * 1024)
+        else:
+            self.data_entry.load(self.secret_entry.text(), self.config["editor_preview_kb"] * 1024)
+            self.secret_entry.setText("")
+        self.show_data_entry(checked)
+
+    def edit_all_data(self):
+        self.preview_bar.hide()
+        self.data_entry.edit_all()
+        self.data_entry.setFocus()
+
+    def set_entry_color(self, color):
+        # Palette colors map to the theme's [swatch] rules; any other item color gets a one-line override
+        color = QColor(color).name()
+        swatch = next((button.property("swatch") for button in self.color_buttons if button.property("color") == color), -1)
+        override = "" if swatch != -1 else f"#ItemEntry {{ background-color: {color}; }}"
+        for entry in (self.name_entry, self.abbreviation_entry, self.data_entry, self.secret_entry):
+            if entry.styleSheet() != override:
+                entry.setStyleSheet(override)
+            entry.setProperty("swatch", swatch)
+            entry.style().unpolish(entry)
+            entry.style().polish(entry)
+
     def highlight_selected_color(self, selected_button, color_buttons, name_entry, data_entry):
-        for button in color_buttons:
-            if button == selected_button:
-                button.setChecked(True)
-                button.setStyleSheet(f"background-color: {button.palette().button().color().name()}; border: 2px solid black; border-radius: 3px; height:30px; width:30px;")
-                name_entry.setStyleSheet(f"background-color: {button.palette().button().color().name()}; color: #00008B; border: solid 1px #ccc; border-radius: 3px; height:30px; font-size: 14px;")
-                data_entry.setStyleSheet(f"background-color: {button.palette().button().color().name()}; color: #00008B; border: solid 1px #ccc; border-radius: 3px; height:30px; font-size: 14px;")
-            else:
-                button.setChecked(False)
-                button.setStyleSheet(f"background-color: {button.palette().button().color().name()}; border-radius: 3px; height:30px; width:30px;")
+        # Only the previously selected and the newly selected buttons change state
+        selected_button.setChecked(True)
+        if selected_button is self.selected_color_button:
+            return
+        if self.selected_color_button is not None:
+            self.selected_color_button.setChecked(False)
+        self.selected_color_button = selected_button
+        self.set_entry_color(selected_button.property("color"))
 
     def center_window(self):
         screen = QtWidgets.QDesktopWidget().screenGeometry()
@@ -631,70 +2083,430 @@ class PopupApp(QtWidgets.QWidget):
 
     def update_selected_index(self):
         # Update the last selected index when the item selection changes.
-        selected_items = self.listbox.selectedItems()
-        if selected_items:
-            self.selected_index = self.listbox.row(selected_items[0])
+        selected_rows = self.listbox.selectionModel().selectedRows()
+        if selected_rows:
+            self.selected_index = selected_rows[0].row()
         else:
             self.selected_index = -1
-        self.update_selected_item_border()
 
     def handle_enter(self):
-        item = self.listbox.currentItem()
-        if item:
-            index = self.listbox.row(item)
-            content = self.data[index]["data"]  # Ensure the correct data is copied
-            if content.startswith("http://") or content.startswith("https://"):
-                webbrowser.open(content)  # Open the link in the default browser
-            else:
-                threading.Thread(target=pyperclip.copy, args=(content,)).start()  # Copy to clipboard in a separate thread
+        index = self.listbox.currentRow()
+        if index != -1:
+            if not self.use_item(self.item_at(index), self.library):  # Rows map to items by id
+                return
             threading.Thread(target=winsound.Beep, args=(1000, 500)).start()  # Make a more noticeable beep sound in a separate thread
             self.hide()
             self.send_to_systray()
-            self.update_tray_menu()
+
+    def prepare_item(self, item, library):
+        # (content, template still needing the clipboard or None, inputs) to deliver; None if cancelled (passphrase or template input)
+        content = self.item_data(item)  # Secrets are decrypted only here
+        if content is None:
+            return None
+        template = self.compiled_template(item, content, library)
+        if template is None:
+            return content, None, None
+        inputs = self.ask_template_inputs(template)
+        if inputs is None:
+            return None
+        if not template.needs_clipboard:
+            return self.fill_template(content, template, inputs), None, None
+        return content, template, inputs
+
+    def use_item(self, item, library):
+        # Open or copy an item of library; False if it was cancelled
+        prepared = self.prepare_item(item, library)
+        if prepared is None:
+            return False
+        content, template, inputs = prepared
+        if template is None and is_link(content):
+            self.launcher.launch(content)  # Queued for the launcher; nothing here waits on the browser
+        else:
+            threading.Thread(target=self.deliver, args=(content, template, inputs)).start()  # Copy (or fill in the clipboard, then open or copy) in a separate thread
+        self.count_use(item, library)
+        return True
+
+    def rebuild_matcher(self):
+        # The first library listing an abbreviation wins; the hook thread keeps using the old automaton until the swap
+        owners = {}
+        for library in self.libraries:
+            for abbreviation, item_id in library.abbreviations.items():
+                owners.setdefault(abbreviation, (abbreviation, library.name, item_id))
+        self.abbreviation_owners = owners
+        self.matcher = expander.Matcher(owners)
+
+    def on_key(self, event):
+        # Runs on the keyboard hook thread for every key event in any application: only bookkeeping and one automaton step here
+        name = event.name
+        if name is None:
+            return
+        matcher = self.matcher
+        if keyboard.is_modifier(name):
+            if "shift" not in name and name != "alt gr":
+                if event.event_type == keyboard.KEY_DOWN:
+                    self.held_modifiers.add(name)
+                else:
+                    self.held_modifiers.discard(name)
+            return
+        if event.event_type != keyboard.KEY_DOWN:
+            return
+        if self.clicked:
+            self.clicked = False
+            matcher.reset()  # The click may have moved the caret or the focus away from what was typed
+        if self.held_modifiers:
+            matcher.reset()
+        elif len(name) == 1 or name == "space":
+            match = matcher.feed(" " if name == "space" else name)
+            if match is not None:
+                self.abbreviation_typed.emit(match)
+        elif name == "backspace":
+            matcher.backspace()
+        elif name != "caps lock":
+            matcher.reset()  # Enter, Tab, arrows, Home... the text before it no longer leads up to the caret
+
+    def on_click(self, x, y, button, pressed):
+        # Runs on the mouse listener thread, which must not touch the automaton the hook thread is feeding: on_key resets it
+        if pressed:
+            self.clicked = True
+
+    def expand_abbreviation(self, match):
+        abbreviation, library_name, item_id = match
+        library = self.find_library(library_name)
+        if library is None or not self.open_library(library):
+            return
+        item = library.lookup(item_id)
+        if item is None:
+            return
+        prepared = self.prepare_item(item, library)
+        if prepared is None:
+            return
+        threading.Thread(target=self.type_expansion, args=(len(abbreviation),) + prepared).start()
+        self.count_use(item, library)
+
+    def type_expansion(self, erase, content, template=None, inputs=None):
+        # Runs on a worker thread: erase the typed abbreviation and paste the data in its place. The keys sent
+        # here reach on_key too, where Backspace and Ctrl+V leave the freshly reset automaton as it is
+        if template is not None:
+            content = self.fill_template(content, template, inputs, pyperclip.paste())
+        for _ in range(erase):
+            keyboard.send("backspace")
+        pyperclip.copy(content)
+        keyboard.send("ctrl+v")
+
+    def count_use(self, item, library):
+        # Counts are written with the next save of data.json rather than on every copy
+        item_id = item["id"]
+        self.usage[item_id] = self.usage.get(item_id, 0) + 1
+        self.tray_index[item_id] = [library.name, item["name"]]
+        if len(self.usage) > USAGE_LIMIT:
+            del self.usage[min((other for other in self.usage if other != item_id), key=self.usage.get)]
+        self.usage_dirty = True
+        self.tray_items = None
+
+    def toggle_pin(self):
+        # Pinned items head the tray menu, in the order they were pinned
+        index = self.listbox.currentRow()
+        if index == -1:
+            return
+        item_id = self.filtered_ids[index]
+        if item_id in self.pinned:
+            self.pinned.remove(item_id)
+        else:
+            self.pinned.append(item_id)
+            self.tray_index[item_id] = [self.library.name, self.item_at(index)["name"]]
+        self.save_data()
+
+    def find_item(self, item_id):
+        # The item with this id in any loaded library and that library, or (None, None)
+        for library in self.libraries:
+            item = library.lookup(item_id)
+            if item is not None:
+                return item, library
+        return None, None
+
+    def indexed_library(self, item_id):
+        # The unloaded library the tray index places this item in, or None
+        library = self.find_library(self.tray_index.get(item_id, [None])[0])
+        return library if library is not None and library.model is None else None
+
+    def top_items(self):
+        # Pinned items, then the most used, up to "tray_items" entries. Items of unloaded libraries are listed
+        # under the name the tray index keeps for them; ids found nowhere are skipped
+        entries = []
+        pinned = set(self.pinned)
+        for item_id in self.pinned + sorted((other for other in self.usage if other not in pinned), key=self.usage.get, reverse=True):
+            if len(entries) >= self.config["tray_items"]:
+                break
+            item, library = self.find_item(item_id)
+            if item is not None:
+                entries.append((item_id, item["name"], item_id in pinned))
+            elif self.indexed_library(item_id) is not None:
+                entries.append((item_id, self.tray_index[item_id][1], item_id in pinned))
+        return entries
+
+    def update_tray_index(self):
+        # Before each save: keep entries only for pinned and counted items, with the names their loaded libraries have now
+        for item_id in list(self.tray_index):
+            if item_id not in self.usage and item_id not in self.pinned:
+                del self.tray_index[item_id]
+                continue
+            library = self.find_library(self.tray_index[item_id][0])
+            item = library.lookup(item_id) if library is not None else None
+            if item is not None:
+                self.tray_index[item_id][1] = item["name"]
+
+    def fill_template(self, content, template, inputs, clipboard=""):
+        # The template filled in, or the item's text as written when a placeholder can't be (see report_template_error)
+        try:
+            return templates.expand(template, inputs, clipboard)
+        except templates.TemplateError as e:
+            self.template_failed.emit(str(e))
+            return content
+
+    def report_template_error(self, message):
+        QtWidgets.QToolTip.showText(QtGui.QCursor.pos(), f"Used as written: {message}")
+
+    def item_at(self, row):
+        return self.library.by_id[self.filtered_ids[row]]
+
+    def compiled_template(self, item, content, library):
+        # Parsed once per item version and cached in the item's own library, which drops it when unloaded;
+        # an edit replaces the item dict, which invalidates the entry
+        if item.get("secret", False):
+            return templates.compile_template(content)  # Not cached, so no decrypted text stays in memory
+        cached = library.templates.get(item["id"])
+        if cached is None or cached[0] is not item:
+            cached = library.templates[item["id"]] = (item, templates.compile_template(content))
+        return cached[1]
+
+    def ask_template_inputs(self, template):
+        # Ask for each {input:Label} once; None if a prompt is cancelled
+        inputs = {}
+        for label in template.labels:
+            self.release_all_modifiers()
+            text, ok = QtWidgets.QInputDialog.getText(self, "Fill In", f"{label}:")
+            if not ok:
+                return None
+            inputs[label] = text
+        return inputs
+
+    def deliver(self, content, template=None, inputs=None):
+        # Runs on a worker thread: a template still needing the clipboard is filled in here, since reading it can block
+        if template is not None:
+            content = self.fill_template(content, template, inputs, pyperclip.paste())
+        if is_link(content):
+            self.launcher.launch(content)
+        else:
+            pyperclip.copy(content)
+
+    def item_data(self, item):
+        # The item's data, decompressing or decrypting it on demand; None if that fails or the passphrase prompt is cancelled
+        if "packed" in item:
+            try:
+                return compression.unpack(item["packed"], item["data"])
+            except ValueError as e:
+                QtWidgets.QMessageBox.warning(self, "Compressed Item", str(e))
+                return None
+        if not item.get("secret", False):
+            return item["data"]
+        try:
+            unlocked = self.unlock(item["data"])
+            return unlocked and vault.decrypt(unlocked[1], item["data"])
+        except vault.VaultError as e:
+            QtWidgets.QMessageBox.warning(self, "Secret Item", str(e))
+            return None
+
+    def unlock(self, blob=None):
+        # (salt, keys) for decrypting blob, or for encrypting new secrets when blob is None.
+        # The passphrase is asked and stretched once per salt; the keys expire after secret_timeout_min idle minutes
+        if blob is None and not self.config["vault_check"]:
+            return self.create_vault()
+        check = blob or self.config["vault_check"]
+        salt = vault.blob_salt(check)
+        keys = self.vault_keys.get(salt)
+        if keys is None:
+            self.release_all_modifiers()
+            passphrase, ok = QtWidgets.QInputDialog.getText(self, "Secret Items", "Passphrase for secret items:", QtWidgets.QLineEdit.Password)
+            if not ok or not passphrase:
+                return None
+            keys = vault.derive_keys(passphrase, salt)
+            try:
+                vault.decrypt(keys, check)
+            except vault.VaultError:
+                QtWidgets.QMessageBox.warning(self, "Secret Items", "Wrong passphrase.")
+                return None
+            self.vault_keys[salt] = keys
+        self.vault_timer.start()
+        return salt, keys
+
+    def create_vault(self):
+        # First secret item: choose the passphrase and store a check value to recognise it later
+        self.release_all_modifiers()
+        passphrase, ok = QtWidgets.QInputDialog.getText(self, "Secret Items", "Choose a passphrase for secret items:", QtWidgets.QLineEdit.Password)
+        if not ok or not passphrase:
+            return None
+        confirm, ok = QtWidgets.QInputDialog.getText(self, "Secret Items", "Repeat the passphrase:", QtWidgets.QLineEdit.Password)
+        if not ok:
+            return None
+        if confirm != passphrase:
+            QtWidgets.QMessageBox.warning(self, "Secret Items", "The passphrases do not match.")
+            return None
+        salt = vault.new_salt()
+        keys = vault.derive_keys(passphrase, salt)
+        self.config["vault_check"] = vault.encrypt(keys, salt, "MyMultiClipboard")
+        self.vault_keys[salt] = keys
+        self.vault_timer.start()
+        return salt, keys
 
     def add_line(self):
         self.open_add_edit_popup("Add Line", "Enter name:", "Enter data:", None, None, DEFAULT_CONFIG["colors"][0])
 
     def edit_line(self):
-        item = self.listbox.currentItem()
-        if item:
-            index = self.listbox.row(item)
-            current_item = self.filtered_data[index]
-            self.open_add_edit_popup("Edit Line", "Edit name:", "Edit data:", current_item["name"], current_item["data"], current_item["color"], index)
+        index = self.listbox.currentRow()
+        if index != -1:
+            current_item = self.item_at(index)
+            current_data = current_item["data"] if current_item.get("secret", False) else self.item_data(current_item)
+            if current_data is None:
+                return
+            self.open_add_edit_popup("Edit Line", "Edit name:", "Edit data:", current_item["name"], current_data, current_item["color"], current_item["id"], current_item.get("secret", False), current_item.get("abbreviation", ""))
 
     def delete_line(self):
-        item = self.listbox.currentItem()
-        if item:
+        index = self.listbox.currentRow()
+        if index != -1:
             reply = QtWidgets.QMessageBox.question(self, "Delete Confirmation", 
                                                    "Are you sure you want to delete this item?", 
                                                    QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
             if reply == QtWidgets.QMessageBox.Yes:
-                index = self.listbox.row(item)
-                del self.data[index]
-                self.filtered_data = self.data[:]
-                self.refresh_listbox()
-                self.save_data()
+                self.back_up("delete")
+                self.perform("Delete", [("remove", index, [self.item_at(index)])])
 
-    def submit_popup(self, name_entry, data_entry, color_buttons, popup, index):
+    def submit_popup(self, name_entry, data_entry, color_buttons, popup, item_id):
         new_name = name_entry.text().strip()
-        new_data = data_entry.text().strip()
-        new_color = next((button.palette().button().color().name() for button in color_buttons if button.isChecked()), DEFAULT_CONFIG["colors"][0])
-        if not new_name or not new_data:
+        new_color = next((button.property("color") for button in color_buttons if button.isChecked()), DEFAULT_CONFIG["colors"][0])
+        secret = self.secret_check.isChecked()
+        old_item = self.library.by_id[item_id] if item_id is not None else None
+        # Data left as opened keeps the stored (possibly compressed) form: no copy out of the editor, no packing again
+        unchanged = old_item is not None and not secret and not old_item.get("secret", False) and data_entry.unchanged() and data_entry.source is self.edit_popup_data
+        if unchanged:
+            new_data = old_item["data"]
+        else:
+            data_entry.finish_loading()
+            new_data = (self.secret_entry.text() if secret else data_entry.text()).strip()
+        keep_secret = old_item is not None and old_item.get("secret", False) and not new_data
+        if not new_name or not (new_data or keep_secret):
             QtWidgets.QMessageBox.warning(self, "Input Error", "Name and data cannot be empty.")
             return
-        new_item = {"name": new_name, "data": new_data, "color": new_color}
-        if index is None:
-            if self.selected_index != -1:
-                self.data.insert(self.selected_index + 1, new_item)
-            else:
-                self.data.append(new_item)
+        new_abbreviation = self.abbreviation_entry.text().strip()
+        owner = self.abbreviation_owners.get(new_abbreviation)
+        if owner is not None and owner[2] != item_id:
+            QtWidgets.QMessageBox.warning(self, "Input Error", f"The abbreviation {new_abbreviation} is already used by another item in {owner[1]}.")
+            return
+        # An abbreviation expands as soon as it is typed, so of two where one starts the other the longer could never be typed
+        clash = next((owner for abbreviation, owner in self.abbreviation_owners.items() if new_abbreviation and owner[2] != item_id
+                      and abbreviation != new_abbreviation and (abbreviation.startswith(new_abbreviation) or new_abbreviation.startswith(abbreviation))), None)
+        if clash is not None:
+            QtWidgets.QMessageBox.warning(self, "Input Error", f"The abbreviation {new_abbreviation} overlaps {clash[0]}, used by another item in {clash[1]}: typing the longer one would expand the shorter.")
+            return
+        if keep_secret:
+            new_data = old_item["data"] if secret else self.item_data(old_item)  # Unmarking stores the plaintext again
+        elif secret:
+            unlocked = self.unlock()
+            new_data = unlocked and vault.encrypt(unlocked[1], unlocked[0], new_data)
+        if new_data is None:
+            return  # Passphrase prompt cancelled or wrong
+        # Items are replaced, never changed in place, so snapshots taken for merging stay intact
+        if item_id is None:
+            new_item = {"id": new_item_id(), "name": new_name, "data": new_data, "color": new_color}
+            if secret:
+                new_item["secret"] = True
+            if new_abbreviation:
+                new_item["abbreviation"] = new_abbreviation
+            new_item = pack_item(new_item, self.config["compress_min_kb"] * 1024)
+            row = self.selected_index + 1 if self.selected_index != -1 else len(self.data)
+            self.perform("Add", [("insert", row, [new_item])])
         else:
-            self.data[index] = new_item
-        self.filtered_data = self.data[:]
-        self.refresh_listbox()
-        self.save_data()
+            new_item = {"id": item_id, "name": new_name, "data": new_data, "color": new_color}
+            if secret:
+                new_item["secret"] = True
+            if new_abbreviation:
+                new_item["abbreviation"] = new_abbreviation
+            if unchanged and "packed" in old_item:
+                new_item["packed"] = old_item["packed"]
+            elif not unchanged:
+                new_item = pack_item(new_item, self.config["compress_min_kb"] * 1024)
+            label = "Recolor" if (old_item["name"], old_item["data"], old_item.get("secret", False), old_item.get("abbreviation", "")) == (new_name, new_item["data"], secret, new_abbreviation) else "Edit"
+            self.perform(label, [("replace", self.data.index(old_item), new_item)])
         popup.close()
 
+    def apply_op(self, library, op):
+        # Apply one row operation to a library's items, id registry and model; returns the operation that reverts it
+        kind, row = op[0], op[1]
+        if kind == "insert":
+            items = [to_item(item) for item in op[2]]
+            if items:
+                library.items[row:row] = items
+                library.by_id.update((item["id"], item) for item in items)
+                library.model.insert_ids(row, [item["id"] for item in items])
+            return ("remove", row, items)
+        if kind == "remove":
+            items = op[2]
+            if [item["id"] for item in library.items[row:row + len(items)]] != [item["id"] for item in items]:
+                raise ValueError("The library changed since this step was recorded.")
+            if items:
+                del library.items[row:row + len(items)]
+                for item in items:
+                    del library.by_id[item["id"]]
+                library.model.remove_rows(row, len(items))
+            return ("insert", row, items)
+        if kind == "replace":
+            item = to_item(op[2])
+            old_item = library.items[row] if row < len(library.items) else None
+            if old_item is None or old_item["id"] != item["id"]:
+                raise ValueError("The library changed since this step was recorded.")
+            library.items[row] = item
+            library.by_id[item["id"]] = item
+            library.model.item_changed(row)
+            return ("replace", row, old_item)
+        target = op[2]  # move
+        library.items.insert(target, library.items.pop(row))
+        library.model.move_row(row, target)
+        return ("move", target, row)
+
+    def perform(self, label, ops):
+        # Apply item operations to the current library and record their inverse for undo
+        inverse = [self.apply_op(self.library, op) for op in ops]
+        self.history.record(UndoEntry(label, self.library.name, inverse[::-1]))
+        self.save_data()
+
+    def undo(self):
+        if self.history.undo_stack:
+            entry = self.replay(self.history.pop_undo(), "Undo")
+            if entry is not None:
+                self.history.redo_stack.append(entry)
+
+    def redo(self):
+        if self.history.redo_stack:
+            entry = self.replay(self.history.redo_stack.pop(), "Redo")
+            if entry is not None:
+                self.history.push_undo(entry)
+
+    def replay(self, entry, verb):
+        # Run an entry's operations on its library; returns the entry that reverts them, or None if it no longer applies
+        self.switch_library(entry.library)
+        if self.library.name != entry.library:
+            return None
+        try:
+            inverse = [self.apply_op(self.library, op) for op in entry.ops]
+        except ValueError as e:
+            self.history.forget(entry.library)
+            QtWidgets.QMessageBox.warning(self, f"{verb} Error", f"Cannot {verb.lower()} {entry.label}: {str(e)}")
+            return None
+        self.save_data()
+        last = entry.ops[-1]
+        self.listbox.setCurrentRow(min(last[2] if last[0] == "move" else last[1], self.listbox.count() - 1))
+        QtWidgets.QToolTip.showText(self.listbox.mapToGlobal(QtCore.QPoint(0, 0)), f"{verb} {entry.label}", self.listbox)
+        return UndoEntry(entry.label, entry.library, inverse[::-1])
+
     def import_data(self):
         file_path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Import Data", "MMC_item_list", "JSON files (*.json);;All files (*.*)")
         if file_path:
@@ -703,108 +2515,196 @@ class PopupApp(QtWidgets.QWidget):
                     imported_data = json.load(f)
                     if not isinstance(imported_data, dict) or not isinstance(imported_data.get("data", []), list):
                         raise ValueError("Imported JSON must be a dictionary with a 'data' list.")
+                if imported_data.get("format", 1) > DATA_FORMAT:
+                    raise ValueError("The file was written by a newer version of MyMultiClipboard.")
+                imported_data.setdefault("data", [])
+                for number, item in enumerate(imported_data["data"], 1):
+                    if not isinstance(item, dict) or not all(isinstance(item.get(key, ""), str) for key in ("name", "data", "color")):
+                        raise ValueError(f"Item {number} must be a dictionary with text 'name', 'data' and 'color'.")
 
                 action = QtWidgets.QMessageBox.question(self, "Import Data", "Do you want to add new lines to the existing data? [Yes]\n\nClick To delete existing data and add new lines. [No]", QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)				
+                for item in imported_data["data"]:
+                    if "color" not in item:
+                        item["color"] = DEFAULT_CONFIG["colors"][0]  # Default color if not present
+                min_size = self.config["compress_min_kb"] * 1024
+                imported_data["data"] = [pack_item(item, min_size) for item in imported_data["data"]]
                 if action == QtWidgets.QMessageBox.Yes:
-                    self.data.extend(imported_data["data"])
+                    ensure_ids(imported_data["data"], taken=set(self.library.model.ids))  # Importing an export twice must not duplicate ids
+                    self.perform("Import", [("insert", len(self.data), imported_data["data"])])
                 else:
-                    self.data = imported_data["data"]
-                self.filtered_data = self.data[:]
-                self.refresh_listbox()
-                self.save_data()
+                    ensure_ids(imported_data["data"])
+                    self.back_up("import")
+                    self.perform("Import", [("remove", 0, list(self.data)), ("insert", 0, imported_data["data"])])
             except (json.JSONDecodeError, ValueError) as e:
                 QtWidgets.QMessageBox.critical(self, "Import Error", f"Error importing data: {str(e)}")
 
+    def run_backup(self):
+        self.back_up("scheduled")
+
+    def back_up(self, reason):
+        # Queue a backup of every library as it is now. Loaded libraries are handed over as copies of their item
+        # lists, which is cheap since items are replaced, never changed in place; hashing and writing happen on the backup thread
+        if reason == "scheduled":
+            if self.backup_revision == self.data_revision:
+                return
+            self.backup_revision = self.data_revision
+        elif reason == "delete" and self.backups.pending():
+            return  # A backup from before an earlier delete is still queued, and single deletes can be undone
+        sources = []
+        for library in self.libraries:
+            if library.snapshot is None and library.items is not None:
+                sources.append((library.name, library.file, list(library.items)))
+            else:
+                sources.append((library.name, library.file, library.path()))  # Unloaded, or unchanged since the file was written
+        self.backups.back_up(reason, sources)
+
+    def restore_backup(self):
+        # Pick a backup generation holding the current library; its items are read on the backup thread, see apply_restore
+        self.release_all_modifiers()
+        generations = [entry for entry in reversed(backup.read_index(BACKUP_DIR)) if self.library.name in entry["counts"]]
+        if not generations:
+            QtWidgets.QMessageBox.information(self, "Restore Backup", f"There are no backups of {self.library.name} yet.")
+            return
+        labels = [f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['time']))}  {entry['reason']}  ({entry['counts'][self.library.name]} items)" for entry in generations]
+        choice, ok = QtWidgets.QInputDialog.getItem(self, "Restore Backup", f"Replace the items of {self.library.name} with the backup from:", labels, 0, False)
+        if ok:
+            self.backups.restore(generations[labels.index(choice)]["id"], self.library.name)
+
+    def apply_restore(self, generation, name, items):
+        # Replace the library's items in one undoable step, after backing up what it holds now
+        library = self.find_library(name)
+        if items is None or library is None:
+            QtWidgets.QMessageBox.warning(self, "Restore Backup", f"The backup {generation} has no library {name}.")
+            return
+        if library is not self.library:
+            self.switch_library(name)
+            if library is not self.library:
+                return
+        ensure_ids(items)
+        self.back_up("restore")
+        self.perform("Restore", [("remove", 0, list(self.data)), ("insert", 0, items)])
+        self.listbox.setCurrentRow(0)
+
+    def report_backup_error(self, message):
+        if self.tray_icon and self.isHidden():
+            self.tray_icon.showMessage("MyMultiClipboard", message, QSystemTrayIcon.Warning)
+        else:
+            QtWidgets.QMessageBox.warning(self, "Backup", message)
+
     def export_data(self):
         file_path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Data", "MMC_item_list", "JSON files (*.json);;All files (*.*)")
         if file_path:
             try:
                 with open(file_path, "w") as f:
                     json.dump({
+                        "format": DATA_FORMAT,
                         "hotkey": self.config["hotkey"],
                         "window_width": self.config["window_width"],
                         "window_height": self.config["window_height"],
                         "window_x": self.x(),
                         "window_y": self.y(),
                         "data": self.data
-                    }, f, indent=4)
+                    }, f, indent=4, default=Item.to_dict)
                 QtWidgets.QMessageBox.information(self, "Export Successful", "Data exported successfully.")
             except Exception as e:
                 QtWidgets.QMessageBox.critical(self, "Export Error", f"Error exporting data: {str(e)}")
 
     def refresh_listbox(self):
-        self.listbox.clear()
-        for i, item in enumerate(self.filtered_data):
-            prefix = f"{i:X} " if i < 16 else "  "
-            list_item = QtWidgets.QListWidgetItem(prefix + item["name"])  # Add prefix for the first 16 items
-            list_item.setBackground(QtGui.QColor(item["color"]))
-            list_item.setForeground(QtGui.QColor("#00008B"))  # Set font color to dark blue
-            if i < 16:
-                font = list_item.font()
-                font.setBold(True)
-                list_item.setFont(font)
-                list_item.setForeground(QtGui.QColor("green"))  # Set font color to green for the first 16 items
-            self.listbox.addItem(list_item)
-        self.update_selected_item_border()
-
-    def update_selected_item_border(self):
-        for index in range(self.listbox.count()):
-            item = self.listbox.item(index)
-            widget = self.listbox.itemWidget(item)
-            if widget is None:
-                widget = QtWidgets.QLabel(item.text())
-                widget.setStyleSheet(f"background-color: {item.background().color().name()}; color: #00008B; padding-left: 2px;")
-                self.listbox.setItemWidget(item, widget)
-            if index == self.selected_index:
-                widget.setStyleSheet(f"background-color: {item.background().color().name()}; color: #00008B; border: 1px solid red; padding-left: 2px; font-weight: bold;")
-            else:
-                widget.setStyleSheet(f"background-color: {item.background().color().name()}; color: #00008B; border: none; padding-left: 2px; font-weight: normal;")
+        # Rebuild the id registry and rows after a bulk change; single-item edits update the model row by row
+        self.library.by_id.clear()
+        self.library.by_id.update((item["id"], item) for item in self.data)
+        self.filtered_ids = [item["id"] for item in self.data]
+        self.library.model.set_ids(self.filtered_ids)
+        self.listbox.setCurrentRow(self.selected_index)
 
     def save_data(self):
+        # Other libraries are written to their own file; data.json keeps the settings, their name index and Main
+        self.data_revision += 1
+        if self.disk_changed():
+            self.reload_before_save()
+        if self.library.snapshot is None:
+            abbreviations = abbreviation_index(self.data)
+            if abbreviations != self.library.abbreviations:
+                self.library.abbreviations = abbreviations
+                self.rebuild_matcher()
+        if self.library.file:
+            self.write_library(self.library)
+        self.update_tray_index()
         with open(DATA_FILE, "w") as f:
             json.dump({
+                "format": DATA_FORMAT,
                 "hotkey": self.config["hotkey"],
                 "window_width": self.config["window_width"],
                 "window_height": self.config["window_height"],
-                "window_x": self.x(),
-                "window_y": self.y(),
-                "data": self.data
-            }, f, indent=4)
+                "window_x": self.x() if self.window_built else self.config["window_x"],
+                "window_y": self.y() if self.window_built else self.config["window_y"],
+                "theme": self.config["theme"],
+                "library": self.config["library"],  # Followed by switch_library; the window switches to it when it is built
+                "library_cache_mb": self.config["library_cache_mb"],
+                "undo_depth": self.config["undo_depth"],
+                "undo_cap_mb": self.config["undo_cap_mb"],
+                "vault_check": self.config["vault_check"],
+                "secret_timeout_min": self.config["secret_timeout_min"],
+                "compress_min_kb": self.config["compress_min_kb"],
+                "snapshot": self.config["snapshot"],
+                "launch_timeout_s": self.config["launch_timeout_s"],
+                "tray_items": self.config["tray_items"],
+                "idle_trim_min": self.config["idle_trim_min"],
+                "editor_preview_kb": self.config["editor_preview_kb"],
+                "text_expansion": self.config["text_expansion"],
+                "backup_interval_min": self.config["backup_interval_min"],
+                "backup_keep": self.config["backup_keep"],
+                "window_prewarm_s": self.config["window_prewarm_s"],
+                "sync_url": self.config["sync_url"],
+                "sync_interval_s": self.config["sync_interval_s"],
+                "pinned": self.pinned,
+                "usage": self.usage,
+                "tray_index": self.tray_index,
+                "abbreviations": self.libraries[0].abbreviations,
+                "libraries": [{"name": library.name, "file": library.file, "names": library.names, "abbreviations": library.abbreviations} for library in self.libraries[1:]],
+                "data": self.libraries[0].items_to_write()
+            }, f, indent=4, default=Item.to_dict)
+        self.usage_dirty = False
+        self.tray_items = None
+        self.remember_disk_state()
+        self.snapshot_timer.start()
+        if self.syncer is not None:
+            self.sync_soon.start()
+
+    def write_library(self, library):
+        # Write a library other than Main to its own file; its name index goes into data.json with the next save
+        library.names = [item["name"] for item in library.items]
+        library.measure()
+        with open(library.path(), "w") as f:
+            json.dump({"format": DATA_FORMAT, "data": library.items}, f, indent=4, default=Item.to_dict)
 
     def move_item_up(self):
         current_row = self.listbox.currentRow()
         if current_row > 0:
-            self.data.insert(current_row - 1, self.data.pop(current_row))
-            self.filtered_data = self.data[:]
-            self.refresh_listbox()
+            self.perform("Move", [("move", current_row, current_row - 1)])
             self.listbox.setCurrentRow(current_row - 1)
-            self.save_data()
 
     def move_item_down(self):
         current_row = self.listbox.currentRow()
-        if current_row < self.listbox.count() - 1:
-            self.data.insert(current_row + 1, self.data.pop(current_row))
-            self.filtered_data = self.data[:]
-            self.refresh_listbox()
+        if current_row != -1 and current_row < self.listbox.count() - 1:
+            self.perform("Move", [("move", current_row, current_row + 1)])
             self.listbox.setCurrentRow(current_row + 1)
-            self.save_data()
 																			  
     def show(self):
         # Override the show method to focus on the last selected item.
+        self.build_window()
         super().show()
         self.setFocus()  # Set focus on the listbox
         if self.selected_index == -1 and self.listbox.count() > 0:  # Ensure there is a first selected index
             self.selected_index = 0
         if self.selected_index != -1:  # Ensure there is a last selected index
-            item = self.listbox.item(self.selected_index)
-            self.listbox.setCurrentItem(item)  # Set the current item to the last selected one
+            self.listbox.setCurrentRow(self.selected_index)  # Set the current item to the last selected one
         self.listbox.setFocus()  # Set focus on the listbox
 
     def show2(self):
         self.show()
         self.activateWindow()
         self.listbox.setFocus()
-        self.update_tray_menu()
 
     def show_and_focus(self):
         self.show()
@@ -823,8 +2723,7 @@ class PopupApp(QtWidgets.QWidget):
     def set_focus_on_listbox(self):
         self.listbox.setFocus()
         if self.selected_index != -1:  # Ensure there is a last selected index
-            item = self.listbox.item(self.selected_index)
-            self.listbox.setCurrentItem(item)  # Set the current item to the last selected one
+            self.listbox.setCurrentRow(self.selected_index)  # Set the current item to the last selected one
         self.listbox.setFocus()  # Set focus on the listbox
         keyboard.release('ctrl')  # Release the Ctrl key to prevent it from getting stuck
 
@@ -845,10 +2744,13 @@ class PopupApp(QtWidgets.QWidget):
 
         self.tray_icon.setToolTip("MyMultiClipboard")
         self.tray_menu = QMenu()
+        self.tray_separator = self.tray_menu.addSeparator()  # Pinned and most used items go above it when the menu opens
+        self.tray_separator.setVisible(False)
+        self.tray_menu.aboutToShow.connect(self.fill_tray_menu)
 
-        # Add "Open" and "Quit" actions
+        # Add "Open" and "Quit" actions; the label follows the window state when the menu opens
         self.open_action = QAction("Show", self)
-        self.open_action.triggered.connect(self.show2)
+        self.open_action.triggered.connect(self.toggle_window)
         quit_action = QAction("Quit", self)
         quit_action.triggered.connect(self.close)
 
@@ -864,20 +2766,92 @@ class PopupApp(QtWidgets.QWidget):
         if reason == QSystemTrayIcon.DoubleClick:
             self.show2()
 
-    def update_tray_menu(self):
+    def fill_tray_menu(self):
+        # Runs as the tray menu opens; item entries are rebuilt only when the cached list was invalidated
+        self.open_action.setText("Show" if self.isHidden() else "Hide")
+        if self.tray_items is not None:
+            return
+        self.tray_items = self.top_items()
+        for action in self.tray_entries:
+            self.tray_menu.removeAction(action)
+            action.deleteLater()
+        self.tray_entries = []
+        for item_id, name, pinned in self.tray_items:
+            label = (name if len(name) <= 60 else name[:57] + "...").replace("&", "&&")
+            action = QAction(("\u2605 " if pinned else "") + label, self.tray_menu)
+            action.triggered.connect(lambda checked=False, item_id=item_id: self.copy_from_tray(item_id))
+            self.tray_menu.insertAction(self.tray_separator, action)
+            self.tray_entries.append(action)
+        self.tray_separator.setVisible(bool(self.tray_entries))
+
+    def copy_from_tray(self, item_id):
+        item, library = self.find_item(item_id)
+        if item is None:
+            library = self.indexed_library(item_id)
+            if library is not None and self.open_library(library):
+                item = library.lookup(item_id)  # Opened on demand; it stays in the LRU of loaded libraries
+        if item is None:
+            self.tray_items = None  # Deleted since the menu was built
+            return
+        self.use_item(item, library)
+        self.evict_libraries()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        if self.config["idle_trim_min"] > 0 and not event.spontaneous():
+            self.idle_timer.start(self.config["idle_trim_min"] * 60 * 1000)
+
+    def showEvent(self, event):
+        self.idle_timer.stop()
+        if self.trimmed:
+            self.restore_view()
+        super().showEvent(event)
+
+    def trim_idle(self):
+        # Hidden for a while: release what the next show can rebuild. Items, settings and undo history stay
+        if self.isVisible() or self.trimmed:
+            return
+        self.trimmed = True
+        row = self.listbox.currentRow() if self.listbox.currentRow() != -1 else self.selected_index
+        selection = self.listbox.selectionModel()
+        self.listbox.setModel(None)  # Drops the view's row layout and selection for the whole library
+        if selection is not None:
+            selection.deleteLater()
+        self.selected_index = row  # Clearing the selection reset it
+        self.chrome_cache.clear()
+        for name in ("edit_popup", "hotkey_dialog"):
+            dialog = getattr(self, name)
+            if dialog is not None:
+                dialog.deleteLater()
+                setattr(self, name, None)  # Built again on first use
+        self.evict_libraries(0)
+        for library in self.libraries:
+            library.templates = {}
+            if library.model is not None:
+                library.model.colors.clear()
+            if library.snapshot is not None:
+                dict.clear(library.by_id)  # Rows decoded so far; untouched since the snapshot was opened, so they decode the same again
+        self.tray_items = None
+        QtGui.QPixmapCache.clear()
+        QtCore.QTimer.singleShot(0, trim_process_memory)  # After the deleteLater calls have run
+
+    def restore_view(self):
+        # Only the model is reattached; the batched layout paints the first screen before laying out the rest
+        self.trimmed = False
+        row = self.selected_index
+        self.listbox.setModel(self.library.model)
+        self.listbox.setCurrentRow(row)
+        self.selected_index = row
+
+    def toggle_window(self):
         if self.isHidden():
-            self.open_action.setText("Show")
-            self.open_action.triggered.disconnect()
-            self.open_action.triggered.connect(self.show2)
+            self.show2()
         else:
-            self.open_action.setText("Hide")
-            self.open_action.triggered.disconnect()
-            self.open_action.triggered.connect(self.hide_window)
+            self.hide_window()
 
     def hide_window(self):
         self.hide()
         self.send_to_systray()
-        self.update_tray_menu()
 
     def close(self, event):
         #Handle window close event to remove the system tray icon."""
@@ -901,6 +2875,7 @@ class PopupApp(QtWidgets.QWidget):
         #Handle window close event to quit the application."""
         if self.tray_icon:
             self.tray_icon.hide()  # Hide the system tray icon before closing
+        self.shutdown()
         event.accept()  # Accept the close event, allowing the window to close
 							
     def show_window(self):
@@ -920,21 +2895,22 @@ class PopupApp(QtWidgets.QWidget):
 
     def open_url(self):
         # Open the selected item in the default browser if it is a valid URL.
-        item = self.listbox.currentItem()
-        if item:
-            index = self.listbox.row(item)
-            content = self.filtered_data[index]["data"]
+        index = self.listbox.currentRow()
+        if index != -1:
+            content = self.item_data(self.item_at(index))
+            if content is None:
+                return
             threading.Thread(target=pyperclip.copy, args=(content,)).start()  # Copy to clipboard in a separate thread
             threading.Thread(target=winsound.Beep, args=(1000, 500)).start()  # Make a more noticeable beep sound in a separate thread
             self.hide()
             self.send_to_systray()
-            self.update_tray_menu()
 
-    def adjust_hotkey(self):
+    def build_hotkey_dialog(self):
+        # Build the hotkey dialog and its dropdowns once; adjust_hotkey only resets the selection
         self.hotkey_dialog = QtWidgets.QDialog(self)
         self.hotkey_dialog.setWindowTitle("Adjust Hotkey")
         self.hotkey_dialog.setWindowFlags(QtCore.Qt.FramelessWindowHint | QtCore.Qt.Dialog)
-        self.hotkey_dialog.setStyleSheet("background-color: #009999; border-radius: 5px;")
+        self.hotkey_dialog.setProperty("role", "dialog")
         self.hotkey_dialog.setMinimumWidth(300)
         self.hotkey_dialog.setMinimumHeight(150)  # Increase height to ensure buttons are visible
         self.hotkey_dialog.setModal(True)
@@ -944,7 +2920,6 @@ class PopupApp(QtWidgets.QWidget):
         layout = QtWidgets.QVBoxLayout()
 
         label = QtWidgets.QLabel("Select the new hotkey:", self.hotkey_dialog)
-        label.setStyleSheet("color: white; height:30px; font-size: 14px;")
         layout.addWidget(label)
 
         # Dropdown for modifiers
@@ -954,19 +2929,7 @@ class PopupApp(QtWidgets.QWidget):
             "Ctrl+Alt+Shift", "Ctrl+Win", "Alt+Win", "Shift+Win", "Ctrl+Alt+Win", 
             "Ctrl+Shift+Win", "Alt+Shift+Win", "Ctrl+Alt+Shift+Win"
         ])
-        self.modifier_dropdown.setStyleSheet("""
-            QComboBox {
-                background-color: #2d2d2d; 
-                color: white; 
-                border: solid 1px #ccc; 
-                border-radius: 3px; 
-                height:30px; 
-                font-size: 14px;
-            }
-            QComboBox:focus {
-                border: 2px solid gray;
-            }
-        """)
+        self.modifier_dropdown.setObjectName("HotkeyDropdown")
         layout.addWidget(self.modifier_dropdown)
 
         # Dropdown for keys
@@ -977,62 +2940,35 @@ class PopupApp(QtWidgets.QWidget):
             "3", "4", "5", "6", "7", "8", "9", "0", "F1", "F2", "F3", "F4", "F5", 
             "F6", "F7", "F8", "F9", "F10", "F11", "F12"
         ])
-        self.key_dropdown.setStyleSheet("""
-            QComboBox {
-                background-color: #2d2d2d; 
-                color: white; 
-                border: solid 1px #ccc; 
-                border-radius: 3px; 
-                height:30px; 
-                font-size: 14px;
-            }
-            QComboBox:focus {
-                border: 2px solid gray;
-            }
-        """)
+        self.key_dropdown.setObjectName("HotkeyDropdown")
         layout.addWidget(self.key_dropdown)
 
-        # Set current hotkey in dropdowns
-        current_hotkey = self.config["hotkey"]
-        modifier, key = current_hotkey.rsplit("+", 1)
-        self.modifier_dropdown.setCurrentText(modifier)
-        self.key_dropdown.setCurrentText(key)
-
         button_layout = QtWidgets.QHBoxLayout()
 
         ok_button = QtWidgets.QPushButton("OK", self.hotkey_dialog)
-        ok_button.setStyleSheet("""
-            QPushButton {
-                background-color: #0099cc; 
-                color: white; 
-                height:30px; 
-                border: solid 1px #6600cc;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        ok_button.setObjectName("OkButton")
         ok_button.clicked.connect(self.save_new_hotkey)
         button_layout.addWidget(ok_button)
 
         cancel_button = QtWidgets.QPushButton("Cancel", self.hotkey_dialog)
-        cancel_button.setStyleSheet("""
-            QPushButton {
-                background-color: #ff9999; 
-                color: white; 
-                height:30px; 
-                border: solid 1px #6600cc;
-            }
-            QPushButton:focus {
-                border: 2px solid gray;
-            }
-        """)
+        cancel_button.setObjectName("CancelButton")
         cancel_button.clicked.connect(self.hotkey_dialog.close)
         button_layout.addWidget(cancel_button)
 
         layout.addLayout(button_layout)
 
         self.hotkey_dialog.setLayout(layout)
+
+    def adjust_hotkey(self):
+        if self.hotkey_dialog is None:
+            self.build_hotkey_dialog()
+
+        # Set current hotkey in dropdowns
+        current_hotkey = self.config["hotkey"]
+        modifier, key = current_hotkey.rsplit("+", 1)
+        self.modifier_dropdown.setCurrentText(modifier)
+        self.key_dropdown.setCurrentText(key)
+
         self.hotkey_dialog.setFocus()
         self.hotkey_dialog.show()
         self.release_all_modifiers()  # Release all modifier keys after showing the dialog
@@ -1057,7 +2993,7 @@ class PopupApp(QtWidgets.QWidget):
             return
         
         try:
-            keyboard.add_hotkey(new_hotkey, self.show_and_focus, suppress=True)
+            keyboard.add_hotkey(new_hotkey, self.hotkey_pressed.emit, suppress=True)
             self.config["hotkey"] = new_hotkey
             self.save_data()
             QtWidgets.QMessageBox.information(self, "Hotkey Changed", f"Hotkey changed to: {new_hotkey}")
@@ -1069,7 +3005,7 @@ class PopupApp(QtWidgets.QWidget):
     def update_hotkey_listener(self):
         keyboard.clear_all_hotkeys()
         hotkey = self.config.get("hotkey", "ctrl+alt+p")
-        keyboard.add_hotkey(hotkey, self.show_and_focus, suppress=True)  # Suppress the hotkey globally
+        keyboard.add_hotkey(hotkey, self.hotkey_pressed.emit, suppress=True)  # Suppress the hotkey globally
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -1089,9 +3025,11 @@ class PopupApp(QtWidgets.QWidget):
             event.accept()
 
     def resizeEvent(self, event):
-        self.config["window_width"] = self.width()
-        self.config["window_height"] = self.height()
-        self.save_data()
+        self.invalidate_chrome()
+        if (self.width(), self.height()) != (self.config["window_width"], self.config["window_height"]):
+            self.config["window_width"] = self.width()
+            self.config["window_height"] = self.height()
+            self.save_data()  # Not on the first show, which would rewrite every item for an unchanged size
         super().resizeEvent(event)
 
 if __name__ == "__main__":
@@ -1101,16 +3039,45 @@ if __name__ == "__main__":
     # Create application
     app = QtWidgets.QApplication(sys.argv)
     
-    # Load config
+    # Load config; a current snapshot carries the settings, so the items don't have to be parsed here
     config = DEFAULT_CONFIG.copy()
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            file_data = json.load(f)
-            config["hotkey"]        = file_data.get("hotkey",        DEFAULT_CONFIG["hotkey"])
-            config["window_width"]  = file_data.get("window_width",  DEFAULT_CONFIG["window_width"])
-            config["window_height"] = file_data.get("window_height", DEFAULT_CONFIG["window_height"])
-            config["window_x"]      = file_data.get("window_x",      DEFAULT_CONFIG["window_x"])
-            config["window_y"]      = file_data.get("window_y",      DEFAULT_CONFIG["window_y"])
+    file_data = {}
+    snapshot = open_snapshot(snapshot_path(), DATA_FILE)
+    if snapshot is not None:
+        settings = snapshot.settings
+    elif os.path.exists(DATA_FILE):
+        try:
+            with open(DATA_FILE, "r") as f:
+                file_data = json.load(f)
+        except ValueError:
+            file_data = None  # Not rewritten here: load_data sets the unreadable file aside before starting over
+        settings = file_data if isinstance(file_data, dict) else {}
+    else:
+        settings = {}
+    config["hotkey"]             = settings.get("hotkey", DEFAULT_CONFIG["hotkey"])
+    config["window_width"]       = settings.get("window_width", DEFAULT_CONFIG["window_width"])
+    config["window_height"]      = settings.get("window_height", DEFAULT_CONFIG["window_height"])
+    config["window_x"]           = settings.get("window_x", DEFAULT_CONFIG["window_x"])
+    config["window_y"]           = settings.get("window_y", DEFAULT_CONFIG["window_y"])
+    config["theme"]              = settings.get("theme", DEFAULT_CONFIG["theme"])
+    config["library"]            = settings.get("library", DEFAULT_CONFIG["library"])
+    config["library_cache_mb"]   = settings.get("library_cache_mb", DEFAULT_CONFIG["library_cache_mb"])
+    config["undo_depth"]         = settings.get("undo_depth", DEFAULT_CONFIG["undo_depth"])
+    config["undo_cap_mb"]        = settings.get("undo_cap_mb", DEFAULT_CONFIG["undo_cap_mb"])
+    config["vault_check"]        = settings.get("vault_check", DEFAULT_CONFIG["vault_check"])
+    config["secret_timeout_min"] = settings.get("secret_timeout_min", DEFAULT_CONFIG["secret_timeout_min"])
+    config["compress_min_kb"]    = settings.get("compress_min_kb", DEFAULT_CONFIG["compress_min_kb"])
+    config["snapshot"]           = settings.get("snapshot", DEFAULT_CONFIG["snapshot"])
+    config["launch_timeout_s"]   = settings.get("launch_timeout_s", DEFAULT_CONFIG["launch_timeout_s"])
+    config["tray_items"]         = settings.get("tray_items", DEFAULT_CONFIG["tray_items"])
+    config["idle_trim_min"]      = settings.get("idle_trim_min", DEFAULT_CONFIG["idle_trim_min"])
+    config["editor_preview_kb"]  = settings.get("editor_preview_kb", DEFAULT_CONFIG["editor_preview_kb"])
+    config["text_expansion"]     = settings.get("text_expansion", DEFAULT_CONFIG["text_expansion"])
+    config["backup_interval_min"] = settings.get("backup_interval_min", DEFAULT_CONFIG["backup_interval_min"])
+    config["backup_keep"]        = settings.get("backup_keep", DEFAULT_CONFIG["backup_keep"])
+    config["window_prewarm_s"]   = settings.get("window_prewarm_s", DEFAULT_CONFIG["window_prewarm_s"])
+    config["sync_url"]           = settings.get("sync_url", DEFAULT_CONFIG["sync_url"])
+    config["sync_interval_s"]    = settings.get("sync_interval_s", DEFAULT_CONFIG["sync_interval_s"])
 
     # Adjust window position and size if out of screen boundaries
     screen_geometry = QtWidgets.QDesktopWidget().screenGeometry()
@@ -1123,27 +3090,68 @@ if __name__ == "__main__":
     if config["window_y"] < 0:
         config["window_y"] = 0
 
-    # Save adjusted config to data.json
-    with open(DATA_FILE, "w") as f:
-        json.dump({
-            "hotkey": config["hotkey"],
-            "window_width": config["window_width"],
-            "window_height": config["window_height"],
-            "window_x": config["window_x"],
-            "window_y": config["window_y"],
-            "data": file_data.get("data", [])
-        }, f, indent=4)
-
-    window = PopupApp(config)
-    window.show()						 
+    # Save adjusted config to data.json; with a snapshot only when the window had to move, since that means parsing the items
+    if snapshot is not None and any(config[key] != settings.get(key, DEFAULT_CONFIG[key]) for key in ("window_x", "window_y")):
+        snapshot.close()
+        snapshot = None
+        with open(DATA_FILE, "r") as f:
+            file_data = json.load(f)
+    if snapshot is None and isinstance(file_data, dict):
+        data = file_data.get("data", [])
+        abbreviations = file_data.get("abbreviations")
+        if isinstance(data, list) and all(isinstance(item, dict) for item in data):
+            ensure_ids(data)  # Files from before ids get theirs here, and keep them
+            if file_data.get("format", 1) < DATA_FORMAT:
+                pack_items(data, config["compress_min_kb"] * 1024)  # This write makes the file format 2, so pack its long items now
+            if abbreviations is None:
+                abbreviations = abbreviation_index(data)  # Files from before abbreviations get their index here, once
+        with open(DATA_FILE, "w") as f:
+            json.dump({
+                "format": DATA_FORMAT,
+                "hotkey": config["hotkey"],
+                "window_width": config["window_width"],
+                "window_height": config["window_height"],
+                "window_x": config["window_x"],
+                "window_y": config["window_y"],
+                "theme": config["theme"],
+                "library": config["library"],
+                "library_cache_mb": config["library_cache_mb"],
+                "undo_depth": config["undo_depth"],
+                "undo_cap_mb": config["undo_cap_mb"],
+                "vault_check": config["vault_check"],
+                "secret_timeout_min": config["secret_timeout_min"],
+                "compress_min_kb": config["compress_min_kb"],
+                "snapshot": config["snapshot"],
+                "launch_timeout_s": config["launch_timeout_s"],
+                "tray_items": config["tray_items"],
+                "idle_trim_min": config["idle_trim_min"],
+                "editor_preview_kb": config["editor_preview_kb"],
+                "text_expansion": config["text_expansion"],
+                "backup_interval_min": config["backup_interval_min"],
+                "backup_keep": config["backup_keep"],
+                "window_prewarm_s": config["window_prewarm_s"],
+                "sync_url": config["sync_url"],
+                "sync_interval_s": config["sync_interval_s"],
+                "pinned": file_data.get("pinned", []),
+                "usage": file_data.get("usage", {}),
+                "tray_index": file_data.get("tray_index", {}),
+                "abbreviations": abbreviations,
+                "libraries": file_data.get("libraries", []),
+                "data": data
+            }, f, indent=4)
+
+    # Only the tray icon at startup; the window is built on first show or by the prewarm timer
+    window = PopupApp(config, snapshot)
     window.send_to_systray()
-    window.hide()
     
     # Add hotkey listener in background thread
     def listen_hotkeys():
         hotkey = config.get("hotkey", "ctrl+alt+p")
-        keyboard.add_hotkey(hotkey, window.show_and_focus, suppress=True)  # Suppress the hotkey globally
+        keyboard.add_hotkey(hotkey, window.hotkey_pressed.emit, suppress=True)  # Suppress the hotkey globally
         window.release_all_modifiers()  # Release all modifier keys after hotkey is pressed
+        if config["text_expansion"]:
+            keyboard.hook(window.on_key)  # Watches typing for item abbreviations
+            pynput.mouse.Listener(on_click=window.on_click).start()  # keyboard sees no clicks, which move the caret too
 							   
 		 
     hotkey_thread = threading.Thread(target=listen_hotkeys, daemon=True)
@@ -0,0 +1,133 @@
+# Binary snapshot of data.json for fast cold starts. The file is memory-mapped and rows are decoded
+# one at a time as they are looked up; it is only trusted while the checksum it was written with
+# matches data.json, which stays the source of truth.
+#
+# Layout (little endian):
+#   header    magic "MMCS", format version, blake2b-128 of data.json, row count
+#   sections  (offset, length) of: settings JSON, palette JSON, ids, row table, string pool
+#   ids       every item id, joined with "\n", so the id column splits in one call
+#   row table per row: name, data and extra JSON as (offset, length) into the string pool, palette index
+#   pool      UTF-8 strings
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b"MMCS"
+VERSION = 1
+HEADER = struct.Struct("<4sH16sQ")
+SECTIONS = struct.Struct("<10Q")
+ROW = struct.Struct("<QIQIQIH")
+FIELDS = ("id", "name", "data", "color")
+
+
+def checksum(raw):
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def write_snapshot(path, source_checksum, settings, items, default_color):
+    # Write atomically next to the target; returns False when the items can't be represented
+    palette = {}
+    ids = []
+    rows = bytearray()
+    pool = bytearray()
+    for item in items:
+        item_id = item.get("id")
+        if not isinstance(item_id, str) or "\n" in item_id:
+            return False
+        ids.append(item_id)
+        fields = []
+        extra = {key: value for key, value in item.items() if key not in FIELDS}
+        for text in (item.get("name", ""), item.get("data", ""), json.dumps(extra) if extra else ""):
+            encoded = text.encode("utf-8")
+            fields += [len(pool), len(encoded)]
+            pool += encoded
+        color = item.get("color", default_color)
+        rows += ROW.pack(*fields, palette.setdefault(color, len(palette)))
+    sections = [json.dumps(settings).encode("utf-8"), json.dumps(list(palette)).encode("utf-8"), "\n".join(ids).encode("utf-8"), rows, pool]
+    offset = HEADER.size + SECTIONS.size
+    table = []
+    for section in sections:
+        table += [offset, len(section)]
+        offset += len(section)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, source_checksum, len(ids)))
+        f.write(SECTIONS.pack(*table))
+        for section in sections:
+            f.write(section)
+    os.replace(temp_path, path)
+    return True
+
+
+class Snapshot:
+    # An open, validated snapshot; close() once every row has been decoded
+    def __init__(self, path, source_checksum):
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self.file.close()
+            raise
+        try:
+            magic, version, stored_checksum, self.count = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC or version != VERSION or stored_checksum != source_checksum:
+                raise ValueError("Snapshot is stale or not a snapshot.")
+            table = SECTIONS.unpack_from(self.map, HEADER.size)
+            self.sections = [(table[n], table[n + 1]) for n in range(0, len(table), 2)]
+            self.settings = json.loads(self.section(0))
+            self.palette = json.loads(self.section(1))
+            self.rows_offset = self.sections[3][0]
+            self.pool_offset = self.sections[4][0]
+            if self.sections[3][1] != self.count * ROW.size or self.pool_offset + self.sections[4][1] > len(self.map):
+                raise ValueError("Snapshot is truncated.")
+        except (struct.error, ValueError):
+            self.close()
+            raise
+        self.size = len(self.map)
+
+    def section(self, index):
+        offset, length = self.sections[index]
+        return self.map[offset:offset + length]
+
+    def ids(self):
+        return self.section(2).decode("utf-8").split("\n") if self.count else []
+
+    def row(self, index):
+        # (name, data, color, extra dict or None) of one row, decoded straight from the mapping
+        name_offset, name_length, data_offset, data_length, extra_offset, extra_length, color = ROW.unpack_from(self.map, self.rows_offset + index * ROW.size)
+        base = self.pool_offset
+        name = self.map[base + name_offset:base + name_offset + name_length].decode("utf-8")
+        data = self.map[base + data_offset:base + data_offset + data_length].decode("utf-8")
+        extra = json.loads(self.map[base + extra_offset:base + extra_offset + extra_length]) if extra_length else None
+        return name, data, self.palette[color], extra
+
+    def extras(self):
+        # (row, extra dict) of the rows that have extra fields, read without decoding any name or data
+        base = self.pool_offset
+        for index, row in enumerate(ROW.iter_unpack(self.section(3))):
+            if row[5]:
+                yield index, json.loads(self.map[base + row[4]:base + row[4] + row[5]])
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def open_snapshot(path, source_path):
+    # The snapshot for source_path if it exists and was written from exactly this file, else None.
+    # A rebuilt snapshot stays in the .tmp file when the old one was still mapped (Windows); take it over now
+    if os.path.exists(path + ".tmp"):
+        try:
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+    if not os.path.exists(path) or not os.path.exists(source_path):
+        return None
+    try:
+        with open(source_path, "rb") as f:
+            source_checksum = checksum(f.read())
+        return Snapshot(path, source_checksum)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+## python sync.py [port] [folder] ##
+# Delta sync of libraries through a small HTTP server you run yourself. It listens on 127.0.0.1 only;
+# reach it from other machines through an SSH tunnel or a reverse proxy.
+#
+# The server numbers every change it accepts. A client sends the items it changed since its last sync,
+# each with the revision it was based on, and gets back what others changed since then, so a one-item
+# edit costs one item each way however large the library is. An item changed on both sides since that
+# revision comes back as a conflict for the client to resolve item by item. Bodies are zlib-compressed JSON.
+#
+# A record is [id, revision, item dict or None once deleted, id of the item before it or None at the top].
+# The client's sync state keeps [revision, digest, id of the item before it] of every item as last synced.
+import bisect
+import hashlib
+import json
+import os
+import sys
+import threading
+import urllib.parse
+import urllib.request
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROTOCOL = 1
+DEFAULT_PORT = 8765
+BATCH = 1000  # Changed items sent per request
+
+
+def encode(payload, default=None):
+    return zlib.compress(json.dumps(payload, default=default, separators=(",", ":")).encode("utf-8"))
+
+
+def decode(raw):
+    return json.loads(zlib.decompress(raw))
+
+
+def digest(item, default):
+    return hashlib.blake2b(json.dumps(item, default=default, sort_keys=True, separators=(",", ":")).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class Store:
+    # One library on the server: the newest record of every item, and the append-only file they are replayed from
+    def __init__(self, path):
+        self.path = path
+        self.records = {}  # Id -> [revision, item, after]
+        self.revisions = []  # Revisions in the order they were given out, next to the ids they went to
+        self.ids = []
+        self.seq = 0
+        self.lock = threading.Lock()
+        lines = 0
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        item_id, revision, item, after = json.loads(line)
+                    except ValueError:
+                        break  # A write cut short; what came before it stands
+                    self.records[item_id] = [revision, item, after]
+                    self.seq = max(self.seq, revision)
+                    lines += 1
+        for item_id, record in sorted(self.records.items(), key=lambda entry: entry[1][0]):
+            self.revisions.append(record[0])
+            self.ids.append(item_id)
+        if lines > 2 * len(self.records) + 1000:
+            self.compact()
+
+    def compact(self):
+        # Rewrite the file with only the newest record of each item
+        with open(self.path + ".tmp", "w") as f:
+            for revision, item_id in zip(self.revisions, self.ids):
+                f.write(json.dumps([item_id] + self.records[item_id], separators=(",", ":")) + "\n")
+        os.replace(self.path + ".tmp", self.path)
+
+    def sync(self, since, changes):
+        # Accept the changes whose base is still current, then list what changed after since (None: nothing)
+        with self.lock:
+            accepted = {}
+            conflicts = []
+            written = []
+            for item_id, base, item, after in changes:
+                record = self.records.get(item_id)
+                if record is not None and record[0] > base:
+                    if record[1] == item:
+                        accepted[item_id] = record[0]  # Both sides made the same change
+                    else:
+                        conflicts.append([item_id] + record)
+                    continue
+                if record is None and item is None:
+                    accepted[item_id] = 0  # Deleted before the server ever saw it
+                    continue
+                self.seq += 1
+                self.records[item_id] = [self.seq, item, after]
+                self.revisions.append(self.seq)
+                self.ids.append(item_id)
+                accepted[item_id] = self.seq
+                written.append(json.dumps([item_id, self.seq, item, after], separators=(",", ":")))
+            if written:
+                with open(self.path, "a") as f:
+                    f.write("\n".join(written) + "\n")
+            changed = []
+            if since is not None:
+                start = bisect.bisect_right(self.revisions, since)
+                changed = [[item_id] + self.records[item_id] for revision, item_id in zip(self.revisions[start:], self.ids[start:])
+                           if self.records[item_id][0] == revision and item_id not in accepted]
+            return {"seq": self.seq, "accepted": accepted, "changes": changed, "conflicts": conflicts}
+
+
+class Handler(BaseHTTPRequestHandler):
+    # POST /sync/<library name, percent-encoded>
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "sync":
+            self.send_error(404)
+            return
+        try:
+            payload = decode(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if payload.get("protocol") != PROTOCOL:
+                raise ValueError("Unsupported protocol.")
+            body = encode(self.server.store(urllib.parse.unquote(parts[1])).sync(payload["since"], payload["changes"]))
+        except (ValueError, KeyError, TypeError, zlib.error):
+            self.send_error(400)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SyncServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port, folder):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.folder = folder
+        self.stores = {}
+        self.stores_lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def store(self, name):
+        # Files are named by a hash of the library name, which may hold any character
+        with self.stores_lock:
+            store = self.stores.get(name)
+            if store is None:
+                file_name = hashlib.blake2b(name.encode("utf-8"), digest_size=8).hexdigest() + ".log"
+                store = self.stores[name] = Store(os.path.join(self.folder, file_name))
+            return store
+
+
+def exchange(url, library, since, changes, default, timeout):
+    # One round trip; the response and the bytes sent and received. Raises OSError or ValueError
+    body = encode({"protocol": PROTOCOL, "since": since, "changes": changes}, default)
+    request = urllib.request.Request(f"{url.rstrip('/')}/sync/{urllib.parse.quote(library, safe='')}", data=body,
+                                     headers={"Content-Type": "application/octet-stream"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        raw = response.read()
+    try:
+        return decode(raw), len(body) + len(raw)
+    except zlib.error as e:
+        raise ValueError(f"Unreadable response from the sync server: {e}")
+
+
+def local_changes(items, state, synced, default):
+    # Records of what changed here since the last sync: items added or edited (their digest differs), moved
+    # (the item before them differs) and deleted, plus the digest of each changed item. synced is the item list
+    # as last synced, or None; items are replaced, never changed in place, so only the items that are no longer
+    # the same objects are hashed, and when no row was added or removed only their rows are looked at
+    if synced is not None and len(synced) == len(items):
+        rows = set()
+        for row, (item, old) in enumerate(zip(items, synced)):
+            if item is not old:
+                rows.update((row, row + 1))  # The item after a replaced one may now follow a different id
+        rows.discard(len(items))
+        old_ids = {synced[row]["id"] for row in rows if items[row] is not synced[row]}
+    else:
+        rows = range(len(items))
+        old_ids = state.keys()
+        synced = {item["id"]: item for item in synced} if synced is not None else {}
+    changes = []
+    digests = {}
+    present = set()
+    for row in sorted(rows):
+        item = items[row]
+        item_id = item["id"]
+        after = items[row - 1]["id"] if row else None
+        present.add(item_id)
+        entry = state.get(item_id)
+        same = synced[row] is item if isinstance(synced, list) else synced.get(item_id) is item
+        item_digest = entry[1] if entry is not None and same else digest(item, default)
+        if entry is None or entry[1] != item_digest or entry[2] != after:
+            changes.append([item_id, entry[0] if entry is not None else 0, item, after])
+            digests[item_id] = item_digest
+    changes += [[item_id, state[item_id][0], None, None] for item_id in old_ids if item_id not in present and item_id in state]
+    return changes, digests
+
+
+def apply_records(items, records):
+    # The item list with the other side's records applied: edits replace the item where it is, deleted items go,
+    # and new or moved items follow the item their record names (the top for None, the end when it is gone)
+    if not records:
+        return items
+    rows = {item["id"]: row for row, item in enumerate(items)}
+    if all(item is not None and rows.get(item_id) is not None and (items[rows[item_id] - 1]["id"] if rows[item_id] else None) == after
+           for item_id, revision, item, after in records):
+        merged = list(items)  # Only edits of items that stay where they are, the usual case
+        for item_id, revision, item, after in records:
+            merged[rows[item_id]] = item
+        return merged
+    by_id = {item["id"]: item for item in items}
+    before = {}
+    after = None
+    for item in items:
+        before[item["id"]] = after
+        after = item["id"]
+    placed = {}  # Id -> the item it goes after
+    for item_id, revision, item, after in records:
+        if item is None:
+            by_id.pop(item_id, None)
+            continue
+        if item_id not in by_id or before.get(item_id) != after:
+            placed[item_id] = after
+        by_id[item_id] = item
+    following = {}
+    for item_id, after in placed.items():
+        following.setdefault(after, []).append(item_id)
+    order = []
+
+    def place(item_ids):
+        stack = item_ids[::-1]
+        while stack:
+            item_id = stack.pop()
+            order.append(item_id)
+            stack += following.pop(item_id, [])[::-1]
+    place(following.pop(None, []))
+    for item in items:
+        if item["id"] in by_id and item["id"] not in placed:
+            place([item["id"]])
+    while following:
+        place(following.pop(next(iter(following))))  # After an item that is gone
+    return [by_id[item_id] for item_id in order]
+
+
+def sync_library(url, name, items, entry, synced, resolved, default, timeout):
+    # Exchange one library's changes with the server; synced is the item list the last exchange left, see
+    # local_changes. resolved maps ids of earlier conflicts to the server's
+    # record and True to keep ours or False to take theirs. Returns the merged item list (new items as dicts),
+    # the new sync state, the conflicting records and the bytes transferred
+    state = dict(entry.get("items", {}))
+    take = []
+    for item_id, (record, keep_ours) in resolved.items():
+        if keep_ours:
+            state[item_id] = [record[1]] + state.get(item_id, [0, "", None])[1:]  # Based on their version now, so ours is accepted
+        else:
+            take.append(record)
+    taken = {record[0] for record in take}
+    changes, digests = local_changes(items, state, synced, default)
+    changes = [change for change in changes if change[0] not in taken]
+    accepted = {}
+    conflicts = []
+    transferred = 0
+    for start in range(0, max(len(changes), 1), BATCH):
+        last = start + BATCH >= len(changes)
+        response, size = exchange(url, name, entry.get("seq", 0) if last else None, changes[start:start + BATCH], default, timeout)
+        transferred += size
+        accepted.update(response["accepted"])
+        conflicts += response["conflicts"]
+    conflicted = {record[0] for record in conflicts}  # Left as they are here until the user picks a side
+    records = [record for record in response["changes"] if accepted.get(record[0]) != record[1] and record[0] not in conflicted] + take
+    merged = apply_records(items, records)
+    for item_id, base, item, after in changes:
+        if item_id not in accepted:
+            continue
+        if item is None or accepted[item_id] == 0:
+            state.pop(item_id, None)
+        else:
+            state[item_id] = [accepted[item_id], digests[item_id], after]
+    for item_id, revision, item, after in records:
+        if item is None:
+            state.pop(item_id, None)
+        else:
+            state[item_id] = [revision, digest(item, default), after]
+    return merged, {"seq": response["seq"], "items": state}, conflicts, transferred
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    folder = sys.argv[2] if len(sys.argv) > 2 else "sync_data"
+    server = SyncServer(port, folder)
+    print(f"Sync server on http://127.0.0.1:{server.server_address[1]}, data in {os.path.abspath(folder)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
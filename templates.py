@@ -0,0 +1,60 @@
+# Snippet templates: item data containing {date}, {time}, {clipboard} or {input:Label} is filled
+# in each time the item is used. {date:%d.%m.%Y} and {time:%H:%M} take a strftime format.
+# Braces that do not form a known placeholder are left as they are.
+import re
+import time
+
+PLACEHOLDER = re.compile(r"\{(date|time|clipboard|input)(?::([^{}]+))?\}")
+DEFAULT_FORMATS = {"date": "%Y-%m-%d", "time": "%H:%M:%S"}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class Template:
+    # Compiled form: literal strings and (kind, argument) placeholders, in order
+    def __init__(self, parts):
+        self.parts = parts
+        self.labels = list(dict.fromkeys(part[1] for part in parts if not isinstance(part, str) and part[0] == "input"))
+        self.needs_clipboard = any(not isinstance(part, str) and part[0] == "clipboard" for part in parts)
+
+
+def compile_template(text):
+    # None when the text has no placeholder, so plain items skip expansion entirely
+    if "{" not in text:
+        return None
+    parts = []
+    position = 0
+    for match in PLACEHOLDER.finditer(text):
+        kind, argument = match.group(1), match.group(2)
+        if (kind == "input" and argument is None) or (kind == "clipboard" and argument is not None):
+            continue  # {input} without a label and {clipboard:...} stay literal
+        if match.start() > position:
+            parts.append(text[position:match.start()])
+        parts.append((kind, argument))
+        position = match.end()
+    if not parts:
+        return None
+    if position < len(text):
+        parts.append(text[position:])
+    return Template(parts)
+
+
+def expand(template, inputs, clipboard=""):
+    # inputs maps each label in template.labels to the text typed for it; raises TemplateError
+    now = time.localtime()
+    out = []
+    for part in template.parts:
+        if isinstance(part, str):
+            out.append(part)
+        elif part[0] == "clipboard":
+            out.append(clipboard)
+        elif part[0] == "input":
+            out.append(inputs[part[1]])
+        else:
+            try:
+                out.append(time.strftime(part[1] or DEFAULT_FORMATS[part[0]], now))
+            except ValueError as e:  # A format this platform's strftime rejects; Windows is strict about them
+                raise TemplateError(f"{{{part[0]}:{part[1]}}} can't be filled in: {e}")
+    return "".join(out)
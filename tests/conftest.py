@@ -0,0 +1,54 @@
+# The modules under test sit next to popup2.py at the top of the repository. Tests of PopupApp run on Qt's
+# offscreen platform and are skipped where popup2 can't be imported (winsound and pynput are Windows-only)
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture
+def popup2(tmp_path, monkeypatch):
+    # popup2 with its files pointed at an empty temporary folder
+    try:
+        import popup2 as module
+    except Exception as e:  # Windows-only modules missing, or no display for the tray icon library
+        pytest.skip(f"popup2 can't be imported here: {e}")
+    monkeypatch.setattr(module, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(module, "DATA_FILE", str(tmp_path / "data.json"))
+    monkeypatch.setattr(module, "BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(module, "SYNC_STATE_FILE", str(tmp_path / "sync_state.json"))
+    monkeypatch.setattr(module.PopupApp, "release_all_modifiers", lambda self: None)
+    return module
+
+
+@pytest.fixture
+def open_window(popup2, monkeypatch):
+    # Opens PopupApps, shown unless asked not to, over data.json as the test wrote it (the default file when it wrote none); dialogs don't block
+    from PyQt5 import QtWidgets
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    monkeypatch.setattr(QtWidgets.QDialog, "exec_", lambda dialog: 0)
+    warnings = []
+    monkeypatch.setattr(QtWidgets.QMessageBox, "warning", staticmethod(lambda parent, title, text, *args: warnings.append(text)))
+    windows = []
+
+    def open_window(show=True):
+        window = popup2.PopupApp(popup2.DEFAULT_CONFIG.copy())
+        window.warnings = warnings
+        if show:
+            window.show()
+            app.processEvents()
+        windows.append(window)
+        return window
+
+    yield open_window
+    for window in windows:
+        window.hide()
+        window.shutdown()
+
+
+@pytest.fixture
+def window(open_window):
+    return open_window()
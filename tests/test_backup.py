@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+import backup
+
+
+def make_items(count, prefix="item"):
+    return [{"id": f"{prefix}{n}", "name": f"{prefix} {n}", "data": f"value {n}" * 5} for n in range(count)]
+
+
+def chunk_files(folder):
+    return {name for _, _, names in os.walk(os.path.join(folder, "chunks")) for name in names}
+
+
+def test_round_trip(tmp_path):
+    folder = str(tmp_path)
+    items = make_items(500)
+    entry = backup.write_generation(folder, "scheduled", [("Main", "", items), ("Other", "other.json", [])], None)
+    assert entry["counts"] == {"Main": 500, "Other": 0} and entry["reason"] == "scheduled"
+    assert backup.read_generation(folder, entry["id"], "Main") == items
+    assert backup.read_generation(folder, entry["id"], "Other") == []
+    assert backup.read_generation(folder, entry["id"], "Missing") is None
+
+
+def test_unchanged_libraries_make_no_generation(tmp_path):
+    folder = str(tmp_path)
+    items = make_items(100)
+    assert backup.write_generation(folder, "scheduled", [("Main", "", items)], None) is not None
+    assert backup.write_generation(folder, "scheduled", [("Main", "", list(items))], None) is None
+    assert len(backup.read_index(folder)) == 1
+
+
+def test_one_change_rewrites_one_chunk(tmp_path):
+    folder = str(tmp_path)
+    items = make_items(2000)
+    first = backup.write_generation(folder, "scheduled", [("Main", "", items)], None)
+    chunks = chunk_files(folder)
+    changed = list(items)
+    changed[1000] = dict(changed[1000], data="edited")
+    changed.insert(10, {"id": "new", "name": "new", "data": "inserted"})
+    second = backup.write_generation(folder, "delete", [("Main", "", changed)], None)
+    assert len(chunk_files(folder) - chunks) <= 4  # The chunks around the edit and the insert
+    assert second["written"] < first["written"] / 5
+    assert backup.read_generation(folder, second["id"], "Main") == changed
+    assert backup.read_generation(folder, first["id"], "Main") == items
+
+
+def test_prune_keeps_newest_and_their_chunks(tmp_path):
+    folder = str(tmp_path)
+    generations = [backup.write_generation(folder, "scheduled", [("Main", "", make_items(50, f"g{n}-"))], None) for n in range(4)]
+    assert len({entry["id"] for entry in generations}) == 4  # Same second: suffixed
+    assert backup.prune(folder, 2) == 2
+    assert [entry["id"] for entry in backup.read_index(folder)] == [entry["id"] for entry in generations[2:]]
+    for entry in generations[2:]:
+        assert backup.read_generation(folder, entry["id"], "Main") is not None
+    assert not os.path.exists(os.path.join(folder, generations[0]["id"] + ".json"))
+    referenced = {key for entry in generations[2:] for key in backup.read_manifest(folder, entry["id"])["libraries"][0]["chunks"]}
+    assert chunk_files(folder) == referenced
+    assert backup.prune(folder, 2) == 0
+
+
+def test_index_rebuilt_when_missing(tmp_path):
+    folder = str(tmp_path)
+    entry = backup.write_generation(folder, "scheduled", [("Main", "", make_items(10))], None)
+    os.remove(os.path.join(folder, backup.INDEX))
+    assert [summary["id"] for summary in backup.read_index(folder)] == [entry["id"]]
+
+
+def test_damaged_chunk(tmp_path):
+    folder = str(tmp_path)
+    entry = backup.write_generation(folder, "scheduled", [("Main", "", make_items(10))], None)
+    key = backup.read_manifest(folder, entry["id"])["libraries"][0]["chunks"][0]
+    with open(backup.chunk_path(folder, key), "wb") as f:
+        f.write(b"garbage")
+    with pytest.raises(ValueError):
+        backup.read_generation(folder, entry["id"], "Main")
+
+
+def test_large_items_end_chunks_early():
+    items = [{"id": str(n), "data": "x" * (600 * 1024)} for n in range(4)]
+    chunks = list(backup.chunk_items(items, None))
+    assert len(chunks) >= 2
+    assert [item for chunk in chunks for item in json.loads(chunk)] == items
@@ -0,0 +1,36 @@
+import base64
+import random
+import zlib
+
+import pytest
+
+import compression
+
+
+def test_round_trip():
+    text = "line of log text ✓\n" * 2000
+    codec, packed = compression.pack(text)
+    assert codec == compression.CODEC
+    assert len(packed) < len(text)
+    assert compression.unpack(codec, packed) == text
+
+
+def test_not_worth_packing():
+    assert compression.pack("short") is None
+    assert compression.pack(base64.b64encode(random.Random(1).randbytes(4096)).decode("ascii")) is None  # Incompressible
+
+
+def test_zlib_always_readable():
+    packed = base64.b64encode(zlib.compress("hello".encode("utf-8"))).decode("ascii")
+    assert compression.unpack("zlib", packed) == "hello"
+
+
+@pytest.mark.parametrize("packed", ["not base64!", base64.b64encode(b"not zlib").decode("ascii")])
+def test_damaged_data(packed):
+    with pytest.raises(ValueError):
+        compression.unpack("zlib", packed)
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        compression.unpack("brotli", base64.b64encode(b"x").decode("ascii"))
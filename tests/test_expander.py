@@ -0,0 +1,63 @@
+from expander import Matcher
+
+
+def type_text(matcher, text):
+    # Values returned while typing text, in order
+    return [value for value in map(matcher.feed, text) if value is not None]
+
+
+def test_expands_when_typed():
+    matcher = Matcher({";sig": "signature"})
+    assert type_text(matcher, "best, ;sig") == ["signature"]
+
+
+def test_longest_of_overlapping_suffixes_wins():
+    matcher = Matcher({"sig": "short", ";sig": "long"})
+    assert type_text(matcher, ";sig") == ["long"]
+    assert type_text(matcher, " sig") == ["short"]
+
+
+def test_word_abbreviation_only_at_word_start():
+    matcher = Matcher({"sig": "signature"})
+    assert type_text(matcher, "design ") == []
+    assert type_text(matcher, "my sig") == ["signature"]
+    assert type_text(matcher, "_sig") == []
+
+
+def test_punctuation_abbreviation_inside_word():
+    matcher = Matcher({";sig": "signature"})
+    assert type_text(matcher, "word;sig") == ["signature"]
+
+
+def test_shorter_match_at_word_start_when_longer_is_not():
+    matcher = Matcher({"ab": "short", "xab": "long"})
+    assert type_text(matcher, "wxab") == []
+    assert type_text(matcher, " ab") == ["short"]
+
+
+def test_backspace_steps_back():
+    matcher = Matcher({";sig": "signature"})
+    assert type_text(matcher, ";sx") == []
+    matcher.backspace()
+    assert type_text(matcher, "ig") == ["signature"]
+
+
+def test_backspace_restores_word_start():
+    matcher = Matcher({"sig": "signature"})
+    type_text(matcher, "a")
+    matcher.backspace()
+    assert type_text(matcher, "sig") == ["signature"]
+
+
+def test_reset_after_expansion():
+    matcher = Matcher({"ab": "x"})
+    assert type_text(matcher, "ab") == ["x"]
+    assert type_text(matcher, "b") == []
+    assert type_text(matcher, " ab") == ["x"]
+
+
+def test_empty_and_no_abbreviations():
+    matcher = Matcher({"": "never"})
+    assert type_text(matcher, "anything") == []
+    matcher.backspace()
+    matcher.reset()
@@ -0,0 +1,649 @@
+# PopupApp end to end, on a throwaway data.json; see conftest.py
+import json
+
+
+def write_data_file(popup2, items, **settings):
+    with open(popup2.DATA_FILE, "w") as f:
+        json.dump(dict(settings, data=items), f)
+
+
+def read_data_file(popup2):
+    with open(popup2.DATA_FILE) as f:
+        return json.load(f)
+
+
+def add_item(window, name, data, abbreviation=""):
+    window.add_line()
+    window.name_entry.setText(name)
+    window.data_entry.load(data, 1024 * 1024)
+    window.data_entry.finish_loading()
+    window.abbreviation_entry.setText(abbreviation)
+    window.submit_popup(window.name_entry, window.data_entry, window.color_buttons, window.edit_popup, None)
+
+
+def import_file(window, monkeypatch, tmp_path, file_data):
+    # Run import_data on file_data, adding to the items; the error shown, if any
+    from PyQt5 import QtWidgets
+    path = tmp_path / "import.json"
+    with open(path, "w") as f:
+        json.dump(file_data, f)
+    errors = []
+    monkeypatch.setattr(QtWidgets.QFileDialog, "getOpenFileName", staticmethod(lambda *args: (str(path), "")))
+    monkeypatch.setattr(QtWidgets.QMessageBox, "question", staticmethod(lambda *args: QtWidgets.QMessageBox.Yes))
+    monkeypatch.setattr(QtWidgets.QMessageBox, "critical", staticmethod(lambda parent, title, text, *args: errors.append(text)))
+    window.import_data()
+    return errors
+
+
+def entry(name, data="x"):
+    return {"id": name, "name": name, "data": data, "color": "#FFB3BA"}
+
+
+def write_libraries(popup2, tmp_path, **settings):
+    # Main and two libraries of their own files, Work and Home, with their name index in data.json
+    libraries = []
+    for name in ("Work", "Home"):
+        items = [entry(f"{name} {n}") for n in range(3)]
+        with open(tmp_path / f"{name}.json", "w") as f:
+            json.dump({"data": items}, f)
+        libraries.append({"name": name, "file": f"{name}.json", "names": [item["name"] for item in items]})
+    write_data_file(popup2, [entry("main")], libraries=libraries, **settings)
+
+
+def names(window):
+    return [item["name"] for item in window.data]
+
+
+def test_libraries_load_on_first_switch(popup2, open_window, tmp_path):
+    write_libraries(popup2, tmp_path)
+    window = open_window()
+    work = window.find_library("Work")
+    assert work.items is None and work.names == ["Work 0", "Work 1", "Work 2"]
+    window.switch_library("Work")
+    assert window.library is work and names(window) == work.names
+    assert work.model.rowCount() == 3
+    assert window.find_library("Home").items is None
+
+
+def test_switching_back_keeps_the_selection(popup2, open_window, tmp_path):
+    write_libraries(popup2, tmp_path)
+    window = open_window()
+    window.switch_library("Work")
+    window.listbox.setCurrentRow(2)
+    window.switch_library("Main")
+    assert names(window) == ["main"]
+    window.switch_library("Work")
+    assert window.listbox.currentRow() == 2
+
+
+def test_least_recently_used_library_is_evicted(popup2, open_window, tmp_path):
+    write_libraries(popup2, tmp_path, library_cache_mb=0)
+    window = open_window()
+    window.switch_library("Work")
+    window.switch_library("Home")
+    assert window.find_library("Work").items is None
+    assert list(window.loaded_libraries) == ["Home"]  # The shown one stays loaded over the cap
+    assert window.libraries[0].items is not None  # Main always does
+    window.switch_library("Work")
+    assert names(window) == ["Work 0", "Work 1", "Work 2"]  # Read again from its file
+
+
+def test_libraries_stay_loaded_within_the_cap(popup2, open_window, tmp_path):
+    write_libraries(popup2, tmp_path)
+    window = open_window()
+    window.switch_library("Work")
+    window.switch_library("Home")
+    window.switch_library("Work")
+    assert list(window.loaded_libraries) == ["Home", "Work"]
+
+
+def test_library_saved_to_its_own_file(popup2, open_window, tmp_path):
+    write_libraries(popup2, tmp_path)
+    window = open_window()
+    window.switch_library("Work")
+    window.data.append(popup2.to_item(entry("Work 3")))
+    window.save_data()
+    with open(tmp_path / "Work.json") as f:
+        assert [item["name"] for item in json.load(f)["data"]] == ["Work 0", "Work 1", "Work 2", "Work 3"]
+    file_data = read_data_file(popup2)
+    assert [item["name"] for item in file_data["data"]] == ["main"]
+    assert file_data["library"] == "Work"
+    assert file_data["libraries"][0]["names"][-1] == "Work 3"
+
+
+def test_new_library(window, monkeypatch, popup2, tmp_path):
+    from PyQt5 import QtWidgets
+    monkeypatch.setattr(QtWidgets.QInputDialog, "getText", staticmethod(lambda *args: ("My Notes", True)))
+    window.add_library()
+    assert window.library.name == "My Notes" and window.data == []
+    assert read_data_file(popup2)["libraries"] == [{"name": "My Notes", "file": "library_My_Notes.json", "names": [], "abbreviations": {}}]
+    window.add_library()
+    assert window.warnings == ["A library named My Notes already exists."]
+
+
+def test_merge_keeps_edits_from_both_sides(popup2):
+    base = [entry("a"), entry("b"), entry("c")]
+    local = [entry("a", "mine"), entry("b"), entry("c")]
+    remote = [entry("a"), entry("b"), entry("c", "theirs")]
+    assert popup2.merge_items(base, local, remote) == ([entry("a", "mine"), entry("b"), entry("c", "theirs")], 0)
+    assert popup2.merge_items(base, base, remote) == (remote, 0)
+    assert popup2.merge_items(base, local, base) == (local, 0)
+
+
+def test_merge_counts_conflicts(popup2):
+    base = [entry("a"), entry("b"), entry("c")]
+    local = [entry("a", "mine"), entry("b"), entry("c", "same")]
+    remote = [entry("a", "theirs"), entry("b"), entry("c", "same")]
+    assert popup2.merge_items(base, local, remote) == ([entry("a", "mine"), entry("b"), entry("c", "same")], 1)
+    assert popup2.merge_items(base, local, remote, keep_local=False) == ([entry("a", "theirs"), entry("b"), entry("c", "same")], 1)
+
+
+def test_merge_deletes_and_inserts(popup2):
+    base = [entry("a"), entry("b"), entry("c")]
+    local = [entry("a"), entry("new"), entry("b"), entry("c")]
+    remote = [entry("a"), entry("b"), entry("d")]
+    merged, conflicts = popup2.merge_items(base, local, remote)
+    assert [item["name"] for item in merged] == ["a", "new", "b", "d"] and conflicts == 0
+
+
+def test_merge_keeps_a_reorder(popup2):
+    base = [entry("a"), entry("b"), entry("c")]
+    local = [entry("c"), entry("a"), entry("b")]
+    remote = [entry("a"), entry("b", "theirs"), entry("c"), entry("d")]
+    merged, _ = popup2.merge_items(base, local, remote)
+    assert merged == [entry("c"), entry("d"), entry("a"), entry("b", "theirs")]
+
+
+def test_diff_hunks_rebuild_the_new_list(popup2):
+    old = [entry(str(n)) for n in range(10)]
+    new = [entry("top")] + old[:3] + [entry("3", "edited")] + old[5:8] + [old[9], old[8], entry("end")]
+    hunks = popup2.diff_items(old, new)
+    rebuilt = list(old)
+    for start, end, items in reversed(hunks):
+        rebuilt[start:end] = items
+    assert rebuilt == new
+    assert popup2.diff_items(old, list(old)) == []
+
+
+def test_external_change_is_merged(popup2, open_window):
+    write_data_file(popup2, [entry("a"), entry("b")])
+    window = open_window()
+    write_data_file(popup2, [entry("a"), entry("b", "changed elsewhere"), entry("c")])
+    window.start_reload()
+    window.reload_thread.wait()
+    from PyQt5 import QtWidgets
+    QtWidgets.QApplication.processEvents()
+    assert window.data == [entry("a"), entry("b", "changed elsewhere"), entry("c")]
+
+
+def test_save_merges_a_change_not_yet_seen(popup2, open_window):
+    write_data_file(popup2, [entry("a"), entry("b")])
+    window = open_window()
+    write_data_file(popup2, [entry("a"), entry("b"), entry("from elsewhere")])
+    window.data[0] = entry("a", "mine")
+    window.save_data()
+    assert read_data_file(popup2)["data"] == [entry("a", "mine"), entry("b"), entry("from elsewhere")]
+
+
+def test_ids_made_up_for_old_file_are_kept(popup2, open_window):
+    write_data_file(popup2, [{"name": "a", "data": "x", "color": "#FFB3BA"}, {"name": "b", "data": "y"}])
+    first = [item["id"] for item in open_window(show=False).data]
+    assert [item["id"] for item in read_data_file(popup2)["data"]] == first
+    assert [item["id"] for item in open_window(show=False).data] == first
+
+
+def test_library_file_without_ids_is_written_with_them(popup2, open_window, tmp_path):
+    write_libraries(popup2, tmp_path)
+    with open(tmp_path / "Work.json", "w") as f:
+        json.dump({"data": [{"name": "w", "data": "x", "color": "#FFB3BA"}]}, f)
+    window = open_window()
+    window.switch_library("Work")
+    with open(tmp_path / "Work.json") as f:
+        assert json.load(f)["data"][0]["id"] == window.data[0]["id"]
+
+
+def test_rows_resolve_through_ids(window):
+    item = window.item_at(0)
+    assert window.library.by_id[item["id"]] is item
+    assert window.filtered_ids == [item["id"] for item in window.data]
+
+
+def test_undo_history_caps(popup2):
+    history = popup2.UndoHistory(3, 10 ** 6)
+    for n in range(5):
+        history.record(popup2.UndoEntry(str(n), "Main", [("remove", n, [entry(str(n))])]))
+    assert [step.label for step in history.undo_stack] == ["2", "3", "4"]
+    big = popup2.UndoEntry("big", "Main", [("insert", 0, [popup2.to_item(entry("big", "x" * 5000))])])
+    history = popup2.UndoHistory(100, big.size + 50)  # Room for the big step alone
+    history.record(popup2.UndoEntry("small", "Main", [("remove", 0, [entry("a")])]))
+    history.record(big)
+    assert [step.label for step in history.undo_stack] == ["big"] and history.size == big.size
+
+
+def test_undo_history_forgets_a_library(popup2):
+    history = popup2.UndoHistory(10, 10 ** 6)
+    history.record(popup2.UndoEntry("one", "Main", []))
+    history.record(popup2.UndoEntry("two", "Other", []))
+    history.redo_stack.append(popup2.UndoEntry("three", "Other", []))
+    history.forget("Other")
+    assert [step.label for step in history.undo_stack] == ["one"] and history.redo_stack == []
+    assert history.size == history.undo_stack[0].size
+
+
+def ids(window):
+    return [item["id"] for item in window.data]
+
+
+def test_undo_and_redo_add_delete_move(window):
+    start = ids(window)
+    add_item(window, "added", "text")
+    added = ids(window)
+    assert len(added) == len(start) + 1
+    window.perform("Move", [("move", 0, len(added) - 1)])
+    moved = ids(window)
+    window.perform("Delete", [("remove", 1, [window.data[1]])])
+    deleted = ids(window)
+    window.undo()
+    assert ids(window) == moved
+    window.undo()
+    assert ids(window) == added
+    window.undo()
+    assert ids(window) == start
+    window.redo()
+    window.redo()
+    window.redo()
+    assert ids(window) == deleted
+    assert [item["id"] for item in window.libraries[0].items] == deleted
+
+
+def test_undo_edit_restores_the_item(window):
+    add_item(window, "added", "before")
+    row = next(row for row, item in enumerate(window.data) if item["name"] == "added")
+    window.perform("Edit", [("replace", row, dict(window.data[row], data="after"))])
+    window.undo()
+    assert window.data[row]["data"] == "before"
+    window.redo()
+    assert window.data[row]["data"] == "after"
+
+
+def test_new_action_clears_redo(window):
+    add_item(window, "one", "1")
+    window.undo()
+    add_item(window, "two", "2")
+    window.redo()
+    assert [item["name"] for item in window.data].count("one") == 0
+
+
+def test_undo_that_no_longer_applies_is_dropped(window):
+    add_item(window, "added", "text")
+    row = next(row for row, item in enumerate(window.data) if item["name"] == "added")
+    window.apply_op(window.library, ("remove", row, [window.data[row]]))  # Changed outside the history, like a reload
+    window.undo()
+    assert len(window.warnings) == 1 and "Cannot undo" in window.warnings[0]
+    assert not window.history.undo_stack and not window.history.redo_stack
+
+
+def test_undo_import(window, monkeypatch, tmp_path):
+    start = ids(window)
+    assert import_file(window, monkeypatch, tmp_path, {"data": [{"name": "imported", "data": "x", "color": "#FFB3BA"}]}) == []
+    assert len(ids(window)) == len(start) + 1
+    window.undo()
+    assert ids(window) == start
+
+
+def test_secret_stored_encrypted(popup2, open_window, monkeypatch):
+    from PyQt5 import QtWidgets
+    passphrases = ["pass", "pass"]  # Chosen, then repeated
+    monkeypatch.setattr(QtWidgets.QInputDialog, "getText", staticmethod(lambda *args: (passphrases.pop(0), True)))
+    window = open_window()
+    window.add_line()
+    window.name_entry.setText("pin")
+    window.data_entry.load("1234", 1024 * 1024)
+    window.secret_check.setChecked(True)
+    window.submit_popup(window.name_entry, window.data_entry, window.color_buttons, window.edit_popup, None)
+    stored = read_data_file(popup2)
+    item = next(item for item in stored["data"] if item["name"] == "pin")
+    assert item["secret"] and item["data"].startswith("v1$") and "1234" not in json.dumps(stored)
+    reopened = open_window(show=False)  # No key cached yet
+    passphrases[:] = ["wrong", "pass"]
+    assert reopened.item_data(item) is None and reopened.warnings == ["Wrong passphrase."]
+    assert reopened.item_data(item) == "1234"
+
+
+def test_import_refuses_newer_format(window, monkeypatch, tmp_path, popup2):
+    count = len(window.data)
+    errors = import_file(window, monkeypatch, tmp_path, {"format": popup2.DATA_FORMAT + 1, "data": [{"name": "a", "data": "x"}]})
+    assert len(errors) == 1 and "newer version" in errors[0]
+    assert len(window.data) == count
+
+
+def test_import_refuses_malformed_entries(window, monkeypatch, tmp_path):
+    count = len(window.data)
+    for bad in ("just text", {"name": 5, "data": "x"}, {"name": "a", "data": ["x"]}):
+        errors = import_file(window, monkeypatch, tmp_path, {"data": [{"name": "ok", "data": "x"}, bad]})
+        assert errors == ["Error importing data: Item 2 must be a dictionary with text 'name', 'data' and 'color'."]
+    assert len(window.data) == count
+
+
+def test_import_adds_items(window, monkeypatch, tmp_path):
+    count = len(window.data)
+    assert import_file(window, monkeypatch, tmp_path, {"data": [{"name": "a", "data": "x"}]}) == []
+    assert len(window.data) == count + 1 and window.data[-1]["color"] == window.config["colors"][0]
+
+
+def test_long_data_stored_compressed(popup2, window):
+    text = "\n".join(["line of log text"] * 1000)
+    add_item(window, "log", text)
+    item = next(item for item in read_data_file(popup2)["data"] if item["name"] == "log")
+    assert item["packed"] and len(item["data"]) < len(text)
+    assert window.item_data(window.library.by_id[item["id"]]) == text
+
+
+def test_long_data_of_an_old_file_is_packed_on_load(popup2, open_window):
+    text = "\n".join(["line of log text"] * 1000)
+    write_data_file(popup2, [entry("log", text), entry("short")])
+    window = open_window()
+    stored = read_data_file(popup2)
+    assert stored["format"] == popup2.DATA_FORMAT
+    log, short = stored["data"]
+    assert log["packed"] and len(log["data"]) < len(text)
+    assert "packed" not in short
+    assert window.item_data(window.library.by_id["log"]) == text
+
+
+def test_long_data_of_an_old_library_is_packed_on_load(popup2, open_window, tmp_path):
+    text = "\n".join(["line of log text"] * 1000)
+    with open(tmp_path / "Work.json", "w") as f:
+        json.dump({"data": [entry("log", text)]}, f)
+    write_data_file(popup2, [entry("main")], libraries=[{"name": "Work", "file": "Work.json", "names": ["log"]}])
+    window = open_window()
+    window.switch_library("Work")
+    with open(tmp_path / "Work.json") as f:
+        stored = json.load(f)
+    assert stored["format"] == popup2.DATA_FORMAT and stored["data"][0]["packed"]
+    assert window.item_data(window.library.by_id["log"]) == text
+
+
+def test_template_that_cannot_be_filled_in_is_used_as_written(window, monkeypatch, popup2):
+    copied = []
+    monkeypatch.setattr(popup2.pyperclip, "copy", copied.append)
+    monkeypatch.setattr(popup2.pyperclip, "paste", lambda: "")
+    errors = []
+    window.template_failed.connect(errors.append)
+    content = "Today {date:%Y\0}"
+    window.deliver(content, popup2.templates.compile_template(content), {})
+    assert copied == [content]
+    assert len(errors) == 1
+
+
+def test_template_cached_in_the_items_own_library(window, popup2):
+    other = popup2.Library("Other", "other.json")
+    other.set_items([entry("o", "{date}")], window)
+    item = other.by_id["o"]
+    window.compiled_template(item, item["data"], other)
+    assert "o" in other.templates and "o" not in window.library.templates
+
+
+def test_snapshot_takes_ids_from_memory(popup2, open_window):
+    import snapshot
+    write_data_file(popup2, [{"name": "a", "data": "x", "color": "#FFB3BA"}])
+    window = open_window(show=False)
+    write_data_file(popup2, [{"name": "a", "data": "x", "color": "#FFB3BA"}])  # Rewritten without ids since
+    popup2.SnapshotThread(popup2.DATA_FILE, popup2.snapshot_path(), list(window.data)).run()
+    opened = snapshot.open_snapshot(popup2.snapshot_path(), popup2.DATA_FILE)
+    assert opened.ids() == [window.data[0]["id"]]
+    opened.close()
+
+
+def test_launcher_fails_links_while_an_opener_is_stuck(popup2, monkeypatch):
+    import threading
+    release = threading.Event()
+    opened = []
+
+    class Browser:
+        def open(self, target):
+            if target == "http://stuck":
+                release.wait(5)
+            opened.append(target)
+            return True
+
+    browsers = []
+    monkeypatch.setattr(popup2.webbrowser, "get", lambda: browsers.append(Browser()) or browsers[-1])
+    launcher = popup2.LauncherThread(0.05)
+    failed = []
+    launcher.failed.connect(lambda target, message: failed.append(target))
+    launcher.launch("http://stuck")
+    launcher.launch("http://next")
+    launcher.stop()
+    launcher.run()
+    assert failed == ["http://stuck", "http://next"]
+    release.set()
+    launcher.stuck.join(5)
+    launcher.launch("http://after")
+    launcher.stop()
+    launcher.run()
+    assert opened == ["http://stuck", "http://after"] and len(browsers) == 1
+
+
+def test_tray_lists_pinned_and_used_items_of_unloaded_libraries(popup2, open_window, tmp_path, monkeypatch):
+    write_libraries(popup2, tmp_path, library_cache_mb=0)
+    window = open_window()
+    used = []
+    monkeypatch.setattr(window, "use_item", lambda item, library: used.append((item["name"], library.name)) or window.count_use(item, library))
+    window.switch_library("Work")
+    window.listbox.setCurrentRow(1)
+    window.toggle_pin()
+    window.use_item(window.library.by_id["Work 2"], window.library)
+    window.switch_library("Home")
+    window.switch_library("Main")
+    assert window.find_library("Work").items is None
+    assert window.top_items() == [("Work 1", "Work 1", True), ("Work 2", "Work 2", False)]
+    window.copy_from_tray("Work 1")
+    assert used[-1] == ("Work 1", "Work")
+
+
+def test_tray_index_kept_across_restarts(popup2, open_window, tmp_path):
+    write_libraries(popup2, tmp_path)
+    window = open_window()
+    window.switch_library("Work")
+    window.listbox.setCurrentRow(0)
+    window.toggle_pin()
+    window.perform("Edit", [("replace", 0, dict(window.data[0], name="Renamed"))])
+    window.switch_library("Main")
+    window.save_data()
+    window = open_window()
+    assert window.find_library("Work").items is None
+    assert window.top_items() == [("Work 0", "Renamed", True)]
+
+
+def test_idle_trim_releases_the_view_and_other_libraries(popup2, open_window, tmp_path):
+    write_libraries(popup2, tmp_path)
+    window = open_window()
+    window.switch_library("Work")
+    window.switch_library("Home")
+    window.listbox.setCurrentRow(2)
+    window.hide()
+    window.trim_idle()
+    assert window.listbox.model() is None
+    assert window.find_library("Work").items is None and window.library.items is not None
+    window.show()
+    assert window.listbox.model() is window.library.model and window.listbox.currentRow() == 2
+
+
+def test_data_editor_previews_big_text(popup2, window):
+    editor = popup2.DataEditor()
+    text = "line\r\n" * 100
+    editor.load(text, 64)
+    assert editor.previewing and editor.isReadOnly() and editor.text() == text
+    editor.CHUNK_SIZE = 61  # Ends between a \r\n pair
+    editor.edit_all()
+    editor.finish_loading()
+    assert not editor.isReadOnly() and editor.text() == text and editor.toPlainText() == text.replace("\r\n", "\n")
+    editor.insertPlainText("edited ")
+    assert editor.text().startswith("edited line")
+
+
+def test_data_editor_unchanged_while_loading(popup2, window):
+    editor = popup2.DataEditor()
+    editor.CHUNK_SIZE = 10
+    text = "x" * 100
+    editor.load(text, 1024)
+    assert editor.position < len(text)
+    assert editor.unchanged() and editor.text() == text
+
+
+def test_abbreviation_starting_another_is_rejected(window):
+    add_item(window, "signature", "Best regards", ";sig")
+    count = len(window.data)
+    add_item(window, "short", "S", ";s")
+    add_item(window, "longer", "L", ";sig2")
+    assert len(window.data) == count
+    assert len(window.warnings) == 2 and all("overlaps ;sig" in text for text in window.warnings)
+    add_item(window, "other", "O", ";si-g")
+    assert len(window.data) == count + 1
+    assert ";si-g" in window.abbreviation_owners
+
+
+def test_abbreviation_used_twice_is_rejected(window):
+    add_item(window, "signature", "Best regards", ";sig")
+    add_item(window, "again", "Other", ";sig")
+    assert window.warnings == ["The abbreviation ;sig is already used by another item in Main."]
+
+
+def test_abbreviation_index_written_on_first_load(popup2, open_window):
+    write_data_file(popup2, [{"id": "a", "name": "a", "data": "x", "color": "#FFB3BA", "abbreviation": ";a"}])
+    window = open_window()
+    assert window.libraries[0].abbreviations == {";a": "a"}
+    assert read_data_file(popup2)["abbreviations"] == {";a": "a"}
+
+
+def test_abbreviation_index_from_old_snapshot_decodes_no_rows(popup2, open_window, monkeypatch):
+    import snapshot
+    items = [{"id": f"i{n}", "name": f"item {n}", "data": "x", "color": "#FFB3BA"} for n in range(50)]
+    items[7]["abbreviation"] = ";seven"
+    write_data_file(popup2, items)
+    with open(popup2.DATA_FILE, "rb") as f:
+        raw = f.read()
+    snapshot.write_snapshot(popup2.snapshot_path(), snapshot.checksum(raw), {}, items, "#FFB3BA")  # Written before the index existed
+    rows = []
+    row = snapshot.Snapshot.row
+    monkeypatch.setattr(snapshot.Snapshot, "row", lambda self, index: rows.append(index) or row(self, index))
+    monkeypatch.setattr(popup2.PopupApp, "save_data", lambda self: None)
+    window = open_window(show=False)  # Started in the tray, so no rows are shown either
+    assert window.libraries[0].snapshot is not None
+    assert window.libraries[0].abbreviations == {";seven": "i7"}
+    assert rows == []
+
+
+def test_snapshot_carries_abbreviation_index(popup2):
+    import snapshot
+    write_data_file(popup2, [{"id": "a", "name": "a", "data": "x", "color": "#FFB3BA", "abbreviation": ";a"}])
+    popup2.SnapshotThread(popup2.DATA_FILE, popup2.snapshot_path()).run()
+    opened = snapshot.open_snapshot(popup2.snapshot_path(), popup2.DATA_FILE)
+    assert opened.settings["abbreviations"] == {";a": "a"}
+    opened.close()
+
+
+def test_click_resets_the_typed_abbreviation(window):
+    import keyboard
+    add_item(window, "signature", "Best regards", ";sig")
+    typed = []
+    window.abbreviation_typed.disconnect()
+    window.abbreviation_typed.connect(typed.append)
+
+    def type_text(text):
+        for char in text:
+            window.on_key(keyboard.KeyboardEvent(keyboard.KEY_DOWN, 0, char))
+
+    type_text(";si")
+    window.on_click(0, 0, None, True)
+    window.on_click(0, 0, None, False)
+    type_text("g")
+    assert typed == []
+    type_text(" ;sig")
+    assert [match[0] for match in typed] == [";sig"]
+
+
+def test_scheduled_backup_only_when_changed(window):
+    queued = []
+    window.backups.back_up = lambda reason, sources: queued.append(reason)
+    window.run_backup()
+    window.run_backup()
+    assert queued == ["scheduled"]
+    window.save_data()
+    window.run_backup()
+    assert queued == ["scheduled", "scheduled"]
+
+
+def test_window_built_on_first_show(popup2, open_window, tmp_path):
+    write_libraries(popup2, tmp_path, library="Work", window_x=40, window_y=50)
+    window = open_window(show=False)
+    assert not window.window_built and not hasattr(window, "listbox")
+    window.save_data()  # Before the window exists: the configured position and library are kept
+    stored = read_data_file(popup2)
+    assert (stored["window_x"], stored["window_y"], stored["library"]) == (40, 50, "Work")
+    window.show()
+    assert window.window_built and window.library.name == "Work"
+
+
+def test_quit_drops_a_hanging_sync(popup2, monkeypatch, tmp_path):
+    import threading
+    import time
+    started, release = threading.Event(), threading.Event()
+    monkeypatch.setattr(popup2.sync, "sync_library", lambda *args: started.set() or release.wait(10))
+    monkeypatch.setattr(popup2, "SYNC_QUIT_WAIT_S", 0.1)
+    syncer = popup2.SyncThread("http://127.0.0.1:9", str(tmp_path / "sync_state.json"))
+    syncer.start()
+    syncer.sync({"name": "Main", "items": [], "synced": None, "resolved": {}, "revision": 0})
+    syncer.sync({"name": "Main", "items": [], "synced": None, "resolved": {}, "revision": 1})
+    syncer.commit("Main", {"seq": 3})
+    assert started.wait(5)
+    begun = time.monotonic()
+    syncer.stop()
+    assert syncer.wait(5000) and time.monotonic() - begun < 2
+    with open(tmp_path / "sync_state.json") as f:
+        assert json.load(f)["libraries"] == {"Main": {"seq": 3}}  # Queued commits are still written
+    release.set()
+
+
+def test_quit_bounds_the_backup_wait(popup2, monkeypatch, tmp_path):
+    import threading
+    import time
+    started, release = threading.Event(), threading.Event()
+    written = []
+    monkeypatch.setattr(popup2.backup, "write_generation", lambda folder, reason, *args: written.append(reason) or started.set() or release.wait(10))
+    monkeypatch.setattr(popup2, "BACKUP_QUIT_WAIT_S", 0.1)
+    backups = popup2.BackupThread(str(tmp_path / "backups"), 3)
+    backups.start()
+    backups.back_up("delete", [])
+    backups.back_up("scheduled", [])
+    assert started.wait(5)
+    begun = time.monotonic()
+    backups.stop()
+    assert backups.wait(5000) and time.monotonic() - begun < 2
+    assert written == ["delete"]
+    release.set()
+
+
+def test_jump_to_a_row_by_its_hex_label(popup2, open_window, monkeypatch):
+    write_data_file(popup2, [entry(f"item {n}") for n in range(20)])
+    window = open_window()
+    used = []
+    monkeypatch.setattr(window, "handle_enter", lambda: used.append(window.listbox.currentRow()))
+    assert window.library.model.label_width == 2
+    assert window.library.model.data(window.library.model.index(19, 0)).startswith("13 ")
+    window.jump_key("1")
+    assert used == [] and window.jump_keys == "1"
+    window.jump_key("3")
+    assert used == [0x13] and window.jump_keys == ""
+
+
+def test_pause_uses_the_digits_typed_so_far(popup2, open_window, monkeypatch):
+    write_data_file(popup2, [entry(f"item {n}") for n in range(20)])
+    window = open_window()
+    used = []
+    monkeypatch.setattr(window, "handle_enter", lambda: used.append(window.listbox.currentRow()))
+    window.jump_key("3")
+    assert used == [] and window.jump_timer.isActive()
+    window.jump_timer.timeout.emit()
+    assert used == [3] and window.jump_keys == ""
@@ -0,0 +1,66 @@
+import os
+
+import snapshot
+
+COLOR = "#FFB3BA"
+ITEMS = [
+    {"id": "a", "name": "first ✓", "data": "one", "color": "#BAFFC9"},
+    {"id": "b", "name": "second", "data": "two", "abbreviation": ";b", "secret": True},
+    {"id": "c", "name": "", "data": "", "color": "#BAFFC9"},
+]
+
+
+def write(tmp_path, items=ITEMS, settings=None, source=b"data.json contents"):
+    (tmp_path / "data.json").write_bytes(source)
+    path = str(tmp_path / "data.snapshot")
+    written = snapshot.write_snapshot(path, snapshot.checksum(source), settings or {"hotkey": "ctrl+alt+p"}, items, COLOR)
+    return path, written
+
+
+def test_round_trip(tmp_path):
+    path, written = write(tmp_path)
+    assert written
+    opened = snapshot.open_snapshot(path, str(tmp_path / "data.json"))
+    assert opened.settings == {"hotkey": "ctrl+alt+p"}
+    assert opened.count == 3 and opened.ids() == ["a", "b", "c"]
+    assert opened.row(0) == ("first ✓", "one", "#BAFFC9", None)
+    assert opened.row(1) == ("second", "two", COLOR, {"abbreviation": ";b", "secret": True})
+    assert opened.row(2) == ("", "", "#BAFFC9", None)
+    assert list(opened.extras()) == [(1, {"abbreviation": ";b", "secret": True})]
+    opened.close()
+
+
+def test_stale_when_source_changed(tmp_path):
+    path, _ = write(tmp_path)
+    (tmp_path / "data.json").write_bytes(b"edited elsewhere")
+    assert snapshot.open_snapshot(path, str(tmp_path / "data.json")) is None
+
+
+def test_truncated_or_foreign_file(tmp_path):
+    path, _ = write(tmp_path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    for content in (raw[:len(raw) // 2], b"", b"MMCX" + raw[4:]):
+        with open(path, "wb") as f:
+            f.write(content)
+        assert snapshot.open_snapshot(path, str(tmp_path / "data.json")) is None
+
+
+def test_items_it_cannot_hold(tmp_path):
+    assert not write(tmp_path, [{"id": "a\nb", "name": "x", "data": "y"}])[1]
+    assert not write(tmp_path, [{"name": "no id", "data": "y"}])[1]
+
+
+def test_empty_library(tmp_path):
+    path, _ = write(tmp_path, [])
+    opened = snapshot.open_snapshot(path, str(tmp_path / "data.json"))
+    assert opened.ids() == [] and list(opened.extras()) == []
+    opened.close()
+
+
+def test_leftover_rebuild_taken_over(tmp_path):
+    path, _ = write(tmp_path)
+    os.replace(path, path + ".tmp")  # A rebuild that couldn't replace a still mapped snapshot
+    opened = snapshot.open_snapshot(path, str(tmp_path / "data.json"))
+    assert opened is not None and not os.path.exists(path + ".tmp")
+    opened.close()
@@ -0,0 +1,148 @@
+import threading
+
+import pytest
+
+import sync
+
+
+def item(item_id, data="x"):
+    return {"id": item_id, "name": item_id, "data": data}
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = sync.SyncServer(0, str(tmp_path / "server"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class Client:
+    # One machine's library and sync state, as SyncThread keeps them
+    def __init__(self, url, items=()):
+        self.url = url
+        self.items = list(items)
+        self.entry = {}
+        self.synced = None
+
+    def sync(self, resolved=None):
+        merged, self.entry, conflicts, transferred = sync.sync_library(self.url, "Main", self.items, self.entry, self.synced, resolved or {}, None, 5)
+        self.items = merged
+        self.synced = None if conflicts else merged
+        return conflicts
+
+
+def test_store_numbers_changes_and_replays(tmp_path):
+    path = str(tmp_path / "store.log")
+    store = sync.Store(path)
+    result = store.sync(None, [["a", 0, item("a"), None], ["b", 0, item("b"), "a"]])
+    assert result["accepted"] == {"a": 1, "b": 2} and result["seq"] == 2
+    assert store.sync(1, [])["changes"] == [["b", 2, item("b"), "a"]]
+    store.sync(2, [["a", 1, item("a", "edited"), None]])
+    replayed = sync.Store(path)
+    assert replayed.records == store.records and replayed.seq == 3
+
+
+def test_store_starts_empty_and_reports_write_failures(tmp_path):
+    store = sync.Store(str(tmp_path / "missing" / "store.log"))
+    assert store.records == {} and store.seq == 0
+    with pytest.raises(OSError):
+        store.sync(None, [["a", 0, item("a"), None]])
+
+
+def test_store_conflict_and_same_change(tmp_path):
+    store = sync.Store(str(tmp_path / "store.log"))
+    store.sync(None, [["a", 0, item("a"), None]])
+    store.sync(1, [["a", 1, item("a", "theirs"), None]])
+    result = store.sync(1, [["a", 1, item("a", "mine"), None]])
+    assert result["conflicts"] == [["a", 2, item("a", "theirs"), None]] and "a" not in result["accepted"]
+    assert store.sync(1, [["a", 1, item("a", "theirs"), None]])["accepted"] == {"a": 2}
+
+
+def test_store_compacts_long_logs(tmp_path):
+    path = str(tmp_path / "store.log")
+    store = sync.Store(path)
+    for n in range(1200):
+        store.sync(None, [["a", n, item("a", str(n)), None]])
+    compacted = sync.Store(path)
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+    assert compacted.records["a"][1] == item("a", "1199")
+
+
+def test_apply_records():
+    items = [item("a"), item("b"), item("c")]
+    assert sync.apply_records(items, []) is items
+    edited = sync.apply_records(items, [["b", 5, item("b", "new"), "a"]])
+    assert edited == [item("a"), item("b", "new"), item("c")]
+    assert sync.apply_records(items, [["b", 5, None, None]]) == [item("a"), item("c")]
+    assert sync.apply_records(items, [["d", 5, item("d"), "a"], ["e", 6, item("e"), "d"]]) == [item("a"), item("d"), item("e"), item("b"), item("c")]
+    assert sync.apply_records(items, [["c", 5, item("c"), None]]) == [item("c"), item("a"), item("b")]
+    assert sync.apply_records(items, [["d", 5, item("d"), "gone"]]) == items + [item("d")]
+
+
+def test_local_changes_fast_path_matches_full_scan():
+    items = [item(str(n)) for n in range(20)]
+    state = {}
+    prev = None
+    for row, entry in enumerate(items):
+        state[entry["id"]] = [row + 1, sync.digest(entry, None), prev]
+        prev = entry["id"]
+    changed = list(items)
+    changed[5] = item("5", "edited")
+    fast, _ = sync.local_changes(changed, state, items, None)
+    full, _ = sync.local_changes(changed, state, None, None)
+    assert fast == full == [["5", 6, item("5", "edited"), "4"]]
+    removed = items[:3] + items[4:]
+    changes, _ = sync.local_changes(removed, state, items, None)
+    assert sorted(changes, key=lambda change: change[0]) == [["3", 4, None, None], ["4", 5, item("4"), "2"]]
+
+
+def test_two_clients_exchange_only_changes(server):
+    first = Client(server, [item(str(n)) for n in range(50)])
+    second = Client(server)
+    assert first.sync() == [] and second.sync() == []
+    assert second.items == first.items
+    first.items = list(first.items)
+    first.items[10] = item("10", "edited")
+    first.items.insert(0, item("top"))
+    del first.items[-1]
+    first.sync()
+    second.sync()
+    assert second.items == first.items
+
+
+def test_conflict_resolved_item_by_item(server):
+    first = Client(server, [item("a"), item("b")])
+    second = Client(server)
+    first.sync()
+    second.sync()
+    first.items = [item("a", "first"), item("b")]
+    second.items = [item("a", "second"), item("b", "second")]
+    first.sync()
+    conflicts = second.sync()
+    assert [record[0] for record in conflicts] == ["a"]
+    assert second.items[1] == item("b", "second")  # Not in conflict: sent as usual
+    assert second.sync({"a": (conflicts[0], True)}) == []
+    first.sync()
+    assert first.items == second.items == [item("a", "second"), item("b", "second")]
+
+
+def test_taking_their_side(server):
+    first = Client(server, [item("a")])
+    second = Client(server)
+    first.sync()
+    second.sync()
+    first.items = [item("a", "first")]
+    second.items = [item("a", "second")]
+    first.sync()
+    conflicts = second.sync()
+    assert second.sync({"a": (conflicts[0], False)}) == []
+    assert second.items == [item("a", "first")]
+
+
+def test_unreachable_server():
+    with pytest.raises(OSError):
+        Client("http://127.0.0.1:9").sync()
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+import templates
+
+
+def test_plain_text_has_no_template():
+    assert templates.compile_template("no placeholders") is None
+    assert templates.compile_template("braces {but} none known") is None
+
+
+def test_parts_and_labels():
+    template = templates.compile_template("Hi {input:Name}, {input:Name} again; {clipboard} {date}")
+    assert template.labels == ["Name"]
+    assert template.needs_clipboard
+    assert templates.expand(template, {"Name": "Ann"}, "clip")[:21] == "Hi Ann, Ann again; cl"
+
+
+def test_malformed_placeholders_stay_literal():
+    text = "{input} {clipboard:x} {date:} {unknown:1}"
+    assert templates.compile_template(text) is None
+
+
+def test_date_and_time_formats():
+    template = templates.compile_template("{date:%Y}/{time:%H}")
+    assert templates.expand(template, {}) == time.strftime("%Y/%H")
+
+
+def test_rejected_format_raises_template_error():
+    template = templates.compile_template("{date:%Y\0}")  # No strftime accepts an embedded null
+    with pytest.raises(templates.TemplateError) as error:
+        templates.expand(template, {})
+    assert "{date:%Y\0}" in str(error.value)
+    assert isinstance(error.value, ValueError)
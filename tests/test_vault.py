@@ -0,0 +1,56 @@
+import base64
+
+import pytest
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+import vault
+
+SALT = bytes(range(16))
+PASSPHRASE = "correct horse"
+TEXT = "secret text ✓"
+BLOB = "v1$AAECAwQFBgcICQoLDA0ODwAAAAAAAAAAAAAAAH7f4Laf0cgIZz6ATiP3CyjXjVui3CiBqISoeYn7AIE="  # With a zero nonce
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return vault.derive_keys(PASSPHRASE, SALT)
+
+
+def test_known_answer(keys):
+    assert vault.encrypt(keys, SALT, TEXT, nonce=bytes(12)) == BLOB
+    assert vault.decrypt(keys, BLOB) == TEXT
+
+
+def test_blob_is_the_documented_construction():
+    key = Scrypt(salt=SALT, length=32, n=2 ** 15, r=8, p=1).derive(PASSPHRASE.encode("utf-8"))
+    raw = base64.b64decode(BLOB[3:])
+    assert raw[:16] == SALT
+    assert AESGCM(key).decrypt(raw[16:28], raw[28:], b"v1$" + SALT).decode("utf-8") == TEXT
+
+
+def test_round_trip_uses_fresh_nonces(keys):
+    first, second = vault.encrypt(keys, SALT, TEXT), vault.encrypt(keys, SALT, TEXT)
+    assert first != second
+    assert vault.decrypt(keys, first) == vault.decrypt(keys, second) == TEXT
+    assert vault.blob_salt(first) == SALT
+
+
+def test_tampering_is_detected(keys):
+    raw = bytearray(base64.b64decode(BLOB[3:]))
+    for position in (0, 16, 30, len(raw) - 1):  # Salt, nonce, ciphertext, tag
+        changed = bytearray(raw)
+        changed[position] ^= 1
+        with pytest.raises(vault.VaultError):
+            vault.decrypt(keys, "v1$" + base64.b64encode(bytes(changed)).decode("ascii"))
+
+
+def test_wrong_passphrase():
+    with pytest.raises(vault.VaultError):
+        vault.decrypt(vault.derive_keys("wrong", SALT), BLOB)
+
+
+@pytest.mark.parametrize("blob", ["plain text", "v2$" + BLOB[3:], "v1$not base64!", "v1$" + base64.b64encode(bytes(20)).decode("ascii")])
+def test_damaged_blobs(keys, blob):
+    with pytest.raises(vault.VaultError):
+        vault.decrypt(keys, blob)
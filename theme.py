@@ -0,0 +1,148 @@
+# Built-in application stylesheet. Widgets are matched by object name and by the
+# "role" dynamic property; a theme file set in data.json replaces it. The PopupApp
+# and ItemList qproperties feed the custom-painted window chrome and list rows.
+DEFAULT_THEME = """
+PopupApp {
+    qproperty-borderColor: #77dd77;
+    qproperty-backgroundColor: #669999;
+    qproperty-titleColor: #008060;
+}
+
+QPushButton[role="title"] {
+    background-color: #cccccc;
+    color: white;
+    border: none;
+    border-radius: 3px;
+    padding: 3px;
+    font-size: 12px;
+    font-weight: bold;
+}
+QPushButton#MinimizeButton {
+    background-color: #99ccff;
+}
+QPushButton#CloseButton {
+    background-color: #ff9999;
+}
+
+QPushButton[role="action"] {
+    color: white;
+    border-radius: 3px;
+    height: 20px;
+    font-size: 12px;
+    font-weight: bold;
+}
+QPushButton#AddButton {
+    background-color: #b3e6b3;
+}
+QPushButton#EditButton {
+    background-color: #f7c6a3;
+}
+QPushButton#DeleteButton {
+    background-color: #ffb3b3;
+}
+QPushButton#ExportButton {
+    background-color: #99ccff;
+}
+QPushButton#ImportButton {
+    background-color: #d1b3ff;
+}
+
+QListView#ItemList {
+    background-color: #7d7d7d;
+    color: white;
+    border-radius: 5px;
+    font-size: 14px;
+    qproperty-rowTextColor: #00008B;
+    qproperty-selectionBorderColor: red;
+}
+QComboBox#LibrarySwitcher {
+    background-color: #cccccc;
+    color: white;
+    border: none;
+    border-radius: 3px;
+    padding-left: 4px;
+    font-size: 12px;
+    font-weight: bold;
+}
+QLabel#VersionLabel {
+    color: gray;
+}
+
+QDialog[role="dialog"] {
+    background-color: #009999;
+    border-radius: 5px;
+}
+QDialog[role="dialog"] QLabel {
+    color: white;
+    height: 30px;
+    font-size: 14px;
+}
+QLineEdit#ItemEntry {
+    background-color: #2d2d2d;
+    color: #00008B;
+    border: solid 1px #ccc;
+    border-radius: 3px;
+    height: 30px;
+    font-size: 14px;
+}
+QPlainTextEdit#ItemEntry {
+    background-color: #2d2d2d;
+    color: #00008B;
+    border: solid 1px #ccc;
+    border-radius: 3px;
+    font-size: 14px;
+}
+QPushButton#EditAllButton {
+    background-color: #0099cc;
+    color: white;
+    height: 30px;
+    padding: 0 10px;
+    border: solid 1px #6600cc;
+}
+QCheckBox#SecretCheck {
+    color: white;
+    font-size: 14px;
+}
+QComboBox#HotkeyDropdown {
+    background-color: #2d2d2d;
+    color: white;
+    border: solid 1px #ccc;
+    border-radius: 3px;
+    height: 30px;
+    font-size: 14px;
+}
+QPushButton#ColorSwatch {
+    border-radius: 3px;
+    height: 30px;
+    width: 30px;
+}
+QPushButton#ColorSwatch:checked {
+    border: 2px solid black;
+}
+QPushButton#OkButton {
+    background-color: #0099cc;
+    color: white;
+    height: 30px;
+    border: solid 1px #6600cc;
+}
+QPushButton#CancelButton {
+    background-color: #ff9999;
+    color: white;
+    height: 30px;
+    border: solid 1px #6600cc;
+}
+
+QPushButton[role="title"]:focus,
+QPushButton[role="action"]:focus,
+QPushButton#ColorSwatch:focus,
+QPushButton#OkButton:focus,
+QPushButton#CancelButton:focus,
+QPushButton#EditAllButton:focus,
+QLineEdit#ItemEntry:focus,
+QPlainTextEdit#ItemEntry:focus,
+QCheckBox#SecretCheck:focus,
+QComboBox#LibrarySwitcher:focus,
+QComboBox#HotkeyDropdown:focus {
+    border: 2px solid gray;
+}
+"""
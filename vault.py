@@ -0,0 +1,65 @@
+# Encryption for secret items, with AES-256-GCM from the cryptography package. A passphrase is stretched
+# with scrypt (N=2^15, r=8, p=1) into the key, paid once per session. Every blob carries a version prefix
+# and the salt it was made with, so items imported from another install ask for that install's passphrase
+# instead of failing.
+#
+# v1$ + base64(salt 16 | nonce 12 | AES-GCM ciphertext and 16-byte tag), with "v1$" + salt as associated data.
+import base64
+import os
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+PREFIX = "v1$"
+SALT_SIZE = 16
+NONCE_SIZE = 12
+TAG_SIZE = 16
+SCRYPT_N = 2 ** 15  # ~32 MB and ~0.1 s per derivation, paid once per session
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+class VaultError(Exception):
+    pass
+
+
+def new_salt():
+    return os.urandom(SALT_SIZE)
+
+
+def derive_keys(passphrase, salt):
+    return AESGCM(Scrypt(salt=salt, length=32, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P).derive(passphrase.encode("utf-8")))
+
+
+def encrypt(keys, salt, text, nonce=None):
+    # nonce is only given by tests; a fresh random one is drawn for every blob
+    nonce = os.urandom(NONCE_SIZE) if nonce is None else nonce
+    sealed = keys.encrypt(nonce, text.encode("utf-8"), PREFIX.encode() + salt)
+    return PREFIX + base64.b64encode(salt + nonce + sealed).decode("ascii")
+
+
+def unpack(blob):
+    if not blob.startswith(PREFIX):
+        raise VaultError("Not an encrypted item.")
+    try:
+        raw = base64.b64decode(blob[len(PREFIX):], validate=True)
+    except ValueError:
+        raise VaultError("Encrypted data is damaged.")
+    if len(raw) < SALT_SIZE + NONCE_SIZE + TAG_SIZE:
+        raise VaultError("Encrypted data is damaged.")
+    return raw
+
+
+def blob_salt(blob):
+    # The salt is readable without a key, to pick the cached key or ask for the right passphrase
+    return unpack(blob)[:SALT_SIZE]
+
+
+def decrypt(keys, blob):
+    raw = unpack(blob)
+    salt, nonce, sealed = raw[:SALT_SIZE], raw[SALT_SIZE:SALT_SIZE + NONCE_SIZE], raw[SALT_SIZE + NONCE_SIZE:]
+    try:
+        return keys.decrypt(nonce, sealed, PREFIX.encode() + salt).decode("utf-8")
+    except InvalidTag:
+        raise VaultError("Wrong passphrase or damaged data.")